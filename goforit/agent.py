@@ -0,0 +1,168 @@
+"""A runner agent: the LANGUAGE_RUNNERS contract served over HTTP or a Unix socket.
+
+The web server hands evaluations to a pool of agents (see dispatch.py) instead
+of running compilers and programs itself, so execution scales across
+processes and machines. An agent runs the same runners the server would run
+locally and reports which languages its toolchains support, so it's only
+sent the languages it can run.
+
+    goforit-agent --socket /tmp/goforit-agent-1.sock
+    goforit-agent --host 0.0.0.0 --port 8101
+"""
+import argparse
+import asyncio
+import base64
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Optional
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response
+from .runners import LANGUAGE_RUNNERS, CodeResult, CodeOutput, CaseResult, InputCase, RunOptions
+from .runners.benchmark import BenchmarkOptions
+from .runners.toolchains import probe_all, available_languages
+from .runners.disassembly import disassembly_store
+from .encoding import result_payload, dumps_json
+from .warmup import warm_up
+
+# Evaluations an agent takes at once by default; the dispatcher spreads load by it
+DEFAULT_CAPACITY = os.cpu_count() or 1
+
+def options_to_wire(options: Optional[RunOptions]) -> Optional[dict]:
+    if options is None:
+        return None
+    return {
+        "stdin": options.stdin,
+        "cases": [vars(case) for case in options.cases],
+        "opt_levels": options.opt_levels,
+        "benchmark": vars(options.benchmark) if options.benchmark else None,
+        "profile": options.profile,
+        "cachegrind": options.cachegrind,
+        "compile_profile": options.compile_profile,
+        "session": options.session,
+        "files": options.files,
+    }
+
+def options_from_wire(data: Optional[dict]) -> Optional[RunOptions]:
+    if data is None:
+        return None
+    return RunOptions(
+        stdin=data.get("stdin"),
+        cases=[InputCase(**case) for case in data.get("cases", [])],
+        opt_levels=list(data.get("opt_levels", [])),
+        benchmark=BenchmarkOptions(**data["benchmark"]) if data.get("benchmark") else None,
+        profile=data.get("profile", False),
+        cachegrind=data.get("cachegrind", False),
+        compile_profile=data.get("compile_profile", False),
+        session=data.get("session"),
+        files=dict(data.get("files") or {}),
+    )
+
+def result_to_wire(result: CodeResult) -> dict:
+    """The result as JSON-safe data, with binary outputs' bytes base64'd under "data"."""
+    payload = result_payload(result, binary=True)
+    for output in payload["code_outputs"]:
+        if "data" in output:
+            output["data"] = base64.b64encode(output["data"]).decode('ascii')
+    return payload
+
+def result_from_wire(payload: dict) -> CodeResult:
+    outputs = [
+        CodeOutput(content=output.get("content", ""), language=output.get("language"),
+                   data=base64.b64decode(output["data"]) if "data" in output else None,
+                   metadata=output.get("metadata", {}))
+        for output in payload.get("code_outputs", [])
+    ]
+    return CodeResult(
+        stdout=payload.get("stdout", ""),
+        stderr=payload.get("stderr", ""),
+        return_code=payload.get("return_code", 0),
+        code_outputs=outputs,
+        case_results=[CaseResult(**case) for case in payload.get("case_results", [])],
+        timings=payload.get("timings", {}),
+        phase=payload.get("phase", "complete"),
+    )
+
+def create_agent_app(capacity: int = DEFAULT_CAPACITY, warm: bool = True) -> FastAPI:
+    # Evaluations running now, reported to the dispatcher's health checks
+    state = {"active": 0, "ready": False}
+
+    async def start_up():
+        await probe_all()
+        if warm:
+            languages = await available_languages()
+            await warm_up([language for language, available in languages.items() if available], run)
+        state["ready"] = True
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        startup = asyncio.ensure_future(start_up())
+        yield
+        startup.cancel()
+
+    app = FastAPI(lifespan=lifespan)
+
+    async def run(language: str, code: str, options: Optional[RunOptions] = None) -> CodeResult:
+        state["active"] += 1
+        try:
+            return await LANGUAGE_RUNNERS[language](code, options)
+        finally:
+            state["active"] -= 1
+
+    @app.get("/agent/health")
+    async def health() -> dict[str, Any]:
+        """The languages this agent can run, and how busy it is."""
+        languages = await available_languages()
+        toolchains = await probe_all()
+        return {
+            "languages": sorted(language for language, available in languages.items() if available),
+            "toolchains": {name: toolchain.version for name, toolchain in toolchains.items()
+                           if toolchain.available},
+            "active": state["active"],
+            "capacity": capacity,
+            "ready": state["ready"],
+        }
+
+    @app.post("/agent/run")
+    async def run_endpoint(request: Request) -> Response:
+        body = await request.json()
+        language = body.get("language")
+        if language not in LANGUAGE_RUNNERS:
+            raise HTTPException(status_code=400, detail=f"Unsupported language: {language}")
+        result = await run(language, body.get("code", ""), options_from_wire(body.get("options")))
+        return Response(dumps_json(result_to_wire(result)), media_type='application/json')
+
+    @app.get("/agent/disassembly/{index_id}/{symbol:path}")
+    async def disassembly_symbol(index_id: str, symbol: str):
+        index = disassembly_store.get(index_id)
+        if index is None or symbol not in index.symbols:
+            raise HTTPException(status_code=404, detail="No such disassembly symbol")
+        return index.symbols[symbol].detail()
+
+    return app
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run a GoForIt runner agent.')
+    parser.add_argument('--host', default='127.0.0.1', help='Host to listen on (default: 127.0.0.1)')
+    parser.add_argument('-p', '--port', type=int, default=8101, help='Port to listen on (default: 8101)')
+    parser.add_argument('--socket', help='Listen on this Unix socket instead of a port')
+    parser.add_argument('--capacity', type=int, default=DEFAULT_CAPACITY,
+                        help='Concurrent evaluations to advertise (default: CPU count)')
+    parser.add_argument('--no-warmup', action='store_true', help="Don't warm up the runners on start")
+    return parser.parse_args()
+
+def main():
+    """Serve the runners to a GoForIt web server."""
+    # Only the agent process needs the server, not the dispatcher importing the wire format
+    import uvicorn
+
+    args = parse_args()
+    app = create_agent_app(capacity=args.capacity, warm=not args.no_warmup)
+    if args.socket:
+        print(f"Runner agent listening on unix:{args.socket}")
+        uvicorn.run(app, uds=args.socket, log_level="info")
+    else:
+        print(f"Runner agent listening on http://{args.host}:{args.port}")
+        uvicorn.run(app, host=args.host, port=args.port, log_level="info")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import asyncio
+import os
+from typing import AsyncIterator, Awaitable, Callable, Hashable, List, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Evaluations are dominated by compilers and user programs, so one slot per core
+# keeps the machine busy without oversubscribing it.
+BATCH_CONCURRENCY = os.cpu_count() or 1
+
+async def evaluate_batch(
+    items: List[T],
+    evaluate: Callable[[T], Awaitable[R]],
+    key: Callable[[T], Hashable],
+    concurrency: int = BATCH_CONCURRENCY,
+) -> AsyncIterator[Tuple[int, R]]:
+    """Evaluate items on a bounded pool, yielding (index, result) as each one completes.
+
+    Items with the same key are evaluated once and the result is shared by all
+    of their indices.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(item: T) -> R:
+        async with semaphore:
+            return await evaluate(item)
+
+    # Group duplicate items so each distinct submission is built and run once
+    indices_by_key = {}
+    for index, item in enumerate(items):
+        indices_by_key.setdefault(key(item), []).append(index)
+
+    pending = {}
+    for indices in indices_by_key.values():
+        task = asyncio.ensure_future(run(items[indices[0]]))
+        pending[task] = indices
+
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                for index in pending.pop(task):
+                    yield index, result
+    finally:
+        # The consumer went away (e.g. the client disconnected), drop queued work
+        for task in pending:
+            task.cancel()
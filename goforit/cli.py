@@ -1,10 +1,29 @@
 import os
 import sys
+import asyncio
 import uvicorn
 import webbrowser
 import socket
 import argparse
 from contextlib import closing
+from .runners.toolchains import available_languages
+
+LANGUAGE_NAMES = {
+    'python': 'Python',
+    'javascript': 'JavaScript',
+    'typescript': 'TypeScript',
+    'java': 'Java',
+    'cpp': 'C++',
+    'c': 'C',
+    'assembly': 'Assembly',
+    'rust': 'Rust',
+    'go': 'Go',
+    'haskell': 'Haskell',
+    'prolog': 'Prolog',
+    'ruby': 'Ruby',
+    'brainfuck': 'Brainfuck',
+    'lua': 'Lua',
+}
 
 def find_free_port():
     """Find a free port to run the server on."""
@@ -19,6 +38,8 @@ def parse_args():
     parser = argparse.ArgumentParser(description='Run the GoForIt code evaluation server.')
     parser.add_argument('-p', '--port', type=int, help='Port to run the server on (default: random free port)')
     parser.add_argument('--host', help='Host to run the server on (default: 127.0.0.1)')
+    parser.add_argument('--agent', action='append', default=[],
+                        help='Send evaluations to this runner agent (http://host:port or unix:/path), repeatable')
     return parser.parse_args()
 
 def main():
@@ -35,6 +56,20 @@ def main():
     else:
         port = find_free_port()
     
+    # The app reads its agents from the environment when uvicorn imports it
+    if args.agent:
+        os.environ['GOFORIT_AGENTS'] = ','.join(args.agent)
+
+    if os.environ.get('GOFORIT_AGENTS'):
+        language_list = f"- whatever the runner agents at {os.environ['GOFORIT_AGENTS']} have"
+    else:
+        # List the languages whose toolchains are actually installed
+        languages = asyncio.run(available_languages())
+        language_list = "\n".join(
+            f"- {LANGUAGE_NAMES.get(language, language)}" + ("" if available else " (not installed)")
+            for language, available in languages.items()
+        )
+
     # Print welcome message
     print(f"""
 ╭──────────────────────────────────────────╮
@@ -46,15 +81,7 @@ Starting server on {host}:{port}...
 Opening browser...
 
 Available languages:
-- Python
-- JavaScript
-- TypeScript
-- Java
-- C++
-- C
-- C to Assembly
-- Rust
-- Go
+{language_list}
 
 Press Ctrl+C to stop the server.
 """)
@@ -0,0 +1,216 @@
+"""Dispatching evaluations to runner agents (see agent.py).
+
+Agents are listed in GOFORIT_AGENTS, comma separated, as ``http://host:port``
+or ``unix:/path/to.sock``. Each evaluation goes to the least loaded healthy
+agent that has the language's toolchains. Load counts the evaluations this
+server has in flight on the agent, relative to the capacity the agent
+advertises. A session keeps going to the agent that has its build workspace
+while that agent has room. A background task checks every agent's health,
+and an agent that refuses a connection is taken out of rotation until its
+next good check.
+With no agents configured the server runs evaluations itself, as before.
+"""
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+from urllib.parse import quote, urlsplit
+from .agent import options_to_wire, result_from_wire
+from .encoding import dumps_json
+from .runners import CodeResult, RunOptions
+from .runners.disassembly import MAX_INDEXES
+
+# Longest an evaluation may take on an agent; builds, benchmarks and profiles included
+AGENT_TIMEOUT = 300
+
+# (session, language) pairs remembered for sending a session back to the agent holding its workspace
+MAX_AFFINITIES = 1000
+
+HEALTH_INTERVAL = 5
+HEALTH_TIMEOUT = 2
+
+class AgentError(Exception):
+    """An agent couldn't be reached or answered with an error."""
+
+def dechunk(body: bytes) -> bytes:
+    chunks = []
+    while body:
+        size_line, _, rest = body.partition(b'\r\n')
+        size = int(size_line.split(b';')[0], 16)
+        if size == 0:
+            break
+        chunks.append(rest[:size])
+        body = rest[size + 2:]
+    return b''.join(chunks)
+
+async def http_request(address: str, method: str, path: str, body: Optional[bytes] = None,
+                       timeout: float = AGENT_TIMEOUT) -> tuple[int, bytes]:
+    """A one-shot HTTP/1.1 request to an agent, over TCP or a Unix socket."""
+    async def send() -> bytes:
+        if address.startswith('unix:'):
+            reader, writer = await asyncio.open_unix_connection(address[len('unix:'):])
+            host = 'localhost'
+        else:
+            url = urlsplit(address)
+            reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+            host = url.netloc
+        try:
+            head = f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n"
+            if body is not None:
+                head += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+            writer.write(head.encode() + b"\r\n" + (body or b""))
+            await writer.drain()
+            return await reader.read()
+        finally:
+            writer.close()
+
+    response = await asyncio.wait_for(send(), timeout)
+    head, _, payload = response.partition(b'\r\n\r\n')
+    try:
+        status = int(head.split(b' ', 2)[1])
+    except (IndexError, ValueError):
+        raise AgentError(f"Malformed response from {address}")
+    if b'transfer-encoding: chunked' in head.lower():
+        payload = dechunk(payload)
+    return status, payload
+
+@dataclass(eq=False)
+class Agent:
+    address: str
+    languages: frozenset = frozenset()
+    # Toolchain versions, by executable name
+    toolchains: dict = field(default_factory=dict)
+    capacity: int = 1
+    healthy: bool = False
+    # Evaluations this server has sent that haven't come back, and all it has sent
+    active: int = 0
+    dispatched: int = 0
+
+    @property
+    def load(self) -> float:
+        return self.active / max(self.capacity, 1)
+
+    def status(self) -> dict:
+        return {"address": self.address, "healthy": self.healthy, "languages": sorted(self.languages),
+                "capacity": self.capacity, "active": self.active, "dispatched": self.dispatched}
+
+class AgentPool:
+    def __init__(self, addresses: Iterable[str] = ()):
+        self.agents = [Agent(address) for address in addresses]
+        # Which agent holds each disassembly index, for /api/disassembly lookups
+        self._disassembly_agents: "OrderedDict[str, Agent]" = OrderedDict()
+        # Which agent last built each (session, language)
+        self._affinities: "OrderedDict[tuple, Agent]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> "AgentPool":
+        return cls(address.strip() for address in os.environ.get('GOFORIT_AGENTS', '').split(',')
+                   if address.strip())
+
+    def __bool__(self) -> bool:
+        return bool(self.agents)
+
+    async def check(self, agent: Agent) -> None:
+        try:
+            status, body = await http_request(agent.address, 'GET', '/agent/health', timeout=HEALTH_TIMEOUT)
+            info = json.loads(body)
+            agent.languages = frozenset(info["languages"])
+            agent.toolchains = dict(info.get("toolchains", {}))
+            agent.capacity = int(info["capacity"])
+            agent.healthy = status == 200
+        except (OSError, asyncio.TimeoutError, AgentError, ValueError, KeyError, TypeError):
+            agent.healthy = False
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*(self.check(agent) for agent in self.agents))
+
+    async def monitor(self, interval: float = HEALTH_INTERVAL) -> None:
+        while True:
+            await self.check_all()
+            await asyncio.sleep(interval)
+
+    def languages(self) -> set[str]:
+        """Languages some healthy agent can run."""
+        return {language for agent in self.agents if agent.healthy for language in agent.languages}
+
+    def toolchains(self, language: str) -> dict[str, Optional[str]]:
+        """Toolchain versions of the first healthy agent that can run language."""
+        for agent in self.agents:
+            if agent.healthy and language in agent.languages:
+                return agent.toolchains
+        return {}
+
+    def pick(self, language: str, exclude: Iterable[Agent] = (), session: Optional[str] = None) -> Optional[Agent]:
+        """The least loaded healthy agent for language, taking turns between equally loaded ones.
+
+        A session goes back to the agent with its workspace unless that one is at capacity.
+        """
+        excluded = set(exclude)
+        candidates = [agent for agent in self.agents
+                      if agent.healthy and language in agent.languages and agent not in excluded]
+        affine = self._affinities.get((session, language)) if session is not None else None
+        if affine in candidates and affine.active < affine.capacity:
+            return affine
+        return min(candidates, key=lambda agent: (agent.load, agent.dispatched), default=None)
+
+    async def run(self, language: str, code: str, options: Optional[RunOptions] = None) -> CodeResult:
+        """Run code on an agent, moving on to the next one when an agent can't be reached."""
+        body = dumps_json({"language": language, "code": code, "options": options_to_wire(options)})
+        session = options.session if options else None
+        tried = []
+        while True:
+            agent = self.pick(language, tried, session)
+            if agent is None:
+                reason = "every runner agent that has it failed" if tried else "no runner agent has it available"
+                return CodeResult(stderr=f"Can't run {language}: {reason}", return_code=1)
+            tried.append(agent)
+
+            agent.active += 1
+            agent.dispatched += 1
+            try:
+                status, payload = await http_request(agent.address, 'POST', '/agent/run', body)
+            except asyncio.TimeoutError:
+                return CodeResult(stderr=f"Runner agent {agent.address} timed out", return_code=1)
+            except (OSError, AgentError) as e:
+                # Down or restarting; the health check brings it back
+                print(f"Runner agent {agent.address} failed: {e}")
+                agent.healthy = False
+                continue
+            finally:
+                agent.active -= 1
+
+            if status != 200:
+                return CodeResult(stderr=f"Runner agent {agent.address} answered {status}: "
+                                         f"{payload.decode(errors='replace')}", return_code=1)
+            result = result_from_wire(json.loads(payload))
+            self._remember_disassembly(result, agent)
+            if session is not None:
+                self._affinities[(session, language)] = agent
+                self._affinities.move_to_end((session, language))
+                while len(self._affinities) > MAX_AFFINITIES:
+                    self._affinities.popitem(last=False)
+            return result
+
+    def _remember_disassembly(self, result: CodeResult, agent: Agent) -> None:
+        for output in result.code_outputs:
+            index_id = output.metadata.get("disassembly")
+            if index_id:
+                self._disassembly_agents[index_id] = agent
+                self._disassembly_agents.move_to_end(index_id)
+        while len(self._disassembly_agents) > MAX_INDEXES:
+            self._disassembly_agents.popitem(last=False)
+
+    async def disassembly_symbol(self, index_id: str, symbol: str) -> Optional[dict]:
+        """A symbol from a disassembly an agent produced, if that agent still has it."""
+        agent = self._disassembly_agents.get(index_id)
+        if agent is None:
+            return None
+        try:
+            status, payload = await http_request(agent.address, 'GET',
+                                                 f"/agent/disassembly/{quote(index_id)}/{quote(symbol)}",
+                                                 timeout=HEALTH_TIMEOUT)
+        except (OSError, asyncio.TimeoutError, AgentError):
+            return None
+        return json.loads(payload) if status == 200 else None
@@ -0,0 +1,81 @@
+"""Response encoding for evaluation results.
+
+Results are turned into plain dicts and serialized directly, skipping the
+Pydantic validation FastAPI would run on a response_model: a result's big
+strings (objdump text, stdout) never need validating. JSON goes through orjson
+when it's installed. Clients that send ``Accept: application/msgpack`` get
+msgpack (when installed) with binary outputs as raw bytes instead of base64.
+"""
+import gzip
+import json
+from typing import Any
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from .runners import CodeResult
+from .static_assets import accepted_encodings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_TYPES = ('application/msgpack', 'application/x-msgpack')
+
+# Compress bodies at least this big, at the fastest level: objdump and assembly
+# text shrink several times over even then, and it keeps compression cheaper
+# than the serialization it follows
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_LEVEL = 1
+
+def wants_msgpack(headers: Headers) -> bool:
+    accept = headers.get('accept', '')
+    return msgpack is not None and any(media_type in accept for media_type in MSGPACK_TYPES)
+
+def result_payload(result: CodeResult, binary: bool = False) -> dict:
+    """The result as plain data; with binary, outputs with raw bytes keep them under "data"."""
+    code_outputs = []
+    for output in result.code_outputs:
+        if binary and output.data is not None:
+            entry = {"language": output.language, "data": output.data}
+        else:
+            entry = {"language": output.language, "content": output.text()}
+        if output.metadata:
+            entry["metadata"] = output.metadata
+        code_outputs.append(entry)
+    return {
+        "stdout": result.stdout,
+        "stderr": result.stderr,
+        "return_code": result.return_code,
+        "code_outputs": code_outputs,
+        "case_results": [vars(case) for case in result.case_results],
+        "timings": result.timings,
+        "phase": result.phase,
+    }
+
+def dumps_json(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode()
+
+def encode_response(payload: Any, headers: Headers, status_code: int = 200) -> Response:
+    """Serialize payload as msgpack or JSON per Accept, gzipped when it's large and the client allows."""
+    if wants_msgpack(headers):
+        body = msgpack.packb(payload, use_bin_type=True)
+        media_type = 'application/msgpack'
+    else:
+        body = dumps_json(payload)
+        media_type = 'application/json'
+
+    response_headers = {'Vary': 'Accept, Accept-Encoding'}
+    if len(body) >= COMPRESS_MIN_SIZE and 'gzip' in accepted_encodings(headers.get('accept-encoding', '')):
+        body = gzip.compress(body, compresslevel=COMPRESS_LEVEL)
+        response_headers['Content-Encoding'] = 'gzip'
+    return Response(body, status_code=status_code, media_type=media_type, headers=response_headers)
+
+def encode_result(result: CodeResult, headers: Headers) -> Response:
+    return encode_response(result_payload(result, binary=wants_msgpack(headers)), headers)
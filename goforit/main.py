@@ -1,21 +1,61 @@
+import asyncio
 import json
 import os
 import time
-from typing import Optional, List
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from typing import Any, Optional, List, Dict, Union
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
+from fastapi.responses import Response, StreamingResponse, JSONResponse
+from pydantic import BaseModel, Field
 
-from .runners import LANGUAGE_RUNNERS, CodeResult, CodeOutput
+from .runners import LANGUAGE_RUNNERS, CodeResult, CodeOutput, RunOptions, InputCase
+from .runners.benchmark import BenchmarkOptions, MAX_RUNS, MAX_WARMUPS
+from .runners.base import RUN_TIMEOUT
+from .runners.project import check_project_files
 from .graphviz_processor import process_result
+from .batch import evaluate_batch
+from .singleflight import SingleFlight
+from .sessions import SessionStore, Patch, VersionConflict, content_hash
+from .encoding import result_payload, dumps_json, encode_response, encode_result
+from .static_assets import PrecompressedStaticFiles
+from .runners.toolchains import probe_all, available_languages
+from .runners.disassembly import disassembly_store
+from .warmup import warm_up
+from .dispatch import AgentPool
 
-app = FastAPI()
+# Startup progress reported by /api/ready
+readiness = {"probed": False, "warmed": False}
+
+# Runner agents to send evaluations to, from GOFORIT_AGENTS; empty to run them in this process
+agent_pool = AgentPool.from_env()
+
+async def start_up():
+    if agent_pool:
+        # Agents probe and warm up their own toolchains; keep checking on them from here
+        await agent_pool.check_all()
+        readiness["probed"] = readiness["warmed"] = True
+        await agent_pool.monitor()
+        return
+    await probe_all()
+    readiness["probed"] = True
+    languages = await available_languages()
+    await warm_up([language for language, available in languages.items() if available], run_code)
+    readiness["warmed"] = True
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Probe and warm up (or check the agents) in the background so /api/health answers straight away
+    startup = asyncio.ensure_future(start_up())
+    yield
+    startup.cancel()
+
+app = FastAPI(lifespan=lifespan)
 
 # Mount static files
 static_path = os.path.join(os.path.dirname(__file__), "static")
-app.mount("/static", StaticFiles(directory=static_path), name="static")
+static_files = PrecompressedStaticFiles(directory=static_path)
+app.mount("/static", static_files, name="static")
 
 # Enable CORS
 app.add_middleware(
@@ -30,31 +70,210 @@ app.add_middleware(
 SAVE_PATH = "last_code.json"
 DEFAULT_CODE_PATH = os.path.join(os.path.dirname(__file__), "default_code.json")
 
+class InputCaseRequest(BaseModel):
+    input: str = ""
+    expected_output: Optional[str] = None
+
+class BenchmarkRequest(BaseModel):
+    runs: int = Field(10, ge=1, le=MAX_RUNS)
+    warmups: int = Field(2, ge=0, le=MAX_WARMUPS)
+    pin_cpu: bool = True
+
+    def options(self) -> BenchmarkOptions:
+        return BenchmarkOptions(runs=self.runs, warmups=self.warmups, pin_cpu=self.pin_cpu)
+
 class CodeRequest(BaseModel):
     code: str
     language: str
+    stdin: Optional[str] = None
+    cases: List[InputCaseRequest] = []
+    # Share the result of an identical evaluation that's already running. Turn
+    # off for programs whose output depends on time or randomness.
+    coalesce: bool = True
+    # Build and run at each of these levels (e.g. ["O0", "O2", "O3"]) and compare them
+    opt_levels: List[str] = []
+    # Also run the built program repeatedly and report timing statistics
+    benchmark: Optional[BenchmarkRequest] = None
+    # Run under the language's sampling profiler and return a flame graph
+    profile: bool = False
+    # Also run native binaries under cachegrind for instruction, cache and branch counts
+    cachegrind: bool = False
+    # Also report the compiler's own timing of each build phase
+    compile_profile: bool = False
+    # Build in this session's workspace, so incremental compilers reuse the last build's work
+    session_id: Optional[str] = None
+    # Further sources and headers by relative path, built with code as one project
+    files: Dict[str, str] = {}
+
+    def run_options(self) -> RunOptions:
+        return RunOptions(
+            stdin=self.stdin,
+            cases=[InputCase(input=case.input, expected_output=case.expected_output) for case in self.cases],
+            opt_levels=list(self.opt_levels),
+            benchmark=self.benchmark.options() if self.benchmark else None,
+            profile=self.profile,
+            cachegrind=self.cachegrind,
+            compile_profile=self.compile_profile,
+            session=self.session_id,
+            files=dict(self.files)
+        )
+
+    def key(self) -> tuple:
+        if not self.coalesce:
+            # Unique to this request, so it never matches another
+            return ("uncoalesced", id(self))
+        cases = tuple((case.input, case.expected_output) for case in self.cases)
+        benchmark = (self.benchmark.runs, self.benchmark.warmups, self.benchmark.pin_cpu) if self.benchmark else None
+        # The session picks the build workspace, so sessions only share their own builds
+        return (self.language, self.code, self.stdin, cases, tuple(self.opt_levels), benchmark, self.profile,
+                self.cachegrind, self.compile_profile, tuple(sorted(self.files.items())), self.session_id)
 
 class CodeOutputResponse(BaseModel):
     content: str
     language: Optional[str] = None
+    # e.g. a disassembly's id and symbol table, for /api/disassembly
+    metadata: Dict[str, Any] = {}
+
+class CaseResultResponse(BaseModel):
+    input: str
+    stdout: str
+    stderr: str
+    return_code: int
+    duration: float
+    expected_output: Optional[str] = None
+    passed: Optional[bool] = None
 
 class CodeResponse(BaseModel):
     stdout: str
     stderr: str
     return_code: int
     code_outputs: List[CodeOutputResponse] = []
+    case_results: List[CaseResultResponse] = []
+    timings: Dict[str, float] = {}
+    phase: str = "complete"
+
+class BatchItem(CodeRequest):
+    pass
+
+class PatchRequest(BaseModel):
+    start: int
+    end: int
+    text: str
+
+class DeltaRequest(BaseModel):
+    """A /api/evaluate request against a server-held copy of the source.
+
+    Send ``code`` to (re)set the document, or ``patches`` against ``base_version``.
+    ``ack`` is the response_id of the last response the client applied; outputs it
+    already holds come back with their hash and no content.
+    """
+    language: str
+    session_id: Optional[str] = None
+    code: Optional[str] = None
+    base_version: Optional[int] = None
+    patches: List[PatchRequest] = []
+    ack: Optional[int] = None
+    stdin: Optional[str] = None
+    cases: List[InputCaseRequest] = []
+    coalesce: bool = True
+    opt_levels: List[str] = []
+    benchmark: Optional[BenchmarkRequest] = None
+    profile: bool = False
+    cachegrind: bool = False
+    compile_profile: bool = False
+    files: Dict[str, str] = {}
+
+class DeltaOutputResponse(BaseModel):
+    language: Optional[str] = None
+    hash: str
+    content: Optional[str] = None
+    metadata: Dict[str, Any] = {}
+
+class DeltaResponse(BaseModel):
+    session_id: str
+    version: int
+    response_id: int
+    stdout: Optional[str] = None
+    stdout_hash: str
+    stderr: Optional[str] = None
+    stderr_hash: str
+    return_code: int
+    code_outputs: List[DeltaOutputResponse] = []
+    case_results: List[CaseResultResponse] = []
+    timings: Dict[str, float] = {}
+    phase: str = "complete"
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+
+# Evaluations currently running, by CodeRequest.key()
+inflight: SingleFlight[CodeResult] = SingleFlight()
+
+# Documents and sent-output hashes for /api/evaluate/delta clients
+sessions = SessionStore()
+
+def check_supported(request: Union[CodeRequest, DeltaRequest], where: str = "") -> None:
+    """Reject requests for a language, optimization levels or profilers the server can't run."""
+    language = request.language
+    if language not in LANGUAGE_RUNNERS:
+        raise HTTPException(status_code=400, detail=f"Unsupported language{where}: {language}")
+    if agent_pool and language not in agent_pool.languages():
+        raise HTTPException(status_code=503, detail=f"No runner agent is available for {language}{where}")
+    spec = LANGUAGE_RUNNERS.specs[language]
+    unsupported = [level for level in request.opt_levels if level not in spec.opt_levels]
+    if unsupported:
+        raise HTTPException(status_code=400, detail=f"Unsupported optimization levels for {language}{where}: "
+                                                    f"{', '.join(unsupported)}")
+    if request.benchmark and not spec.benchmark:
+        raise HTTPException(status_code=400, detail=f"Benchmarking isn't supported for {language}{where}")
+    if request.profile and not spec.profiles:
+        raise HTTPException(status_code=400, detail=f"Profiling isn't supported for {language}{where}")
+    if request.profile and request.benchmark:
+        # The measured runs would time the sampler, and each would overwrite the profile
+        raise HTTPException(status_code=400, detail=f"Profiling and benchmarking can't be combined{where}")
+    if request.cachegrind and not spec.cachegrind:
+        raise HTTPException(status_code=400, detail=f"Cachegrind isn't supported for {language}{where}")
+    if request.compile_profile and not spec.compile_profile:
+        raise HTTPException(status_code=400, detail=f"Compile profiles aren't supported for {language}{where}")
+    if request.files:
+        if not spec.projects:
+            raise HTTPException(status_code=400, detail=f"Multi-file projects aren't supported for {language}{where}")
+        problem = check_project_files(request.files)
+        if problem:
+            raise HTTPException(status_code=400, detail=f"{problem}{where}")
+
+async def run_code(language: str, code: str, options: Optional[RunOptions] = None) -> CodeResult:
+    """Run code with the language's runner, here or on an agent, and post-process its output."""
+    if agent_pool:
+        result = await agent_pool.run(language, code, options)
+    else:
+        runner = LANGUAGE_RUNNERS[language]
+        result = await runner(code, options)
+
+    # Process output for Graphviz diagrams
+    process_result(result)
+
+    return result
+
+async def run_request(request: CodeRequest) -> CodeResult:
+    """Run a request, attaching to an identical one already in flight unless it opted out."""
+    def evaluate():
+        return run_code(request.language, request.code, request.run_options())
+
+    if not request.coalesce:
+        return await evaluate()
+    return await inflight.run(request.key(), evaluate)
 
 @app.get("/")
 async def read_root():
-    return FileResponse(os.path.join(static_path, "index.html"))
+    return static_files.index_response()
 
-@app.post("/api/evaluate")
-async def evaluate(request: CodeRequest) -> CodeResponse:
+@app.post("/api/evaluate", response_model=CodeResponse)
+async def evaluate(request: CodeRequest, http_request: Request) -> Response:
     start_time = time.time()
     
     # Check language support
-    if request.language not in LANGUAGE_RUNNERS:
-        raise HTTPException(status_code=400, detail=f"Unsupported language: {request.language}")
+    check_supported(request)
     
     # Save the current code
     save_start = time.time()
@@ -64,23 +283,167 @@ async def evaluate(request: CodeRequest) -> CodeResponse:
     
     # Run the code using the appropriate runner
     run_start = time.time()
-    runner = LANGUAGE_RUNNERS[request.language]
-    result = await runner(request.code)
-    
-    # Process output for Graphviz diagrams
-    process_result(result)
-    
+    result = await run_request(request)
     run_time = time.time() - run_start
     
-    # Convert to response model
-    response = CodeResponse(
-        stdout=result.stdout,
-        stderr=result.stderr,
-        return_code=result.return_code,
-        code_outputs=[CodeOutputResponse(**output.__dict__) for output in result.code_outputs]
+    # Serialize directly rather than through the response model, the result needs no validation
+    return encode_result(result, http_request.headers)
+
+@app.post("/api/evaluate/delta", response_model=DeltaResponse)
+async def evaluate_delta(request: DeltaRequest, http_request: Request) -> Response:
+    """Evaluate a session's document after applying the request's edits, returning only changed outputs."""
+    check_supported(request)
+
+    session = sessions.get(request.session_id)
+    try:
+        if request.code is not None:
+            session.reset(request.code)
+        session.apply(request.base_version, [Patch(start=p.start, end=p.end, text=p.text) for p in request.patches])
+    except VersionConflict as e:
+        # The client resends the whole document
+        raise HTTPException(status_code=409, detail=str(e))
+    # Other requests on this session may edit it while this one runs
+    document, version = session.document, session.version
+    acknowledged = session.acknowledged_hashes(request.ack)
+
+    with open(SAVE_PATH, "w") as f:
+        json.dump({"code": document, "language": request.language}, f)
+
+    result = await run_request(CodeRequest(
+        code=document,
+        language=request.language,
+        stdin=request.stdin,
+        cases=request.cases,
+        coalesce=request.coalesce,
+        opt_levels=request.opt_levels,
+        benchmark=request.benchmark,
+        profile=request.profile,
+        cachegrind=request.cachegrind,
+        compile_profile=request.compile_profile,
+        session_id=session.id,
+        files=request.files
+    ))
+
+    # Leave out content the client already has, identified by hash
+    sent = set()
+
+    def unless_acknowledged(content: str) -> tuple:
+        digest = content_hash(content)
+        sent.add(digest)
+        return digest, (None if digest in acknowledged else content)
+
+    stdout_hash, stdout = unless_acknowledged(result.stdout)
+    stderr_hash, stderr = unless_acknowledged(result.stderr)
+    code_outputs = []
+    for output in result.code_outputs:
+        digest, content = unless_acknowledged(output.text())
+        entry = {"language": output.language, "hash": digest, "content": content}
+        if output.metadata:
+            entry["metadata"] = output.metadata
+        code_outputs.append(entry)
+
+    return encode_response({
+        "session_id": session.id,
+        "version": version,
+        "response_id": session.record_response(sent),
+        "stdout": stdout,
+        "stdout_hash": stdout_hash,
+        "stderr": stderr,
+        "stderr_hash": stderr_hash,
+        "return_code": result.return_code,
+        "code_outputs": code_outputs,
+        "case_results": [vars(case) for case in result.case_results],
+        "timings": result.timings,
+        "phase": result.phase,
+    }, http_request.headers)
+
+@app.post("/api/evaluate/batch")
+async def evaluate_batch_endpoint(request: BatchRequest) -> StreamingResponse:
+    """Evaluate many submissions, streaming one NDJSON line per item as it completes."""
+    for index, item in enumerate(request.items):
+        check_supported(item, f" in item {index}")
+
+    async def evaluate_item(item: BatchItem) -> CodeResult:
+        try:
+            return await run_request(item)
+        except Exception as e:
+            return CodeResult(stdout="", stderr=f"Evaluation failed: {str(e)}", return_code=1)
+
+    async def stream():
+        results = evaluate_batch(
+            request.items,
+            evaluate_item,
+            key=BatchItem.key,
+        )
+        async for index, result in results:
+            yield dumps_json({"index": index, **result_payload(result)}) + b"\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@app.get("/api/disassembly/{index_id}/{symbol:path}")
+async def disassembly_symbol(index_id: str, symbol: str):
+    """One symbol of an evaluation's disassembly, for functions left out of the result."""
+    index = disassembly_store.get(index_id)
+    if index is None and agent_pool:
+        # Evaluated on an agent, which keeps the index
+        detail = await agent_pool.disassembly_symbol(index_id, symbol)
+        if detail is not None:
+            return detail
+    if index is None:
+        raise HTTPException(status_code=404, detail="Disassembly expired, evaluate the code again")
+    if symbol not in index.symbols:
+        raise HTTPException(status_code=404, detail=f"No symbol {symbol} in this disassembly")
+    return index.symbols[symbol].detail()
+
+@app.get("/api/health")
+async def health():
+    """Liveness: the server is up and answering requests."""
+    return {"status": "ok"}
+
+@app.get("/api/ready")
+async def ready():
+    """Readiness: toolchains are probed and runners warmed up, so evaluations run at full speed."""
+    is_ready = all(readiness.values())
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"status": "ready" if is_ready else "starting", **readiness}
     )
-    
-    return response
+
+@app.get("/api/agents")
+async def agents():
+    """The runner agents evaluations are dispatched to, with their health and load."""
+    return [agent.status() for agent in agent_pool.agents]
+
+@app.get("/api/languages")
+async def languages():
+    """Each language's runner metadata, with whether its toolchains are installed and their versions.
+
+    With runner agents, a language is available when a healthy agent can run it.
+    """
+    toolchains = await probe_all()
+    entries = []
+    for language, available in (await available_languages()).items():
+        spec = LANGUAGE_RUNNERS.specs[language]
+        if agent_pool:
+            available = language in agent_pool.languages()
+            versions = agent_pool.toolchains(language)
+        else:
+            versions = {name: toolchain.version for name, toolchain in toolchains.items()}
+        entries.append({
+            "language": language,
+            "available": available,
+            "toolchains": {name: versions.get(name) for name in spec.toolchains},
+            "artifacts": list(spec.artifacts),
+            "compile_timeout": spec.compile_timeout,
+            "run_timeout": RUN_TIMEOUT,
+            "opt_levels": list(spec.opt_levels),
+            "benchmark": spec.benchmark,
+            "profiles": spec.profiles,
+            "cachegrind": spec.cachegrind,
+            "compile_profile": spec.compile_profile,
+            "projects": spec.projects,
+        })
+    return entries
 
 @app.get("/api/last-code")
 async def get_last_code():
@@ -1,33 +1,12 @@
-from .c_runner import run_c
-from .cpp_runner import run_cpp
-from .java_runner import run_java
-from .go_runner import run_go
-from .assembly_runner import run_assembly
-from .python_runner import run_python
-from .javascript_runner import run_javascript
-from .typescript_runner import run_typescript
-from .rust_runner import run_rust
-from .haskell_runner import run_haskell
-from .prolog_runner import run_prolog
-from .ruby_runner import run_ruby
-from .brainfuck_runner import run_brainfuck
-from .lua_runner import run_lua
 from .utils import detect_system_arch, format_binary_for_hexdump
-from .base import CodeResult, CodeOutput
+from .base import CodeResult, CodeOutput, RunOptions, InputCase, CaseResult
+from .registry import LANGUAGE_RUNNERS, RunnerSpec, BUILTIN_RUNNERS
 
-LANGUAGE_RUNNERS = {
-    'c': run_c,
-    'cpp': run_cpp,
-    'java': run_java,
-    'go': run_go,
-    'assembly': run_assembly,
-    'python': run_python,
-    'javascript': run_javascript,
-    'typescript': run_typescript,
-    'rust': run_rust,
-    'haskell': run_haskell,
-    'prolog': run_prolog,
-    'ruby': run_ruby,
-    'brainfuck': run_brainfuck,
-    'lua': run_lua,
-}
\ No newline at end of file
+# Runner functions used to be imported here eagerly; keep `from goforit.runners
+# import run_c` working without paying for every runner module on import
+_RUNNER_FUNCTIONS = {spec.target.partition(':')[2]: spec for spec in BUILTIN_RUNNERS}
+
+def __getattr__(name):
+    if name in _RUNNER_FUNCTIONS:
+        return _RUNNER_FUNCTIONS[name].load()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,8 +3,12 @@ import os
 import re
 import asyncio
 from typing import Optional, Tuple
-from .base import CodeResult, CodeOutput, run_process
-from .utils import format_binary_for_hexdump
+from .base import CodeResult, CodeOutput, RunOptions, run_process, run_program
+from .disassembly import disassembly_output
+from .cachegrind import cachegrind_output
+from .registry import BUILTIN_SPECS
+
+COMPILE_TIMEOUT = BUILTIN_SPECS['assembly'].compile_timeout
 
 def parse_arch_and_syntax(code: str) -> Tuple[Optional[str], Optional[str]]:
     """Extract architecture and syntax from code comments."""
@@ -15,7 +19,7 @@ def parse_arch_and_syntax(code: str) -> Tuple[Optional[str], Optional[str]]:
         syntax_match.group(1) if syntax_match else None
     )
 
-async def run_assembly(code: str) -> CodeResult:
+async def run_assembly(code: str, options: Optional[RunOptions] = None) -> CodeResult:
     with tempfile.TemporaryDirectory() as tmpdir:
         # Parse architecture and syntax from comments
         arch, syntax = parse_arch_and_syntax(code)
@@ -39,18 +43,18 @@ async def run_assembly(code: str) -> CodeResult:
             syntax_flag = ['-msyntax=intel'] if syntax == 'intel' else []
             
             assemble_result = await run_process(
-                ['nasm', '-f', format_flag] + syntax_flag + ['-o', obj_file, source_file]
+                ['nasm', '-f', format_flag] + syntax_flag + ['-o', obj_file, source_file], timeout=COMPILE_TIMEOUT
             )
             if assemble_result.return_code != 0:
                 return assemble_result
 
             # Link with default entry point
-            link_result = await run_process(['ld', '-o', os.path.join(tmpdir, 'code'), obj_file])
+            link_result = await run_process(['ld', '-o', os.path.join(tmpdir, 'code'), obj_file], timeout=COMPILE_TIMEOUT)
 
         elif arch == 'arm64':
             # GNU as for ARM64
             obj_file = os.path.join(tmpdir, 'code.o')
-            assemble_result = await run_process(['as', '-o', obj_file, source_file])
+            assemble_result = await run_process(['as', '-o', obj_file, source_file], timeout=COMPILE_TIMEOUT)
             if assemble_result.return_code != 0:
                 return assemble_result
 
@@ -64,7 +68,7 @@ async def run_assembly(code: str) -> CodeResult:
                 '-lSystem',  # Link with system libraries
                 '-syslibroot', '/Library/Developer/CommandLineTools/SDKs/MacOSX.sdk',
                 obj_file
-            ])
+            ], timeout=COMPILE_TIMEOUT)
 
         else:
             return CodeResult(
@@ -86,13 +90,10 @@ async def run_assembly(code: str) -> CodeResult:
             print(f"Error reading binary: {e}")
             binary_data = b''
 
-        # Format binary data as base64
-        hexdump_data = format_binary_for_hexdump(binary_data)
-
         # Run objdump and program in parallel
         tasks = [
             run_process(['objdump', '-d', executable]),  # objdump
-            run_process([executable])                    # program execution
+            run_program([executable], options)           # program execution
         ]
 
         try:
@@ -105,9 +106,10 @@ async def run_assembly(code: str) -> CodeResult:
             return run_result
 
         # Add objdump and hexdump outputs
-        run_result.code_outputs = [
-            CodeOutput(content=objdump_result.stdout, language=f"asm-{arch}"),
-            CodeOutput(content=hexdump_data, language="hexdump-binary")
-        ]
+        outputs = [disassembly_output(objdump_result.stdout, f"asm-{arch}")]
+        if options and options.cachegrind:
+            # nasm writes no line info, so the output is per function (label) only
+            outputs.append(await cachegrind_output([executable], options))
+        run_result.code_outputs += [*outputs, CodeOutput(data=binary_data, language="hexdump-binary")]
 
         return run_result
\ No newline at end of file
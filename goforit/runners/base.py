@@ -1,35 +1,104 @@
 import asyncio
+import base64
 import os
+import shutil
+import tempfile
+import time
 from typing import Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from .benchmark import BenchmarkOptions, benchmark_lock, run_benchmark
+
+# Seconds each run of a user's program may take
+RUN_TIMEOUT = 2
 
 @dataclass
 class CodeOutput:
-    content: str
+    content: str = ""
     language: Optional[str] = None
+    # Raw bytes for binary outputs (e.g. hexdump-binary); text encodings send them base64'd as content
+    data: Optional[bytes] = None
+    # Structured extras for the client, e.g. the symbol table of a disassembly
+    metadata: dict = field(default_factory=dict)
+
+    def text(self) -> str:
+        if self.data is not None:
+            return base64.b64encode(self.data).decode('ascii')
+        return self.content
+
+@dataclass
+class InputCase:
+    """One stdin input to run the program against, with an optional expected stdout."""
+    input: str = ""
+    expected_output: Optional[str] = None
+
+@dataclass
+class CaseResult:
+    input: str
+    stdout: str
+    stderr: str
+    return_code: int
+    duration: float
+    expected_output: Optional[str] = None
+    passed: Optional[bool] = None
+
+@dataclass
+class RunOptions:
+    """Per-evaluation settings that apply to running the built program.
+
+    When ``cases`` is non-empty the program is run once per case instead of once
+    with ``stdin``. Runners that support it build and run the program once per
+    ``opt_levels`` entry (e.g. ``"O2"``) to compare them. With ``benchmark`` the
+    program is also run repeatedly and measured, adding a "benchmark" output.
+    Runners that support ``profile`` run the program under a sampling profiler
+    and add a "flamegraph" output. Native runners that support ``cachegrind`` run
+    the built binary under valgrind's cachegrind and add a "cachegrind" output.
+    With ``compile_profile`` compiled runners add the compiler's timing breakdown
+    of the build as a "compile-profile" output. ``session`` identifies the client
+    across evaluations, for runners that keep a build workspace per session.
+    Runners that build projects compile ``files``, further sources and headers
+    by relative path, along with the code.
+    """
+    stdin: Optional[str] = None
+    cases: list[InputCase] = field(default_factory=list)
+    opt_levels: list[str] = field(default_factory=list)
+    benchmark: Optional[BenchmarkOptions] = None
+    profile: bool = False
+    cachegrind: bool = False
+    compile_profile: bool = False
+    session: Optional[str] = None
+    files: dict[str, str] = field(default_factory=dict)
 
 class CodeResult:
-    def __init__(self, stdout: str = "", stderr: str = "", return_code: int = 0, code_outputs: list[CodeOutput] = None):
+    def __init__(self, stdout: str = "", stderr: str = "", return_code: int = 0, code_outputs: list[CodeOutput] = None,
+                 case_results: list[CaseResult] = None, timings: dict[str, float] = None, phase: str = "complete"):
         self.stdout = stdout
         self.stderr = stderr
         self.return_code = return_code
         self.code_outputs = code_outputs or []
+        self.case_results = case_results or []
+        # Seconds spent in each phase of the evaluation (write, build, run...), for runners that report them
+        self.timings = timings or {}
+        # "diagnostics" when the result is the fast syntax/type check's errors, "complete" otherwise
+        self.phase = phase
 
-async def run_process(cmd: list[str], input_text: Optional[str] = None, timeout: int = 2, cwd: Optional[str] = None) -> CodeResult:
+async def run_process(cmd: list[str], input_text: Optional[str] = None, timeout: int = 2, cwd: Optional[str] = None,
+                      env: Optional[dict[str, str]] = None) -> CodeResult:
+    """Run a command; env, when given, is added on top of the server's environment."""
     print(f"Running process: {' '.join(cmd)} in {cwd}")
     try:
         process = await asyncio.create_subprocess_exec(
             *cmd,
-            stdin=asyncio.subprocess.PIPE if input_text else None,
+            stdin=asyncio.subprocess.PIPE if input_text is not None else None,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
             preexec_fn=os.setsid,
-            cwd=cwd
+            cwd=cwd,
+            env={**os.environ, **env} if env is not None else None
         )
-        
+
         try:
             stdout, stderr = await asyncio.wait_for(
-                process.communicate(input_text.encode() if input_text else None),
+                process.communicate(input_text.encode() if input_text is not None else None),
                 timeout=timeout
             )
             return CodeResult(
@@ -49,4 +118,88 @@ async def run_process(cmd: list[str], input_text: Optional[str] = None, timeout:
             stdout="",
             stderr=f"Failed to execute: {str(e)}",
             return_code=1
-        )
\ No newline at end of file
+        )
+
+async def run_diagnostics(cmd: list[str], timeout: int = 2, cwd: Optional[str] = None) -> Optional[CodeResult]:
+    """Run a compiler's check-only mode ahead of the full build.
+
+    Returns the result when the check found errors, so the caller can report them
+    without building; None when the code is clean or the checker isn't installed.
+    """
+    if shutil.which(cmd[0]) is None:
+        return None
+    result = await run_process(cmd, timeout=timeout, cwd=cwd)
+    if result.return_code == 0:
+        return None
+    result.phase = "diagnostics"
+    return result
+
+def outputs_match(actual: str, expected: str) -> bool:
+    """Compare program output the way most judges do: ignore trailing whitespace on lines and at the end."""
+    def normalize(text: str) -> list[str]:
+        return [line.rstrip() for line in text.rstrip().splitlines()]
+    return normalize(actual) == normalize(expected)
+
+def check_case(case: InputCase, result: CodeResult, duration: float) -> CaseResult:
+    passed = None
+    if case.expected_output is not None:
+        passed = result.return_code == 0 and outputs_match(result.stdout, case.expected_output)
+    return CaseResult(
+        input=case.input,
+        stdout=result.stdout,
+        stderr=result.stderr,
+        return_code=result.return_code,
+        duration=duration,
+        expected_output=case.expected_output,
+        passed=passed
+    )
+
+def summarize_cases(case_results: list[CaseResult]) -> CodeResult:
+    """Build the top-level result for a multi-input run: the first failing case, or the first case."""
+    shown = next(
+        (case for case in case_results if case.return_code != 0 or case.passed is False),
+        case_results[0]
+    )
+    return CodeResult(
+        stdout=shown.stdout,
+        stderr=shown.stderr,
+        return_code=shown.return_code,
+        case_results=case_results
+    )
+
+async def run_program(cmd: list[str], options: Optional[RunOptions] = None, timeout: float = RUN_TIMEOUT,
+                      cwd: Optional[str] = None) -> CodeResult:
+    """Run a user's built program (as opposed to a compiler or tool) with the evaluation's options applied."""
+    options = options or RunOptions()
+    result = await run_program_once(cmd, options, timeout, cwd)
+    if options.benchmark and result.return_code == 0:
+        result.code_outputs.append(await benchmark_program(cmd, options, timeout, cwd))
+    return result
+
+async def benchmark_program(cmd: list[str], options: RunOptions, timeout: int, cwd: Optional[str]) -> CodeOutput:
+    """Measure repeated runs of the program, on its stdin or its first case's input."""
+    stdin = options.cases[0].input if options.cases else options.stdin
+    with tempfile.NamedTemporaryFile('w', suffix='.stdin') as stdin_file:
+        stdin_file.write(stdin or "")
+        stdin_file.flush()
+        async with benchmark_lock():
+            benchmark = await asyncio.get_running_loop().run_in_executor(
+                None, run_benchmark, cmd, options.benchmark, stdin_file.name, timeout, cwd
+            )
+    return CodeOutput(content=benchmark.format(), language="benchmark", metadata=benchmark.summary())
+
+async def run_program_once(cmd: list[str], options: RunOptions, timeout: int, cwd: Optional[str]) -> CodeResult:
+    if not options.cases:
+        return await run_process(cmd, input_text=options.stdin, timeout=timeout, cwd=cwd)
+
+    # Run the one build against every input, a core's worth at a time
+    semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+
+    async def run_case(case: InputCase) -> CaseResult:
+        async with semaphore:
+            start = time.perf_counter()
+            result = await run_process(cmd, input_text=case.input, timeout=timeout, cwd=cwd)
+            return check_case(case, result, time.perf_counter() - start)
+
+    case_results = await asyncio.gather(*(run_case(case) for case in options.cases))
+    return summarize_cases(list(case_results))
@@ -0,0 +1,174 @@
+"""Repeated, measured runs of a built program.
+
+After the evaluation's normal run, the program is run ``warmups`` times
+unmeasured and then ``runs`` times measured. Each measured run is reaped with
+os.wait4, so its CPU time and peak RSS are its own rather than shared with
+whatever else the server is running. Runs go to /dev/null, pinned to one core
+where the OS allows it, and one benchmark runs at a time so they don't compete
+for that core.
+"""
+import asyncio
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Optional
+
+MAX_RUNS = 50
+MAX_WARMUPS = 20
+
+# Measuring stops after this many seconds and reports the runs made so far
+BENCHMARK_BUDGET = 30
+
+# Runs further than this many interquartile ranges outside the quartiles are dropped (Tukey's fences)
+OUTLIER_FENCE = 1.5
+
+# ru_maxrss is in kilobytes on Linux and bytes on macOS
+RSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+# One per event loop. Queued benchmarks wait on it in the loop rather than
+# each holding an executor thread blocked on a threading lock.
+_benchmark_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = \
+    weakref.WeakKeyDictionary()
+
+def benchmark_lock() -> asyncio.Lock:
+    """The lock that keeps benchmarks from running at the same time."""
+    loop = asyncio.get_running_loop()
+    lock = _benchmark_locks.get(loop)
+    if lock is None:
+        lock = _benchmark_locks[loop] = asyncio.Lock()
+    return lock
+
+@dataclass
+class BenchmarkOptions:
+    runs: int = 10
+    warmups: int = 2
+    pin_cpu: bool = True
+
+@dataclass
+class RunSample:
+    wall: float
+    cpu: float
+    max_rss: int
+    return_code: int
+
+@dataclass
+class Benchmark:
+    samples: list[RunSample] = field(default_factory=list)
+    warmups: int = 0
+    cpu: Optional[int] = None
+    # Why measuring stopped early, if it did
+    error: Optional[str] = None
+
+    def kept(self) -> list[RunSample]:
+        """The samples whose wall time isn't an outlier."""
+        if len(self.samples) < 4:
+            return list(self.samples)
+        q1, _, q3 = statistics.quantiles([sample.wall for sample in self.samples], n=4)
+        low, high = q1 - OUTLIER_FENCE * (q3 - q1), q3 + OUTLIER_FENCE * (q3 - q1)
+        return [sample for sample in self.samples if low <= sample.wall <= high]
+
+    def summary(self) -> dict:
+        kept = self.kept()
+        return {
+            "runs": len(self.samples),
+            "warmups": self.warmups,
+            "outliers": len(self.samples) - len(kept),
+            "cpu": self.cpu,
+            "wall": describe([sample.wall for sample in kept]),
+            "cpu_time": describe([sample.cpu for sample in kept]),
+            "peak_rss": max((sample.max_rss for sample in kept), default=None),
+            "error": self.error,
+        }
+
+    def format(self) -> str:
+        summary = self.summary()
+        pinned = f", pinned to CPU {self.cpu}" if self.cpu is not None else ""
+        lines = [f"{summary['runs']} runs after {self.warmups} warmups, "
+                 f"{summary['outliers']} outliers dropped{pinned}"]
+        if self.error:
+            lines.append(f"stopped early: {self.error}")
+        if summary['wall']:
+            lines.append(f"{'':<6}{'min':>12}{'median':>12}{'mean':>12}{'stddev':>12}")
+            for label, stats in (("wall", summary['wall']), ("cpu", summary['cpu_time'])):
+                lines.append(f"{label:<6}" + "".join(format_seconds(stats[key]).rjust(12)
+                                                    for key in ("min", "median", "mean", "stddev")))
+            lines.append(f"peak RSS: {summary['peak_rss'] / (1024 * 1024):.1f} MiB")
+        return "\n".join(lines)
+
+def describe(values: list[float]) -> Optional[dict]:
+    if not values:
+        return None
+    return {
+        "min": min(values),
+        "median": statistics.median(values),
+        "mean": statistics.mean(values),
+        "stddev": statistics.stdev(values) if len(values) > 1 else 0.0,
+    }
+
+def format_seconds(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.3f}s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.3f}ms"
+    return f"{seconds * 1e6:.1f}µs"
+
+def benchmark_cpu() -> Optional[int]:
+    """The core to pin runs to: the last one this process may use, away from the usual first picks."""
+    if not hasattr(os, 'sched_getaffinity'):
+        return None
+    return max(os.sched_getaffinity(0))
+
+def measure_run(cmd: list[str], stdin_path: Optional[str], timeout: float, cwd: Optional[str],
+                cpu: Optional[int]) -> RunSample:
+    with open(stdin_path or os.devnull, 'rb') as stdin:
+        start = time.perf_counter()
+        process = subprocess.Popen(cmd, stdin=stdin, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                   cwd=cwd, start_new_session=True)
+    if cpu is not None:
+        try:
+            os.sched_setaffinity(process.pid, {cpu})
+        except OSError:
+            pass
+
+    timer = threading.Timer(timeout, os.killpg, (process.pid, signal.SIGKILL))
+    timer.start()
+    try:
+        _, status, usage = os.wait4(process.pid, 0)
+    finally:
+        timer.cancel()
+    wall = time.perf_counter() - start
+    # Reaped here, so Popen mustn't wait on it again
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return RunSample(
+        wall=wall,
+        cpu=usage.ru_utime + usage.ru_stime,
+        max_rss=usage.ru_maxrss * RSS_UNIT,
+        return_code=process.returncode
+    )
+
+def run_benchmark(cmd: list[str], options: BenchmarkOptions, stdin_path: Optional[str] = None,
+                  timeout: float = 2, cwd: Optional[str] = None) -> Benchmark:
+    """Warm up and measure cmd; blocking, so call it from an executor while holding benchmark_lock()."""
+    runs = max(1, min(options.runs, MAX_RUNS))
+    warmups = max(0, min(options.warmups, MAX_WARMUPS))
+    cpu = benchmark_cpu() if options.pin_cpu else None
+    benchmark = Benchmark(warmups=warmups, cpu=cpu)
+
+    deadline = time.monotonic() + BENCHMARK_BUDGET
+    for iteration in range(warmups + runs):
+        if time.monotonic() > deadline:
+            benchmark.error = f"over the {BENCHMARK_BUDGET}s budget"
+            break
+        sample = measure_run(cmd, stdin_path, timeout, cwd, cpu)
+        if sample.return_code != 0:
+            benchmark.error = f"run exited with {sample.return_code}"
+            break
+        if iteration >= warmups:
+            benchmark.samples.append(sample)
+    return benchmark
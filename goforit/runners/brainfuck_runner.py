@@ -1,5 +1,7 @@
 import asyncio
-from .base import CodeResult, CodeOutput
+import time
+from typing import Optional
+from .base import CodeResult, CodeOutput, RunOptions, check_case, summarize_cases
 
 class BrainfuckVM:
     def __init__(self, code: str, input_data: str = ""):
@@ -76,12 +78,22 @@ class BrainfuckVM:
 
         return output, debug
 
-async def run_brainfuck(code: str) -> CodeResult:
+async def run_brainfuck(code: str, options: Optional[RunOptions] = None) -> CodeResult:
     # Remove comments (anything that's not a Brainfuck command)
     code = "".join(c for c in code if c in "[]<>+-.,")
+    options = options or RunOptions()
+
+    # Run the program once per input case
+    if options.cases:
+        case_results = []
+        for case in options.cases:
+            start = time.perf_counter()
+            output, _ = BrainfuckVM(code, case.input).run()
+            case_results.append(check_case(case, CodeResult(stdout=output), time.perf_counter() - start))
+        return summarize_cases(case_results)
 
     # Run the program
-    vm = BrainfuckVM(code)
+    vm = BrainfuckVM(code, options.stdin or "")
     output, debug = vm.run()
 
     # If there was debug output, add it as a code output
@@ -1,22 +1,43 @@
 import tempfile
 import os
 import asyncio
-from .base import CodeResult, CodeOutput, run_process
-from .utils import detect_system_arch, format_binary_for_hexdump
+from typing import Optional
+from .base import CodeResult, CodeOutput, RunOptions, run_process, run_program, run_diagnostics
+from .utils import detect_system_arch
+from .disassembly import disassembly_output
+from .opt_levels import compare_opt_levels, gcc_build
+from .cachegrind import cachegrind_output
+from .compile_profile import compile_profile_output, parse_gcc_time_report
+from .project import C_PROJECT, run_project
+from .registry import BUILTIN_SPECS
+
+COMPILE_TIMEOUT = BUILTIN_SPECS['c'].compile_timeout
+
+async def run_c(code: str, options: Optional[RunOptions] = None) -> CodeResult:
+    if options and options.files:
+        return await run_project(C_PROJECT, code, options)
 
-async def run_c(code: str) -> CodeResult:
     with tempfile.TemporaryDirectory() as tmpdir:
         # Write the code to a file
         source_file = os.path.join(tmpdir, 'main.c')
         with open(source_file, 'w') as f:
             f.write(code)
 
+        # Report syntax and type errors before paying for code generation
+        diagnostics = await run_diagnostics(['gcc', '-fsyntax-only', source_file], timeout=COMPILE_TIMEOUT)
+        if diagnostics:
+            return diagnostics
+
+        if options and options.opt_levels:
+            return await compare_opt_levels(options.opt_levels, gcc_build('gcc', source_file, ()),
+                                            tmpdir, "asm-intel", options)
+
         # Get system architecture for objdump output
         arch = detect_system_arch()
 
         # Compile to assembly first
         asm_file = os.path.join(tmpdir, 'main.s')
-        asm_result = await run_process(['gcc', '-S', '-o', asm_file, source_file])
+        asm_result = await run_process(['gcc', '-S', '-o', asm_file, source_file], timeout=COMPILE_TIMEOUT)
         if asm_result.return_code != 0:
             return asm_result
 
@@ -28,9 +49,12 @@ async def run_c(code: str) -> CodeResult:
             print(f"Error reading assembly: {e}")
             asm_output = ""
 
-        # Compile to executable
+        # Compile to executable, with line info so the disassembly can be split into the user's functions
         executable = os.path.join(tmpdir, 'main')
-        compile_result = await run_process(['gcc', '-o', executable, source_file])
+        # -ftime-report prints gcc's time per phase of this build to stderr
+        time_report = ['-ftime-report'] if options and options.compile_profile else []
+        compile_result = await run_process(['gcc', *time_report, '-g', '-o', executable, source_file],
+                                           timeout=COMPILE_TIMEOUT)
         if compile_result.return_code != 0:
             return compile_result
 
@@ -42,13 +66,10 @@ async def run_c(code: str) -> CodeResult:
             print(f"Error reading binary: {e}")
             binary_data = b''
 
-        # Format binary data as base64
-        hexdump_data = format_binary_for_hexdump(binary_data)
-
         # Run objdump and program in parallel
         tasks = [
-            run_process(['objdump', '-d', executable]),  # objdump
-            run_process([executable])                    # program execution
+            run_process(['objdump', '-d', '-l', executable]),  # objdump
+            run_program([executable], options)           # program execution
         ]
 
         try:
@@ -61,10 +82,14 @@ async def run_c(code: str) -> CodeResult:
             return run_result
 
         # Add all outputs
-        run_result.code_outputs = [
+        outputs = [
             CodeOutput(content=asm_output, language="asm-intel"),
-            CodeOutput(content=objdump_result.stdout, language=f"asm-{arch}"),
-            CodeOutput(content=hexdump_data, language="hexdump-binary")
+            disassembly_output(objdump_result.stdout, f"asm-{arch}", source_file),
         ]
+        if options and options.cachegrind:
+            outputs.append(await cachegrind_output([executable], options, source_file))
+        run_result.code_outputs += [*outputs, CodeOutput(data=binary_data, language="hexdump-binary")]
+        if time_report:
+            run_result.code_outputs.append(compile_profile_output(parse_gcc_time_report(compile_result.stderr)))
 
         return run_result
\ No newline at end of file
@@ -0,0 +1,152 @@
+"""Instruction counts, cache misses and branch mispredictions from cachegrind.
+
+The runner's binary is run once more under ``valgrind --tool=cachegrind`` with
+cache and branch simulation on. The counts it writes are exact for the
+simulated machine, so unlike wall time they don't move with load on the host.
+They come back summed per function and per source line.
+"""
+import os
+import re
+import shutil
+import tempfile
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Optional
+from .base import CodeOutput, RunOptions, run_process
+
+# Programs run 20-100x slower under valgrind
+CACHEGRIND_TIMEOUT = 30
+
+# Rows kept in each table, most instructions first
+MAX_ROWS = 50
+
+# Totals derived from cachegrind's raw events (see `valgrind --tool=cachegrind --help`)
+DERIVED_EVENTS = {
+    'instructions': ('Ir',),
+    'D1 misses': ('D1mr', 'D1mw'),
+    'I1 misses': ('I1mr',),
+    'LL misses': ('ILmr', 'DLmr', 'DLmw'),
+    'branches': ('Bc', 'Bi'),
+    'mispredicts': ('Bcm', 'Bim'),
+}
+
+# "(3) name" defines a compressed name, "(3)" refers back to it. Files and
+# functions are numbered separately.
+COMPRESSED_NAME = re.compile(r'^\((\d+)\)(?: (.*))?$')
+
+@dataclass
+class CachegrindProfile:
+    events: list[str] = field(default_factory=list)
+    # (file, function) -> event counts, in the order of events
+    functions: dict = field(default_factory=lambda: defaultdict(list))
+    # (file, line) -> event counts
+    lines: dict = field(default_factory=lambda: defaultdict(list))
+
+    def derived(self, counts: list[int]) -> dict:
+        by_event = dict(zip(self.events, counts))
+        return {name: sum(by_event.get(event, 0) for event in events)
+                for name, events in DERIVED_EVENTS.items()
+                if any(event in self.events for event in events)}
+
+    def totals(self) -> dict:
+        return self.derived(add_counts([], *self.functions.values()))
+
+def add_counts(total: list[int], *counts: list[int]) -> list[int]:
+    for row in counts:
+        if len(total) < len(row):
+            total.extend([0] * (len(row) - len(total)))
+        for i, count in enumerate(row):
+            total[i] += count
+    return total
+
+def parse_cachegrind(text: str) -> CachegrindProfile:
+    profile = CachegrindProfile()
+    file_names, function_names = {}, {}
+    file = function_file = function = None
+
+    def name(value: str, names: dict) -> str:
+        match = COMPRESSED_NAME.match(value)
+        if not match:
+            return value
+        if match.group(2) is not None:
+            names[match.group(1)] = match.group(2)
+        return names.get(match.group(1), value)
+
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        key, sep, value = line.partition('=')
+        if sep and key == 'fl':
+            file = function_file = name(value, file_names)
+        elif sep and key in ('fi', 'fe'):
+            # Inlined code from another file, still counted toward the current function
+            file = name(value, file_names)
+        elif sep and key == 'fn':
+            function = name(value, function_names)
+            file = function_file
+        elif line.startswith('events:'):
+            profile.events = line.split(':', 1)[1].split()
+        elif line[0].isdigit() and function is not None:
+            number, *counts = (int(field) for field in line.split())
+            add_counts(profile.functions[(function_file, function)], counts)
+            add_counts(profile.lines[(file, number)], counts)
+    return profile
+
+def format_profile(profile: CachegrindProfile, source_lines: list[str], source_file: Optional[str]) -> tuple[str, dict]:
+    """The text tables and the structured data for the output's metadata."""
+    row = profile.derived
+    functions = sorted(profile.functions.items(), key=lambda item: -(item[1] or [0])[0])[:MAX_ROWS]
+    lines = sorted(((key, counts) for key, counts in profile.lines.items() if key[0] == source_file),
+                   key=lambda item: -(item[1] or [0])[0])[:MAX_ROWS]
+
+    columns = list(profile.totals())
+    header = "".join(f"{column:>14}" for column in columns)
+    text = [f"{'totals':<44}" + "".join(f"{value:>14,}" for value in profile.totals().values()), "",
+            f"{'function':<44}{header}"]
+    for (file, function), counts in functions:
+        text.append(f"{function[:43]:<44}" + "".join(f"{value:>14,}" for value in row(counts).values()))
+    if lines:
+        text += ["", f"{'line':<44}{header}"]
+        for (_, number), counts in sorted(lines, key=lambda item: item[0][1]):
+            source = source_lines[number - 1].strip() if 0 < number <= len(source_lines) else ""
+            text.append(f"{number:>4}  {source[:38]:<38}" + "".join(f"{value:>14,}" for value in row(counts).values()))
+
+    metadata = {
+        "events": profile.events,
+        "totals": profile.totals(),
+        "functions": [{"file": file, "function": function, **row(counts)} for (file, function), counts in functions],
+        "lines": [{"line": number, "source": source_lines[number - 1] if 0 < number <= len(source_lines) else "",
+                   **row(counts)}
+                  for (_, number), counts in lines],
+    }
+    return "\n".join(text), metadata
+
+async def cachegrind_output(cmd: list[str], options: Optional[RunOptions] = None,
+                            source_file: Optional[str] = None) -> CodeOutput:
+    """Run cmd under cachegrind and tabulate its counts per function and per line of source_file."""
+    if shutil.which('valgrind') is None:
+        return CodeOutput(content="valgrind is not installed", language="cachegrind",
+                          metadata={"error": "valgrind is not installed"})
+
+    options = options or RunOptions()
+    stdin = options.cases[0].input if options.cases else options.stdin
+    with tempfile.TemporaryDirectory() as tmpdir:
+        out_file = os.path.join(tmpdir, 'cachegrind.out')
+        result = await run_process([
+            'valgrind', '--tool=cachegrind', '--cache-sim=yes', '--branch-sim=yes',
+            f'--cachegrind-out-file={out_file}',
+            *cmd
+        ], input_text=stdin, timeout=CACHEGRIND_TIMEOUT)
+        try:
+            with open(out_file) as f:
+                profile = parse_cachegrind(f.read())
+        except FileNotFoundError:
+            message = result.stderr or "cachegrind produced no output"
+            return CodeOutput(content=message, language="cachegrind", metadata={"error": message})
+
+    source_lines = []
+    if source_file:
+        with open(source_file) as f:
+            source_lines = f.read().splitlines()
+    content, metadata = format_profile(profile, source_lines, source_file)
+    return CodeOutput(content=content, language="cachegrind", metadata=metadata)
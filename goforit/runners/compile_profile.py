@@ -0,0 +1,134 @@
+"""The compiler's own timing breakdown of a build, as one table for every compiler.
+
+Each compiler reports differently: gcc and g++ print ``-ftime-report``, rustc
+prints ``-Z time-passes``, ``go build -debug-actiongraph`` writes each
+compile and link step as JSON, and GHC prints ``-ddump-timings``. All of them
+become a list of phases with their wall time and, where the compiler reports
+it, the memory they took.
+"""
+import json
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from .base import CodeOutput
+
+# Rows kept in the table, slowest first
+MAX_PHASES = 30
+
+SIZE_UNITS = {'': 1, 'k': 1 << 10, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+
+@dataclass
+class Phase:
+    name: str
+    seconds: float
+    # Bytes the phase allocated or grew memory by, when the compiler reports it
+    memory: Optional[int] = None
+
+@dataclass
+class CompileProfile:
+    compiler: str
+    phases: list[Phase]
+    # Wall time of the whole build, which nested phases would double count
+    total: float
+    note: Optional[str] = None
+
+def parse_size(value: str) -> int:
+    match = re.fullmatch(r'([+-]?\d+)\s*([kKMG]?)B?', value)
+    return int(match.group(1)) * SIZE_UNITS[match.group(2)] if match else 0
+
+def parse_gcc_time_report(text: str) -> CompileProfile:
+    """gcc's -ftime-report: usr, sys and wall seconds then GC heap size for each timevar.
+
+    Rows starting with "phase" are the top-level phases, "|" marks a timevar
+    that's also counted inside others (name lookup, overload resolution).
+    """
+    phases, total = [], 0.0
+    for line in text.splitlines():
+        name, sep, values = line.partition(' : ')
+        if not sep:
+            continue
+        # Drop the "( 12%)" shares, leaving usr, sys, wall and GGC
+        fields = re.sub(r'\(\s*\d+%\)', ' ', values).split()
+        try:
+            wall = float(fields[2])
+        except (IndexError, ValueError):
+            continue
+        memory = parse_size(fields[3]) if len(fields) > 3 else None
+        name = name.strip().lstrip('|')
+        if name == 'TOTAL':
+            total = wall
+        else:
+            phases.append(Phase(name, wall, memory))
+    return CompileProfile('gcc', phases, total)
+
+def parse_rustc_time_passes(text: str) -> CompileProfile:
+    """rustc's -Z time-passes: seconds, RSS before and after, and the pass name. Passes nest."""
+    pattern = re.compile(r'^time:\s+([\d.]+);\s+rss:\s+\S+\s+->\s+\S+\s+\(\s*([+-]?\d+[KMG]?B)\)\s+(\S+)')
+    phases, total = [], 0.0
+    for line in text.splitlines():
+        match = pattern.match(line)
+        if not match:
+            continue
+        seconds, memory, name = float(match.group(1)), parse_size(match.group(2)), match.group(3)
+        if name == 'total':
+            total = seconds
+        else:
+            phases.append(Phase(name, seconds, memory))
+    return CompileProfile('rustc', phases, total)
+
+def action_time(timestamp: str) -> float:
+    # Go writes nanoseconds, which older Pythons' fromisoformat refuses. Every
+    # action shares the build's time zone, so it's left out.
+    match = re.match(r'(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(\.\d+)?', timestamp)
+    return datetime.strptime(match.group(1), '%Y-%m-%dT%H:%M:%S').timestamp() + float(match.group(2) or 0)
+
+def parse_go_actiongraph(text: str) -> CompileProfile:
+    """go build -debug-actiongraph: one phase per compile or link that ran, not per cached package."""
+    actions = json.loads(text)
+    phases, cached = [], 0
+    for action in actions:
+        if action.get('Cmd'):
+            name = 'link' if action['Mode'] == 'link' else f"compile {action['Package']}"
+            phases.append(Phase(name, action.get('CmdReal', 0) / 1e9))
+        elif action.get('Mode') == 'build':
+            cached += 1
+    times = [(action_time(action['TimeStart']), action_time(action['TimeDone']))
+             for action in actions if action.get('TimeStart') and action.get('TimeDone')]
+    total = max(done for _, done in times) - min(start for start, _ in times) if times else 0.0
+    return CompileProfile('go', phases, total, note=f"build cache: {cached} packages" if cached else None)
+
+def parse_ghc_timings(text: str) -> CompileProfile:
+    """GHC's -ddump-timings: ``Parser [Main]: alloc=4456056 time=1.722``, time in milliseconds."""
+    pattern = re.compile(r'^(.+?): alloc=(\d+) time=([\d.]+)')
+    phases = []
+    for line in text.splitlines():
+        match = pattern.match(line)
+        if match:
+            phases.append(Phase(match.group(1), float(match.group(3)) / 1000, int(match.group(2))))
+    return CompileProfile('ghc', phases, sum(phase.seconds for phase in phases))
+
+def format_size(size: Optional[int]) -> str:
+    if size is None:
+        return ""
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024:
+            return f"{size}{unit}" if unit == 'B' else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+def compile_profile_output(profile: CompileProfile) -> CodeOutput:
+    """A "compile-profile" output: the slowest phases as a table, with the rows in metadata."""
+    phases = sorted(profile.phases, key=lambda phase: -phase.seconds)[:MAX_PHASES]
+    rows = [{"phase": phase.name, "seconds": phase.seconds,
+             "share": phase.seconds / profile.total if profile.total else 0.0, "memory": phase.memory}
+            for phase in phases]
+
+    lines = [f"{profile.compiler} build: {profile.total:.3f}s" + (f" ({profile.note})" if profile.note else ""), "",
+             f"{'phase':<44}{'seconds':>10}{'share':>8}{'memory':>10}"]
+    for row in rows:
+        lines.append(f"{row['phase'][:43]:<44}{row['seconds']:>10.3f}{row['share']:>8.1%}"
+                     f"{format_size(row['memory']):>10}")
+    return CodeOutput(content="\n".join(lines), language="compile-profile",
+                      metadata={"compiler": profile.compiler, "total": profile.total, "note": profile.note,
+                                "phases": rows})
@@ -0,0 +1,170 @@
+"""Symbol-indexed disassembly.
+
+``objdump -d -l`` output for a whole linked executable is mostly C runtime
+startup code and PLT stubs. It's parsed here into one entry per symbol, and
+only the user's own functions are sent with the result. The rest stay in
+``disassembly_store`` for ``/api/disassembly`` to hand out when asked for.
+"""
+import hashlib
+import os
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Union
+from .base import CodeOutput
+
+# Indexes kept for on-demand symbol requests, least recently used dropped first
+MAX_INDEXES = 64
+
+SECTION_LINE = re.compile(r'^Disassembly of section (\S+):$')
+SYMBOL_LINE = re.compile(r'^([0-9a-f]+) <(.+)>:$')
+INSTRUCTION_LINE = re.compile(r'^\s*([0-9a-f]+):\s+(.*)$')
+# "/tmp/abc/main.c:12" or "main.c:12 (discriminator 1)", from objdump -l
+SOURCE_LINE = re.compile(r'^(\S+):(\d+)(?: \(discriminator \d+\))?$')
+# "main():", the function name objdump -l prints under the symbol
+FUNCTION_LINE = re.compile(r'^\S+\(\):$')
+
+@dataclass
+class Instruction:
+    address: int
+    size: int
+    text: str
+    # Source line it was generated from, when built with debug info
+    line: Optional[int] = None
+
+@dataclass
+class Symbol:
+    name: str
+    section: str
+    start: int
+    end: int = 0
+    # Defined in the user's source rather than the C runtime or libraries
+    user: bool = False
+    instructions: List[Instruction] = field(default_factory=list)
+    # The symbol's disassembly as objdump printed it, source paths shortened
+    lines: List[str] = field(default_factory=list)
+    sources: set = field(default_factory=set)
+
+    def render(self) -> str:
+        return "\n".join(self.lines)
+
+    def summary(self) -> dict:
+        return {"name": self.name, "section": self.section, "start": self.start, "end": self.end, "user": self.user}
+
+    def detail(self) -> dict:
+        return {
+            **self.summary(),
+            "content": self.render(),
+            "instructions": [vars(instruction) for instruction in self.instructions],
+        }
+
+@dataclass
+class DisassemblyIndex:
+    id: str
+    # The "file format" line objdump starts with
+    header: str
+    symbols: Dict[str, Symbol] = field(default_factory=dict)
+
+    def render(self, user_only: bool = True) -> str:
+        """objdump-style text for the (user) symbols, grouped under their sections."""
+        parts = [self.header] if self.header else []
+        section = None
+        for symbol in self.symbols.values():
+            if user_only and not symbol.user:
+                continue
+            if symbol.section != section:
+                section = symbol.section
+                parts.append(f"\nDisassembly of section {section}:")
+            parts.append("\n" + symbol.render())
+        return "\n".join(parts) + "\n"
+
+    def metadata(self) -> dict:
+        return {"disassembly": self.id, "symbols": [symbol.summary() for symbol in self.symbols.values()]}
+
+def parse_objdump(text: str, source_file: Union[str, Iterable[str], None] = None) -> DisassemblyIndex:
+    """Index objdump -d (optionally -l) output by symbol.
+
+    With source_file (or several, for a multi-file project), symbols whose debug
+    line info points into one are the user's. Without one, or when there's no
+    line info to go by, every symbol is.
+    """
+    user_sources = {source_file} if isinstance(source_file, str) else set(source_file or ())
+    index = DisassemblyIndex(id=hashlib.blake2b(text.encode(), digest_size=8).hexdigest(), header="")
+    section = ""
+    symbol = None
+    line = None
+
+    for raw in text.splitlines():
+        if not raw.strip():
+            continue
+        if not index.header and 'file format' in raw:
+            index.header = raw.strip()
+            continue
+        match = SECTION_LINE.match(raw)
+        if match:
+            section = match.group(1)
+            symbol = None
+            continue
+        match = SYMBOL_LINE.match(raw)
+        if match:
+            symbol = Symbol(name=match.group(2), section=section, start=int(match.group(1), 16))
+            symbol.end = symbol.start
+            symbol.lines.append(raw)
+            # The same name can appear twice (e.g. local symbols); keep both
+            name = symbol.name
+            while name in index.symbols:
+                name += "'"
+            index.symbols[name] = symbol
+            line = None
+            continue
+        if symbol is None or FUNCTION_LINE.match(raw):
+            continue
+        match = INSTRUCTION_LINE.match(raw)
+        if match:
+            # Bytes, then the instruction after a tab; continuation lines have only bytes
+            raw_bytes, _, instruction = match.group(2).partition('\t')
+            address = int(match.group(1), 16)
+            size = len(raw_bytes.split())
+            if instruction.strip():
+                symbol.instructions.append(Instruction(address=address, size=size, text=instruction.strip(), line=line))
+            elif symbol.instructions:
+                symbol.instructions[-1].size += size
+            symbol.end = max(symbol.end, address + size)
+            symbol.lines.append(raw)
+            continue
+        match = SOURCE_LINE.match(raw)
+        if match:
+            symbol.sources.add(match.group(1))
+            line = int(match.group(2))
+            symbol.lines.append(f"{os.path.basename(match.group(1))}:{line}")
+
+    has_line_info = any(symbol.sources for symbol in index.symbols.values())
+    for symbol in index.symbols.values():
+        symbol.user = not user_sources or not has_line_info or bool(user_sources & symbol.sources)
+    return index
+
+class DisassemblyStore:
+    def __init__(self, max_indexes: int = MAX_INDEXES):
+        self.max_indexes = max_indexes
+        self._indexes: "OrderedDict[str, DisassemblyIndex]" = OrderedDict()
+
+    def add(self, index: DisassemblyIndex) -> None:
+        self._indexes[index.id] = index
+        self._indexes.move_to_end(index.id)
+        while len(self._indexes) > self.max_indexes:
+            self._indexes.popitem(last=False)
+
+    def get(self, index_id: str) -> Optional[DisassemblyIndex]:
+        index = self._indexes.get(index_id)
+        if index is not None:
+            self._indexes.move_to_end(index_id)
+        return index
+
+disassembly_store = DisassemblyStore()
+
+def disassembly_output(objdump_text: str, language: str,
+                       source_file: Union[str, Iterable[str], None] = None) -> CodeOutput:
+    """A CodeOutput with the user's functions, keeping the full index for later lookups."""
+    index = parse_objdump(objdump_text, source_file)
+    disassembly_store.add(index)
+    return CodeOutput(content=index.render(), language=language, metadata=index.metadata())
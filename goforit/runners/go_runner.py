@@ -4,8 +4,11 @@ import re
 import time
 import asyncio
 import shlex
-from .base import CodeResult, CodeOutput, run_process
-from .utils import detect_system_arch, format_binary_for_hexdump
+from typing import Optional
+from .base import CodeResult, CodeOutput, RunOptions, run_process, run_program, run_diagnostics
+from .compile_profile import compile_profile_output, parse_go_actiongraph
+from .utils import detect_system_arch, cache_dir, trim_cache_dir
+from .registry import BUILTIN_SPECS
 
 def parse_build_flags(code: str) -> list[str]:
     """Extract build flags from first line comment."""
@@ -16,8 +19,31 @@ def parse_build_flags(code: str) -> list[str]:
     # Use shlex to properly handle quoted strings
     return shlex.split(flags_match.group(1))
 
-async def run_go(code: str) -> CodeResult:
-    start_time = time.time()
+# Building against a cold cache compiles the runtime and standard library
+BUILD_TIMEOUT = BUILTIN_SPECS['go'].compile_timeout
+
+# The shared GOCACHE is trimmed back under this size, at most once per TRIM_INTERVAL seconds
+GO_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+TRIM_INTERVAL = 600
+
+_last_trim = 0.0
+
+def go_cache() -> str:
+    """The GOCACHE shared by every evaluation, so the standard library is compiled once."""
+    return cache_dir('go-build')
+
+def schedule_cache_trim(path: str) -> None:
+    global _last_trim
+    now = time.monotonic()
+    if _last_trim and now - _last_trim < TRIM_INTERVAL:
+        return
+    _last_trim = now
+    # Walking the cache is blocking file I/O, keep it off the event loop
+    asyncio.get_running_loop().run_in_executor(None, trim_cache_dir, path, GO_CACHE_MAX_BYTES)
+
+async def run_go(code: str, options: Optional[RunOptions] = None) -> CodeResult:
+    start_time = time.perf_counter()
+    timings = {}
     with tempfile.TemporaryDirectory() as tmpdir:
         # Parse build flags
         build_flags = parse_build_flags(code)
@@ -40,25 +66,38 @@ async def run_go(code: str) -> CodeResult:
         
         with open(main_go, 'w') as f:
             f.write('\n'.join(code_lines))
-        write_time = time.time() - start_time
+        timings['write'] = time.perf_counter() - start_time
+
+        # gofmt parses without type-checking or touching the build cache, so
+        # syntax errors come back in milliseconds
+        check_start = time.perf_counter()
+        diagnostics = await run_diagnostics(['gofmt', '-e', '-l', main_go])
+        timings['diagnostics'] = time.perf_counter() - check_start
+        if diagnostics:
+            diagnostics.timings = timings
+            return diagnostics
 
-        # Build the program with -mod=mod to avoid needing go.mod
-        build_start = time.time()
+        # Build the program with -mod=mod to avoid needing go.mod. The same build
+        # prints the compiler's assembly for package main to stderr (replayed
+        # from the cache when the package is unchanged).
+        build_start = time.perf_counter()
         executable = os.path.join(tmpdir, 'main')
-        build_cmd = ['go', 'build', '-mod=mod', '-o', executable]
+        build_cmd = ['go', 'build', '-mod=mod', '-gcflags=-S', '-o', executable]
         build_cmd.extend(build_flags)
+        # The action graph records how long each compile and link step took
+        actiongraph = os.path.join(tmpdir, 'actiongraph.json')
+        if options and options.compile_profile:
+            build_cmd.append(f'-debug-actiongraph={actiongraph}')
         build_cmd.append(main_go)
-        
-        build_result = await run_process(build_cmd)
+
+        cache = go_cache()
+        build_result = await run_process(build_cmd, timeout=BUILD_TIMEOUT, cwd=tmpdir, env={'GOCACHE': cache})
+        timings['build'] = time.perf_counter() - build_start
+        schedule_cache_trim(cache)
         if build_result.return_code != 0:
-            print(f"Write time: {write_time:.3f}s")
-            print(f"Build time: {time.time() - build_start:.3f}s")
+            build_result.timings = timings
             return build_result
-        build_time = time.time() - build_start
 
-        # Run everything in parallel: go build -gcflags=-S and program execution
-        parallel_start = time.time()
-        
         # Read binary for hexdump, but only read first 1KB to avoid runtime
         try:
             with open(executable, 'rb') as f:
@@ -67,49 +106,25 @@ async def run_go(code: str) -> CodeResult:
             print(f"Error reading binary: {e}")
             binary_data = b''
 
-        # Format binary data as base64
-        hexdump_data = format_binary_for_hexdump(binary_data)
-        
-        # Create tasks for parallel execution
-        tasks = [
-            # Get assembly from go build with -gcflags=-S, using shell to redirect stderr to stdout
-            run_process(['sh', '-c', 'go build -mod=mod -gcflags=-S ' + main_go + ' 2>&1']),
-            run_process([executable])                    # program execution
-        ]
-        
-        # Run all tasks in parallel and wait for results
-        try:
-            results = await asyncio.gather(*tasks)
-            asm_result, run_result = results
-        except Exception as e:
-            print(f"Error in parallel execution: {e}")
-            return CodeResult(stdout="", stderr=str(e), return_code=1)
+        run_start = time.perf_counter()
+        run_result = await run_program([executable], options)
+        timings['run'] = time.perf_counter() - run_start
+        timings['total'] = time.perf_counter() - start_time
+        run_result.timings = timings
 
-        parallel_time = time.time() - parallel_start
-        
-        # Check for errors
-        if asm_result.return_code != 0:
-            print(f"Write time: {write_time:.3f}s")
-            print(f"Build time: {build_time:.3f}s")
-            print(f"Parallel time: {parallel_time:.3f}s")
-            return asm_result
         if run_result.return_code != 0:
-            print(f"Write time: {write_time:.3f}s")
-            print(f"Build time: {build_time:.3f}s")
-            print(f"Parallel time: {parallel_time:.3f}s")
             return run_result
         
         # Add compiler assembly and hexdump outputs
-        run_result.code_outputs = [
-            CodeOutput(content=asm_result.stdout, language="asm-go"),
-            CodeOutput(content=hexdump_data, language="hexdump-binary")  # Note the new language type
+        run_result.code_outputs += [
+            CodeOutput(content=build_result.stderr, language="asm-go"),
+            CodeOutput(data=binary_data, language="hexdump-binary")  # Note the new language type
         ]
+        if options and options.compile_profile:
+            try:
+                with open(actiongraph) as f:
+                    run_result.code_outputs.append(compile_profile_output(parse_go_actiongraph(f.read())))
+            except (OSError, ValueError) as e:
+                print(f"Error reading action graph: {e}")
 
-        # Print timing info
-        print(f"\nGo runner timing:")
-        print(f"Write time:     {write_time:.3f}s")
-        print(f"Build time:     {build_time:.3f}s")
-        print(f"Parallel time:  {parallel_time:.3f}s")
-        print(f"Total time:     {time.time() - start_time:.3f}s")
-        
-        return run_result
\ No newline at end of file
+        return run_result
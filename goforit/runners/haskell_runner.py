@@ -1,41 +1,77 @@
 import tempfile
 import os
-import asyncio
-from .base import CodeResult, CodeOutput, run_process
+import glob
+import shutil
+from typing import Optional
+from .base import CodeResult, CodeOutput, RunOptions, run_process, run_program
+from .compile_profile import compile_profile_output, parse_ghc_timings
+from .workspace import build_workspace, write_if_changed
+from .registry import BUILTIN_SPECS
 
-async def run_haskell(code: str) -> CodeResult:
+# GHC is the slowest toolchain here, an -O2 build easily takes longer than the default 2s
+COMPILE_TIMEOUT = BUILTIN_SPECS['haskell'].compile_timeout
+
+def read_dump(build_dir: str, kind: str) -> str:
+    # GHC names the dump after the module, e.g. Main.dump-simpl
+    for dump_file in glob.glob(os.path.join(build_dir, f'*.dump-{kind}')):
+        with open(dump_file, 'r') as f:
+            return f.read()
+    return ""
+
+async def run_haskell(code: str, options: Optional[RunOptions] = None) -> CodeResult:
     with tempfile.TemporaryDirectory() as tmpdir:
-        # Write the code to a file
-        source_file = os.path.join(tmpdir, 'Main.hs')
-        with open(source_file, 'w') as f:
-            f.write(code)
-
-        # Compile to Core (GHC's intermediate representation)
-        core_result = await run_process(['ghc', '-ddump-simpl', '-dsuppress-all', source_file])
-        core_output = core_result.stderr  # GHC dumps Core to stderr
-
-        # Compile and run
-        executable = os.path.join(tmpdir, 'Main')
-        compile_cmd = [
-            'ghc',
-            '-O2',                  # Aggressive optimization
-            '-no-keep-hi-files',   # Don't keep interface files
-            '-no-keep-o-files',    # Don't keep object files
-            '-o', executable,
-            source_file
-        ]
-        compile_result = await run_process(compile_cmd)
-        if compile_result.return_code != 0:
-            return compile_result
+        # Build products stay in the session's workspace so GHC's recompilation
+        # avoidance can skip unchanged modules. Evaluations without a session
+        # share one, as GHC can't share an output directory between concurrent builds.
+        async with build_workspace('haskell', options, shared=True) as build_dir:
+            # Write the code to a file
+            source_file = os.path.join(build_dir, 'Main.hs')
+            write_if_changed(source_file, code)
+
+            # Timing a build means doing it, even when the module is unchanged
+            compile_profile = options is not None and options.compile_profile
+            timings = ['-ddump-timings', '-fforce-recomp'] if compile_profile else []
+
+            # Compile once with optimizations, dumping the simplified Core of that same build to a file
+            compile_cmd = [
+                'ghc',
+                '-O2',                  # Aggressive optimization
+                '-ddump-simpl',         # Core (GHC's intermediate representation) after optimization
+                '-dsuppress-all',
+                *timings,
+                '-ddump-to-file',       # Dump into the build dir instead of mixing with diagnostics
+                '-outputdir', build_dir,
+                '-dumpdir', build_dir,
+                '-o', os.path.join(build_dir, 'Main'),
+                source_file
+            ]
+            compile_result = await run_process(compile_cmd, timeout=COMPILE_TIMEOUT)
+            if compile_result.return_code != 0:
+                return compile_result
+
+            # An up-to-date build is skipped by GHC, the dump from the build that produced it still applies
+            core_output = read_dump(build_dir, 'simpl')
+            if compile_profile:
+                # Module phases are dumped to the file, steps outside a module (linking) may print instead
+                profile = parse_ghc_timings(read_dump(build_dir, 'timings') + "\n" + compile_result.stdout)
+
+            # Snapshot the binary so the next build can proceed while this one runs
+            executable = os.path.join(tmpdir, 'Main')
+            try:
+                os.link(os.path.join(build_dir, 'Main'), executable)
+            except OSError:
+                shutil.copy2(os.path.join(build_dir, 'Main'), executable)
 
         # Run the program
-        run_result = await run_process([executable])
+        run_result = await run_program([executable], options)
         if run_result.return_code != 0:
             return run_result
 
         # Add Core output
-        run_result.code_outputs = [
+        run_result.code_outputs += [
             CodeOutput(content=core_output, language="haskell-core"),
         ]
+        if compile_profile:
+            run_result.code_outputs.append(compile_profile_output(profile))
 
-        return run_result
\ No newline at end of file
+        return run_result
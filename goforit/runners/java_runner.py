@@ -2,10 +2,11 @@ import tempfile
 import os
 import re
 import asyncio
-from .base import CodeResult, CodeOutput, run_process
-from .utils import format_binary_for_hexdump
+from typing import Optional
+from .base import CodeResult, CodeOutput, RunOptions, run_process, run_program
+from .java_service import COMPILE_TIMEOUT, compile_service, cds_flags
 
-async def run_java(code: str) -> CodeResult:
+async def run_java(code: str, options: Optional[RunOptions] = None) -> CodeResult:
     with tempfile.TemporaryDirectory() as tmpdir:
         # Extract class name from code
         class_match = re.search(r'class\s+(\w+)', code)
@@ -22,10 +23,19 @@ async def run_java(code: str) -> CodeResult:
         with open(source_file, 'w') as f:
             f.write(code)
 
-        # Compile the code
-        compile_result = await run_process(['javac', source_file])
-        if compile_result.return_code != 0:
-            return compile_result
+        # Compile in the resident compile service, which also disassembles the
+        # class so javap doesn't need a JVM of its own. Its errors come back
+        # before anything is written or run, so they're the diagnostics pass.
+        javap_output = None
+        try:
+            ok, diagnostics, javap_output = await compile_service.compile(class_name, code, tmpdir)
+            if not ok:
+                return CodeResult(stdout="", stderr=diagnostics, return_code=1, phase="diagnostics")
+        except Exception as e:
+            print(f"Compile service unavailable, falling back to javac: {e}")
+            compile_result = await run_process(['javac', source_file], timeout=COMPILE_TIMEOUT)
+            if compile_result.return_code != 0:
+                return compile_result
 
         # Read class file for hexdump
         class_file = os.path.join(tmpdir, f'{class_name}.class')
@@ -36,17 +46,18 @@ async def run_java(code: str) -> CodeResult:
             print(f"Error reading class file: {e}")
             binary_data = b''
 
-        # Format binary data as base64
-        hexdump_data = format_binary_for_hexdump(binary_data)
-
-        # Run javap and program in parallel
-        tasks = [
-            run_process(['javap', '-c', '-v', class_file]),  # bytecode
-            run_process(['java', '-cp', tmpdir, class_name]) # program execution
-        ]
+        # Start the program from the shared class archive when it's ready
+        program = run_program(['java', *await cds_flags(), '-cp', tmpdir, class_name], options)
 
         try:
-            javap_result, run_result = await asyncio.gather(*tasks)
+            if javap_output is None:
+                javap_result, run_result = await asyncio.gather(
+                    run_process(['javap', '-c', '-v', class_file]),
+                    program
+                )
+                javap_output = javap_result.stdout
+            else:
+                run_result = await program
         except Exception as e:
             print(f"Error in parallel execution: {e}")
             return CodeResult(stdout="", stderr=str(e), return_code=1)
@@ -55,9 +66,9 @@ async def run_java(code: str) -> CodeResult:
             return run_result
 
         # Add bytecode and hexdump outputs
-        run_result.code_outputs = [
-            CodeOutput(content=javap_result.stdout, language="java-bytecode"),
-            CodeOutput(content=hexdump_data, language="hexdump-binary")
+        run_result.code_outputs += [
+            CodeOutput(content=javap_output, language="java-bytecode"),
+            CodeOutput(data=binary_data, language="hexdump-binary")
         ]
 
-        return run_result
\ No newline at end of file
+        return run_result
@@ -0,0 +1,308 @@
+import asyncio
+import hashlib
+import os
+import shutil
+from typing import Optional
+from .base import run_process
+from .utils import cache_dir
+from .toolchains import toolchain_version
+from .registry import BUILTIN_SPECS
+
+# First requests to a cold JVM (or javac fallback builds) outlast the default 2s
+COMPILE_TIMEOUT = BUILTIN_SPECS['java'].compile_timeout
+
+# A resident JVM that compiles sources in memory with javax.tools, writes the
+# class files where asked and disassembles the main class with the in-process
+# javap tool.
+#   Request:  COMPILE <class name> <source byte length> <output dir>\n<source>
+#   Response: OK|ERROR <diagnostics byte length> <javap byte length>\n<diagnostics><javap>
+COMPILE_SERVER = r'''
+import java.io.*;
+import java.net.URI;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.*;
+import java.util.*;
+import javax.tools.*;
+
+public class CompileServer {
+    static class Source extends SimpleJavaFileObject {
+        private final String code;
+
+        Source(String className, String code) {
+            super(URI.create("string:///" + className + Kind.SOURCE.extension), Kind.SOURCE);
+            this.code = code;
+        }
+
+        @Override
+        public CharSequence getCharContent(boolean ignoreEncodingErrors) {
+            return code;
+        }
+    }
+
+    static class ClassBytes extends SimpleJavaFileObject {
+        final ByteArrayOutputStream bytes = new ByteArrayOutputStream();
+
+        ClassBytes(String className) {
+            super(URI.create("bytes:///" + className.replace('.', '/') + Kind.CLASS.extension), Kind.CLASS);
+        }
+
+        @Override
+        public OutputStream openOutputStream() {
+            return bytes;
+        }
+    }
+
+    static class MemoryFileManager extends ForwardingJavaFileManager<StandardJavaFileManager> {
+        final Map<String, ClassBytes> classes = new LinkedHashMap<>();
+
+        MemoryFileManager(StandardJavaFileManager fileManager) {
+            super(fileManager);
+        }
+
+        @Override
+        public JavaFileObject getJavaFileForOutput(Location location, String className,
+                                                   JavaFileObject.Kind kind, FileObject sibling) {
+            ClassBytes output = new ClassBytes(className);
+            classes.put(className, output);
+            return output;
+        }
+    }
+
+    static String readLine(InputStream in) throws IOException {
+        ByteArrayOutputStream line = new ByteArrayOutputStream();
+        int c;
+        while ((c = in.read()) != -1 && c != '\n') {
+            line.write(c);
+        }
+        if (c == -1 && line.size() == 0) {
+            return null;
+        }
+        return new String(line.toByteArray(), StandardCharsets.UTF_8);
+    }
+
+    static String formatDiagnostics(String className, String code, List<Diagnostic<? extends JavaFileObject>> diagnostics) {
+        String[] lines = code.split("\n", -1);
+        StringBuilder report = new StringBuilder();
+        for (Diagnostic<? extends JavaFileObject> d : diagnostics) {
+            String kind = d.getKind() == Diagnostic.Kind.ERROR ? "error"
+                        : d.getKind() == Diagnostic.Kind.NOTE ? "note" : "warning";
+            long line = d.getLineNumber();
+            report.append(className).append(".java:");
+            if (line > 0) {
+                report.append(line).append(": ");
+            }
+            report.append(kind).append(": ").append(d.getMessage(Locale.ROOT)).append('\n');
+            if (line > 0 && line <= lines.length) {
+                report.append(lines[(int) line - 1]).append('\n');
+                long column = Math.max(d.getColumnNumber(), 1);
+                report.append(" ".repeat((int) column - 1)).append("^\n");
+            }
+        }
+        return report.toString();
+    }
+
+    public static void main(String[] args) throws Exception {
+        JavaCompiler compiler = javax.tools.ToolProvider.getSystemJavaCompiler();
+        StandardJavaFileManager standard = compiler.getStandardFileManager(null, null, StandardCharsets.UTF_8);
+        java.util.spi.ToolProvider javap = java.util.spi.ToolProvider.findFirst("javap").orElse(null);
+        BufferedInputStream in = new BufferedInputStream(System.in);
+        OutputStream out = new BufferedOutputStream(System.out);
+
+        String header;
+        while ((header = readLine(in)) != null) {
+            // COMPILE <class> <length> <out dir>: the limit of 4 leaves the rest of the line, spaces
+            // and all, in the out dir
+            String[] parts = header.split(" ", 4);
+            String className = parts[1];
+            String code = new String(in.readNBytes(Integer.parseInt(parts[2])), StandardCharsets.UTF_8);
+            Path outDir = Paths.get(parts[3]);
+
+            DiagnosticCollector<JavaFileObject> collector = new DiagnosticCollector<>();
+            MemoryFileManager fileManager = new MemoryFileManager(standard);
+            boolean ok = compiler.getTask(null, fileManager, collector, List.of("-proc:none"), null,
+                                          List.of(new Source(className, code))).call();
+
+            String javapOutput = "";
+            if (ok) {
+                for (Map.Entry<String, ClassBytes> entry : fileManager.classes.entrySet()) {
+                    Path file = outDir.resolve(entry.getKey().replace('.', '/') + ".class");
+                    Files.createDirectories(file.getParent());
+                    Files.write(file, entry.getValue().bytes.toByteArray());
+                }
+                if (javap != null) {
+                    StringWriter text = new StringWriter();
+                    PrintWriter writer = new PrintWriter(text);
+                    javap.run(writer, writer, "-c", "-v", outDir.resolve(className + ".class").toString());
+                    writer.flush();
+                    javapOutput = text.toString();
+                }
+            }
+
+            byte[] diagnostics = formatDiagnostics(className, code, collector.getDiagnostics()).getBytes(StandardCharsets.UTF_8);
+            byte[] bytecode = javapOutput.getBytes(StandardCharsets.UTF_8);
+            String status = (ok ? "OK" : "ERROR") + " " + diagnostics.length + " " + bytecode.length + "\n";
+            out.write(status.getBytes(StandardCharsets.UTF_8));
+            out.write(diagnostics);
+            out.write(bytecode);
+            out.flush();
+        }
+    }
+}
+'''
+
+# Run once with class loading logged to produce the class list for the CDS archive
+WARMUP = '''
+import java.util.*;
+
+public class Warmup {
+    public static void main(String[] args) {
+        List<Integer> numbers = new ArrayList<>();
+        Map<String, Integer> counts = new HashMap<>();
+        for (int i = 0; i < 10; i++) {
+            numbers.add(i);
+            counts.merge(String.valueOf(i % 3), 1, Integer::sum);
+        }
+        Scanner scanner = new Scanner("1 2 3");
+        StringBuilder text = new StringBuilder();
+        while (scanner.hasNextInt()) {
+            text.append(scanner.nextInt());
+        }
+        System.out.println(String.format("%s %s %s", numbers, counts, text));
+        System.out.printf("%d%n", numbers.stream().mapToInt(Integer::intValue).sum());
+    }
+}
+'''
+
+_archive_build: Optional[asyncio.Task] = None
+
+async def jdk_cache_dir(*parts: str) -> Optional[str]:
+    """A cache directory specific to the installed JDK, so a JDK upgrade starts from scratch."""
+    version = await toolchain_version('java')
+    if version is None:
+        return None
+    return cache_dir('java', hashlib.sha256(version.encode()).hexdigest()[:16], *parts)
+
+class JavaCompileService:
+    """Client for the resident CompileServer JVM, (re)started on demand."""
+
+    def __init__(self):
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _bind_loop(self) -> None:
+        # Subprocess pipes belong to the loop that created them
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self.process = None
+
+    async def _start(self) -> None:
+        server_dir = await jdk_cache_dir('server')
+        if server_dir is None:
+            raise RuntimeError("java is not available")
+        if not os.path.exists(os.path.join(server_dir, 'CompileServer.class')):
+            source_file = os.path.join(server_dir, 'CompileServer.java')
+            with open(source_file, 'w') as f:
+                f.write(COMPILE_SERVER)
+            result = await run_process(['javac', '-d', server_dir, source_file], timeout=COMPILE_TIMEOUT)
+            if result.return_code != 0:
+                raise RuntimeError(f"Could not build the compile server: {result.stderr}")
+        self.process = await asyncio.create_subprocess_exec(
+            'java', '-Xshare:auto', '-cp', server_dir, 'CompileServer',
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            preexec_fn=os.setsid
+        )
+
+    async def compile(self, class_name: str, code: str, out_dir: str) -> tuple[bool, str, str]:
+        """Compile code, writing class files to out_dir. Returns (ok, diagnostics, javap output)."""
+        self._bind_loop()
+        async with self._lock:
+            if self.process is None or self.process.returncode is not None:
+                await self._start()
+            source = code.encode()
+            try:
+                self.process.stdin.write(f"COMPILE {class_name} {len(source)} {out_dir}\n".encode() + source)
+                await self.process.stdin.drain()
+                status = await asyncio.wait_for(self.process.stdout.readline(), timeout=COMPILE_TIMEOUT)
+                if not status:
+                    raise RuntimeError("compile server exited")
+                ok, diagnostics_length, javap_length = status.decode().split()
+                diagnostics = await self.process.stdout.readexactly(int(diagnostics_length))
+                javap = await self.process.stdout.readexactly(int(javap_length))
+            except Exception:
+                self.stop()
+                raise
+            return ok == 'OK', diagnostics.decode(), javap.decode()
+
+    def stop(self) -> None:
+        if self.process is not None and self.process.returncode is None:
+            try:
+                os.killpg(os.getpgid(self.process.pid), 9)
+            except ProcessLookupError:
+                pass
+        self.process = None
+
+compile_service = JavaCompileService()
+
+async def build_cds_archive(archive_dir: str) -> bool:
+    """Dump the JDK classes a typical program loads into an AppCDS archive."""
+    warmup_dir = os.path.join(archive_dir, 'warmup')
+    os.makedirs(warmup_dir, exist_ok=True)
+    ok, diagnostics, _ = await compile_service.compile('Warmup', WARMUP, warmup_dir)
+    if not ok:
+        print(f"Could not compile CDS warmup program: {diagnostics}")
+        return False
+
+    class_list = os.path.join(archive_dir, 'classes.lst')
+    result = await run_process(
+        ['java', '-Xshare:off', f'-XX:DumpLoadedClassList={class_list}', '-cp', warmup_dir, 'Warmup'],
+        timeout=COMPILE_TIMEOUT
+    )
+    if result.return_code != 0:
+        print(f"Could not record CDS class list: {result.stderr}")
+        return False
+
+    # Only JDK classes go in the archive, so it matches any program's classpath
+    with open(class_list, 'r') as f:
+        classes = [line for line in f if not line.startswith('Warmup')]
+    with open(class_list, 'w') as f:
+        f.writelines(classes)
+
+    partial = os.path.join(archive_dir, 'app.jsa.partial')
+    result = await run_process(
+        ['java', '-Xshare:dump', f'-XX:SharedClassListFile={class_list}', f'-XX:SharedArchiveFile={partial}'],
+        timeout=COMPILE_TIMEOUT * 3
+    )
+    if result.return_code != 0:
+        print(f"Could not dump CDS archive: {result.stderr}")
+        return False
+    os.replace(partial, os.path.join(archive_dir, 'app.jsa'))
+    shutil.rmtree(warmup_dir, ignore_errors=True)
+    return True
+
+async def _build_cds_archive_once(archive_dir: str) -> None:
+    try:
+        built = await build_cds_archive(archive_dir)
+    except Exception as e:
+        print(f"Could not build CDS archive: {e}")
+        built = False
+    if not built:
+        # Programs still run without the archive, don't pay for a failing build on every request
+        open(os.path.join(archive_dir, 'failed'), 'w').close()
+
+async def cds_flags() -> list[str]:
+    """JVM flags that start programs from the AppCDS archive, building it in the background on first use."""
+    global _archive_build
+    archive_dir = await jdk_cache_dir('cds')
+    if archive_dir is None:
+        return []
+    archive = os.path.join(archive_dir, 'app.jsa')
+    if os.path.exists(archive):
+        return [f'-XX:SharedArchiveFile={archive}', '-Xshare:auto']
+    if (_archive_build is None or _archive_build.done()) and not os.path.exists(os.path.join(archive_dir, 'failed')):
+        _archive_build = asyncio.ensure_future(_build_cds_archive_once(archive_dir))
+    return []
@@ -1,5 +1,22 @@
-from .base import run_process
+import tempfile
+from typing import Optional
+from .base import RunOptions, run_program
+from .profiling import SAMPLE_INTERVAL_MS, attach_profile, read_cpuprofile
 
-async def run_javascript(code: str):
+async def run_javascript(code: str, options: Optional[RunOptions] = None):
     """Run JavaScript code using Node.js."""
-    return await run_process(['node', '-e', code])
+    if not (options and options.profile) or options.cases:
+        return await run_program(['node', '-e', code], options)
+
+    # V8's sampling profiler writes a .cpuprofile into the directory when the program exits
+    with tempfile.TemporaryDirectory() as tmpdir:
+        result = await run_program([
+            'node',
+            '--cpu-prof',
+            '--cpu-prof-dir', tmpdir,
+            '--cpu-prof-interval', str(SAMPLE_INTERVAL_MS * 1000),
+            '-e', code
+        ], options)
+        # Code run with -e is the script "[eval]"
+        attach_profile(result, read_cpuprofile(tmpdir, user_url='[eval]'), unit="us")
+        return result
@@ -1,40 +1,116 @@
 import tempfile
 import os
 import asyncio
-from .base import CodeResult, CodeOutput, run_process
+from typing import Optional
+from .base import CodeResult, CodeOutput, RunOptions, run_program
+from .profiling import attach_profile, read_folded
 
-async def run_lua(code: str) -> CodeResult:
+# Lua has no timer to sample on, so the profiler samples every this many VM instructions
+SAMPLE_INSTRUCTIONS = 1000
+
+# Runs main.lua under xpcall so a runtime error produces its traceback in the
+# same execution. A file that fails to load (syntax error) never runs at all.
+# Given a profile file, it also samples the stack from a debug.sethook count
+# hook and writes the samples there as folded stacks.
+DRIVER = '''
+local source, debug_file, profile_file = arg[1], arg[2], arg[3]
+if warn then warn("@on") end  -- same as lua -W (Lua 5.4+)
+
+local stacks = {}
+local function sample()
+    local frames = {}
+    local level = 2
+    while true do
+        local info = debug.getinfo(level, "Sn")
+        if not info then break end
+        table.insert(frames, 1, info)
+        level = level + 1
+    end
+    -- Start from the user's main chunk, leaving out this driver
+    local labels = {}
+    for _, info in ipairs(frames) do
+        if #labels > 0 or (info.what == "main" and info.source == "@" .. source) then
+            local name = info.what == "main" and "main chunk" or (info.name or "(anonymous)")
+            local location = "C"
+            if info.what ~= "C" then
+                local file = info.source == "@" .. source and "main.lua" or info.short_src
+                location = file .. ":" .. info.linedefined
+            end
+            labels[#labels + 1] = (string.gsub(name .. " (" .. location .. ")", ";", ":"))
+        end
+    end
+    if #labels > 0 then
+        local stack = table.concat(labels, ";")
+        stacks[stack] = (stacks[stack] or 0) + 1
+    end
+end
+
+local function write_profile()
+    if not profile_file then return end
+    debug.sethook()
+    local f = io.open(profile_file, "w")
+    if f then
+        for stack, count in pairs(stacks) do
+            f:write(stack, " ", count, "\\n")
+        end
+        f:close()
+    end
+end
+
+local chunk, err = loadfile(source)
+if not chunk then
+    io.stderr:write("lua: ", err, "\\n")
+    os.exit(1)
+end
+
+arg = { [0] = source }
+if profile_file then
+    debug.sethook(sample, "", SAMPLE_INSTRUCTIONS)
+end
+local traceback
+local ok = xpcall(chunk, function(e)
+    traceback = debug.traceback(tostring(e), 2)
+    return e
+end)
+write_profile()
+if not ok then
+    io.stderr:write("lua: ", traceback, "\\n")
+    local f = io.open(debug_file, "w")
+    if f then
+        f:write(traceback)
+        f:close()
+    end
+    os.exit(1)
+end
+'''.replace('SAMPLE_INSTRUCTIONS', str(SAMPLE_INSTRUCTIONS))
+
+async def run_lua(code: str, options: Optional[RunOptions] = None) -> CodeResult:
     with tempfile.TemporaryDirectory() as tmpdir:
         # Write the code to a file
         source_file = os.path.join(tmpdir, 'main.lua')
         with open(source_file, 'w') as f:
             f.write(code)
 
-        # Check syntax first with -p (parse only)
-        check_result = await run_process(['lua', source_file])
-        if check_result.return_code != 0:
-            return check_result
-
-        # Run with debug info (-l) and warnings (-W)
-        run_result = await run_process(['lua', '-W', source_file])
-
-        # If there was an error, get the debug traceback
-        if run_result.return_code != 0:
-            # Run again with debug.traceback as error handler
-            debug_code = f"""
-                local ok, err = xpcall(function()
-                    {code}
-                end, debug.traceback)
-                if not ok then
-                    io.stderr:write(err)
-                    os.exit(1)
-                end
-            """
-            with open(source_file, 'w') as f:
-                f.write(debug_code)
-            debug_result = await run_process(['lua', source_file])
-            run_result.code_outputs = [
-                CodeOutput(content=debug_result.stderr, language="lua-debug")
-            ]
+        driver_file = os.path.join(tmpdir, 'driver.lua')
+        with open(driver_file, 'w') as f:
+            f.write(DRIVER)
+
+        # Load, run and trace errors in a single execution
+        debug_file = os.path.join(tmpdir, 'debug.txt')
+        cmd = ['lua', driver_file, source_file, debug_file]
+        profile_file = os.path.join(tmpdir, 'profile.folded')
+        profile = options and options.profile and not options.cases
+        if profile:
+            cmd.append(profile_file)
+        run_result = await run_program(cmd, options)
+        if profile:
+            attach_profile(run_result, read_folded(profile_file))
+
+        # If there was a runtime error, attach the debug traceback
+        if run_result.return_code != 0 and os.path.exists(debug_file) and not (options and options.cases):
+            with open(debug_file, 'r') as f:
+                run_result.code_outputs += [
+                    CodeOutput(content=f.read(), language="lua-debug")
+                ]
 
         return run_result
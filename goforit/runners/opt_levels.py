@@ -0,0 +1,152 @@
+"""Build one program at several optimization levels and compare the results.
+
+Each level is compiled into its own directory and its binary run, a core's worth
+of levels at a time. The result carries every level's assembly and a table of
+binary size, compile time and run time side by side. Runners building in a
+workspace call build_opt_levels inside it and run_opt_levels after leaving it,
+so the programs don't hold the workspace.
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+from .base import CodeResult, CodeOutput, RunOptions, run_process, run_program
+
+OPT_LEVELS = ('O0', 'O1', 'O2', 'O3', 'Os')
+
+# Levels built at once; compilers and programs are CPU bound
+COMPARE_CONCURRENCY = os.cpu_count() or 1
+
+# Building at -O3 with several other levels in parallel takes longer than a single -O0 build
+COMPILE_TIMEOUT = 10
+
+@dataclass
+class LevelBuild:
+    """What a runner's build step produced for one level: the executable and its assembly, or the failure."""
+    executable: Optional[str] = None
+    asm: str = ""
+    error: Optional[CodeResult] = None
+    # Set by build_opt_levels
+    compile_time: float = 0.0
+
+@dataclass
+class LevelResult:
+    level: str
+    compile_time: float
+    binary_size: int
+    run_time: Optional[float]
+    result: CodeResult
+    asm: str
+
+    def summary(self) -> dict:
+        return {
+            "level": self.level,
+            "compile_time": self.compile_time,
+            "binary_size": self.binary_size,
+            "run_time": self.run_time,
+            "return_code": self.result.return_code,
+            "asm_lines": len(self.asm.splitlines()),
+        }
+
+# (level, output directory) -> the build for that level
+Build = Callable[[str, str], Awaitable[LevelBuild]]
+
+def gcc_build(compiler: str, source_file: str, flags: tuple[str, ...] = ()) -> Build:
+    """A Build compiling source_file with gcc or g++ to assembly and to an executable at the level."""
+    async def build(level: str, outdir: str) -> LevelBuild:
+        asm_file = os.path.join(outdir, 'main.s')
+        asm_result = await run_process([compiler, *flags, f'-{level}', '-S', '-o', asm_file, source_file],
+                                       timeout=COMPILE_TIMEOUT)
+        if asm_result.return_code != 0:
+            return LevelBuild(error=asm_result)
+
+        executable = os.path.join(outdir, 'main')
+        compile_result = await run_process([compiler, *flags, f'-{level}', '-o', executable, source_file],
+                                           timeout=COMPILE_TIMEOUT)
+        if compile_result.return_code != 0:
+            return LevelBuild(error=compile_result)
+
+        with open(asm_file) as f:
+            return LevelBuild(executable=executable, asm=f.read())
+    return build
+
+async def compare_opt_levels(levels: list[str], build: Build, workdir: str, asm_language: str,
+                             options: Optional[RunOptions] = None,
+                             concurrency: int = COMPARE_CONCURRENCY) -> CodeResult:
+    """Build and run each level, returning the first level's run with every level's outputs."""
+    builds = await build_opt_levels(levels, build, workdir, concurrency)
+    return await run_opt_levels(builds, asm_language, options, concurrency)
+
+async def build_opt_levels(levels: list[str], build: Build, workdir: str,
+                           concurrency: int = COMPARE_CONCURRENCY) -> dict[str, LevelBuild]:
+    """Build each level into its own directory under workdir, in the order given."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def build_level(level: str) -> LevelBuild:
+        async with semaphore:
+            outdir = os.path.join(workdir, level)
+            os.makedirs(outdir, exist_ok=True)
+            compile_start = time.perf_counter()
+            built = await build(level, outdir)
+            built.compile_time = time.perf_counter() - compile_start
+            return built
+
+    return dict(zip(levels, await asyncio.gather(*(build_level(level) for level in levels))))
+
+async def run_opt_levels(builds: dict[str, LevelBuild], asm_language: str,
+                         options: Optional[RunOptions] = None,
+                         concurrency: int = COMPARE_CONCURRENCY) -> CodeResult:
+    """Run each level's build, returning the first level's run with every level's outputs."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_level(level: str, built: LevelBuild) -> LevelResult:
+        if built.error is not None:
+            return LevelResult(level, built.compile_time, 0, None, built.error, built.asm)
+        async with semaphore:
+            run_start = time.perf_counter()
+            result = await run_program([built.executable], options)
+            run_time = time.perf_counter() - run_start
+        return LevelResult(level, built.compile_time, os.path.getsize(built.executable), run_time, result, built.asm)
+
+    results = await asyncio.gather(*(run_level(level, built) for level, built in builds.items()))
+
+    first = results[0].result
+    comparison = CodeResult(
+        stdout=first.stdout,
+        stderr=first.stderr,
+        return_code=first.return_code,
+        case_results=first.case_results,
+        timings={"total": sum(result.compile_time + (result.run_time or 0) for result in results)},
+    )
+    comparison.code_outputs = [
+        CodeOutput(content=format_comparison(results), language="opt-comparison",
+                   metadata={"levels": [result.summary() for result in results]}),
+        *(CodeOutput(content=result.asm or result.result.stderr, language=asm_language,
+                     metadata={"opt_level": result.level})
+          for result in results),
+    ]
+    # Outputs from the runs themselves (e.g. benchmarks), tagged with their level
+    for result in results:
+        for output in result.result.code_outputs:
+            output.metadata = {**output.metadata, "opt_level": result.level}
+            comparison.code_outputs.append(output)
+    return comparison
+
+def format_comparison(results: list[LevelResult]) -> str:
+    lines = [f"{'level':<7}{'compile':>10}{'run':>10}{'binary':>12}{'asm lines':>11}  status"]
+    baseline = results[0].result.stdout
+    for result in results:
+        run_time = f"{result.run_time:.3f}s" if result.run_time is not None else "-"
+        if result.run_time is None:
+            status = "build failed"
+        elif result.result.return_code != 0:
+            status = f"exit {result.result.return_code}"
+        elif result.result.stdout != baseline:
+            # Undefined behaviour often shows up as output that changes with the level
+            status = "output differs"
+        else:
+            status = "ok"
+        lines.append(f"-{result.level:<6}{result.compile_time:>9.3f}s{run_time:>10}"
+                     f"{result.binary_size:>12}{len(result.asm.splitlines()):>11}  {status}")
+    return "\n".join(lines)
@@ -0,0 +1,88 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+from typing import Optional
+from .base import run_process
+from .utils import cache_dir
+from .toolchains import toolchain_version
+
+# Precompiling <bits/stdc++.h> takes several seconds
+PCH_TIMEOUT = 30
+
+INCLUDE_RE = re.compile(r'#\s*include\s*(<[^>]+>)$')
+
+# In-flight PCH builds by cache key, so concurrent evaluations start only one
+_builds: dict[str, asyncio.Task] = {}
+
+def leading_includes(code: str) -> list[str]:
+    """Return the system headers included at the top of the file, before any other code."""
+    includes = []
+    for line in code.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith('//'):
+            continue
+        include_match = INCLUDE_RE.match(stripped)
+        if not include_match:
+            break
+        includes.append(include_match.group(1))
+    return includes
+
+def prune_stale(root: str, version: str) -> None:
+    """Drop headers precompiled by a different compiler version, they can never be used again."""
+    for entry in os.listdir(root):
+        try:
+            with open(os.path.join(root, entry, 'version'), 'r') as f:
+                stale = f.read() != version
+        except OSError:
+            stale = True
+        if stale and entry not in _builds:
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+
+async def build_pch(compiler: str, version: str, flags: list[str], includes: list[str], entry: str) -> None:
+    prune_stale(os.path.dirname(entry), version)
+    os.makedirs(entry, exist_ok=True)
+    with open(os.path.join(entry, 'version'), 'w') as f:
+        f.write(version)
+
+    header = os.path.join(entry, 'pch.hpp')
+    with open(header, 'w') as f:
+        f.write(''.join(f'#include {include}\n' for include in includes))
+
+    # Build beside the final name and rename, so a half-written .gch is never picked up
+    partial = header + '.gch.partial'
+    # gcc skips a PCH built without -g in a -g compile; one built with -g serves both
+    result = await run_process(
+        [compiler, *flags, '-g', '-x', 'c++-header', header, '-o', partial],
+        timeout=PCH_TIMEOUT
+    )
+    if result.return_code == 0:
+        os.replace(partial, header + '.gch')
+    else:
+        # e.g. a header that doesn't exist; the user's compile reports it, don't retry
+        open(os.path.join(entry, 'failed'), 'w').close()
+
+async def find_pch(compiler: str, flags: list[str], includes: list[str]) -> Optional[str]:
+    """Return the header to pass with -include when a PCH for these includes and flags is ready.
+
+    The first time an include set is seen its PCH is built in the background
+    and the caller compiles without it.
+    """
+    if not includes:
+        return None
+    version = await toolchain_version(compiler)
+    if version is None:
+        return None
+
+    key = hashlib.sha256(json.dumps([compiler, version, flags, includes]).encode()).hexdigest()[:16]
+    entry = os.path.join(cache_dir('pch'), key)
+    header = os.path.join(entry, 'pch.hpp')
+    if os.path.exists(header + '.gch'):
+        return header
+    if key not in _builds and not os.path.exists(os.path.join(entry, 'failed')):
+        task = asyncio.ensure_future(build_pch(compiler, version, list(flags), includes, entry))
+        _builds[key] = task
+        task.add_done_callback(lambda _: _builds.pop(key, None))
+    return None
@@ -0,0 +1,93 @@
+"""Profiles in folded-stack format, the input flame graphs are drawn from.
+
+Each line is a stack, root first, frames separated by ";", then the weight of
+that stack: ``main (main.py:1);work (main.py:3) 42``. The interpreted runners
+write this format directly from an in-process sampler. Node's --cpu-prof
+profiles are converted here.
+"""
+import glob
+import json
+import os
+from collections import Counter
+from typing import Optional
+from .base import CodeOutput, CodeResult
+
+# Milliseconds between samples for the samplers the runners install. CPU-time
+# timers only fire on the kernel's tick, so the real interval is often 4ms.
+SAMPLE_INTERVAL_MS = 1
+
+def format_folded(stacks: Counter) -> str:
+    return "\n".join(f"{stack} {weight}" for stack, weight in sorted(stacks.items()) if weight > 0)
+
+def frame_label(name: str, location: str) -> str:
+    # ";" separates frames and the last space separates the weight
+    return f"{name or '(anonymous)'} ({location})".replace(";", ":")
+
+def fold_cpuprofile(profile: dict, user_url: Optional[str] = None) -> Counter:
+    """Fold a V8 .cpuprofile, weighting each sample by the microseconds it covers.
+
+    With user_url, stacks start at the first frame from that script, leaving out
+    the frames Node runs it from. Node's own frames (node:internal/...) are
+    dropped, so time spent in them counts toward the function that called them.
+    """
+    nodes = {node["id"]: node for node in profile["nodes"]}
+    parents = {child: node["id"] for node in profile["nodes"] for child in node.get("children", ())}
+
+    def label(node_id: int) -> Optional[str]:
+        frame = nodes[node_id]["callFrame"]
+        url = frame.get("url", "")
+        if node_id not in parents or url.startswith("node:"):
+            return None
+        if not url:
+            # Builtins, and (program), (garbage collector), (idle)
+            return frame["functionName"]
+        return frame_label(frame["functionName"], f"{os.path.basename(url)}:{frame['lineNumber'] + 1}")
+
+    stacks_by_node = {}
+    def stack(node_id: int) -> str:
+        if node_id not in stacks_by_node:
+            frames = []
+            current: Optional[int] = node_id
+            while current is not None:
+                frames.append(current)
+                current = parents.get(current)
+            frames.reverse()
+            user = [i for i, frame in enumerate(frames) if nodes[frame]["callFrame"].get("url") == user_url]
+            if user:
+                frames = frames[user[0]:]
+            stacks_by_node[node_id] = ";".join(filter(None, map(label, frames)))
+        return stacks_by_node[node_id]
+
+    stacks = Counter()
+    for node_id, delta in zip(profile.get("samples", ()), profile.get("timeDeltas", ())):
+        if stack(node_id) and stack(node_id) != "(idle)":
+            stacks[stack(node_id)] += max(delta, 0)
+    return stacks
+
+def read_cpuprofile(directory: str, user_url: Optional[str] = None) -> Optional[str]:
+    """The folded stacks of the .cpuprofile node wrote into directory, if it wrote one."""
+    for path in glob.glob(os.path.join(directory, '*.cpuprofile')):
+        try:
+            with open(path) as f:
+                return format_folded(fold_cpuprofile(json.load(f), user_url))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error reading CPU profile {path}: {e}")
+    return None
+
+def read_folded(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        # The program was killed, or exited without running the sampler's exit hook
+        return None
+
+def flamegraph_output(folded: str, unit: str = "samples") -> CodeOutput:
+    """A "flamegraph" output: folded stacks, weighted in unit ("samples" or "us")."""
+    total = sum(int(line.rsplit(" ", 1)[1]) for line in folded.splitlines())
+    return CodeOutput(content=folded, language="flamegraph",
+                      metadata={"unit": unit, "total": total, "interval_ms": SAMPLE_INTERVAL_MS})
+
+def attach_profile(result: CodeResult, folded: Optional[str], unit: str = "samples") -> None:
+    if folded:
+        result.code_outputs.append(flamegraph_output(folded, unit))
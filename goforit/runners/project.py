@@ -0,0 +1,276 @@
+"""Multi-file C and C++ projects, rebuilt incrementally the way make would.
+
+The request's ``code`` is the main source and ``RunOptions.files`` holds the
+rest of the project by relative path. Every translation unit compiles to its
+own object file with ``-MMD``, and the depfile gcc writes alongside lists the
+project headers the unit included. A manifest records the content hash of
+the unit and of each of those headers, and the flags it was built with. On
+the next build a unit whose hashes and flags all still match keeps its
+object, so editing one file of a ten-file project costs one compile and a
+link. The objects live in the session's workspace (see workspace.py);
+evaluations without a session compile every unit, in parallel.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+from .base import CodeResult, CodeOutput, RunOptions, run_process, run_program
+from .utils import detect_system_arch
+from .disassembly import disassembly_output
+from .opt_levels import LevelBuild, build_opt_levels, run_opt_levels
+from .cachegrind import cachegrind_output
+from .compile_profile import CompileProfile, Phase, compile_profile_output
+from .workspace import build_workspace, write_if_changed
+from .registry import BUILTIN_SPECS
+
+MAX_PROJECT_FILES = 64
+
+# Translation units compiled at once
+COMPILE_CONCURRENCY = os.cpu_count() or 1
+
+@dataclass(frozen=True)
+class ProjectLanguage:
+    language: str
+    compiler: str
+    # Where the request's code goes
+    main: str
+    # Files compiled as translation units; everything else is only included
+    suffixes: tuple[str, ...]
+
+C_PROJECT = ProjectLanguage('c', 'gcc', 'main.c', ('.c',))
+CPP_PROJECT = ProjectLanguage('cpp', 'g++', 'main.cpp', ('.cpp', '.cc', '.cxx'))
+
+@dataclass
+class ProjectBuild:
+    executable: Optional[str] = None
+    # The main unit's assembly
+    asm: str = ""
+    units: list[str] = field(default_factory=list)
+    # Compile and link times of the steps that ran, for the compile profile
+    phases: list[Phase] = field(default_factory=list)
+    reused: int = 0
+    total: float = 0.0
+    error: Optional[CodeResult] = None
+
+def project_file_error(path: str) -> Optional[str]:
+    """Why path can't be a project file, or None when it's fine."""
+    if not path or path.startswith('/') or '\\' in path or '\0' in path:
+        return f"Invalid project file name: {path!r}"
+    if posixpath.normpath(path) != path or path.split('/')[0] == '..':
+        return f"Project file names must be relative paths without '.' or '..': {path!r}"
+    return None
+
+def check_project_files(files: dict[str, str]) -> Optional[str]:
+    if len(files) > MAX_PROJECT_FILES:
+        return f"Projects are limited to {MAX_PROJECT_FILES} files"
+    problem = next(filter(None, (project_file_error(path) for path in files)), None)
+    if problem:
+        return problem
+    # A path can't be both a file and a directory holding another file
+    directories = {path.rsplit('/', i)[0] for path in files for i in range(1, path.count('/') + 1)}
+    clash = next((path for path in files if path in directories), None)
+    if clash:
+        return f"Project file {clash!r} is also used as a directory"
+    return None
+
+def write_sources(src_dir: str, files: dict[str, str]) -> Optional[CodeResult]:
+    """Make src_dir hold exactly files, leaving unchanged ones (and their mtimes) alone.
+
+    Returns the failure when the files can't be laid out, None when they were.
+    """
+    try:
+        # Files the last evaluation had and this one doesn't, cleared first so
+        # one of its directories can become a file in this one
+        for dirpath, dirnames, filenames in os.walk(src_dir, topdown=False):
+            for filename in filenames:
+                full_path = os.path.join(dirpath, filename)
+                if os.path.relpath(full_path, src_dir).replace(os.sep, '/') not in files:
+                    os.remove(full_path)
+            if dirpath != src_dir and not os.listdir(dirpath):
+                os.rmdir(dirpath)
+        for path, content in files.items():
+            full_path = os.path.join(src_dir, path)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            write_if_changed(full_path, content)
+    except OSError as e:
+        return CodeResult(stderr=f"Failed to write the project's files: {e}", return_code=1)
+    return None
+
+def parse_depfile(text: str) -> list[str]:
+    """The prerequisites in a make rule as gcc -MMD writes it, target left out."""
+    text = text.replace('\\\n', ' ')
+    # The target is ours and has no spaces; prerequisites escape theirs as "\ "
+    parts = re.split(r':\s', text, maxsplit=1)
+    prerequisites = parts[1] if len(parts) == 2 else ''
+    return [name.replace('\\ ', ' ').replace('$$', '$')
+            for name in re.split(r'(?<!\\)\s+', prerequisites.strip()) if name]
+
+def file_hash(path: str) -> Optional[str]:
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+    except OSError:
+        return None
+
+def load_manifest(path: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def up_to_date(entry: Optional[dict], flags: list[str], src_dir: str, object_file: str) -> bool:
+    """Whether a unit's object was built with these flags from inputs that haven't changed since."""
+    if not entry or entry.get('flags') != flags or not os.path.exists(object_file):
+        return False
+    return all(file_hash(os.path.join(src_dir, path)) == digest for path, digest in entry['inputs'].items())
+
+def translation_units(src_dir: str, suffixes: tuple[str, ...]) -> list[str]:
+    units = []
+    for dirpath, _, filenames in os.walk(src_dir):
+        for filename in filenames:
+            if filename.endswith(suffixes):
+                units.append(os.path.relpath(os.path.join(dirpath, filename), src_dir).replace(os.sep, '/'))
+    return sorted(units)
+
+async def build_project(project: ProjectLanguage, src_dir: str, out_dir: str,
+                        flags: tuple[str, ...] = ()) -> ProjectBuild:
+    """Compile the units in src_dir whose inputs changed into out_dir, then link out_dir/main.
+
+    out_dir keeps the objects and manifest between builds, one out_dir per set of flags.
+    """
+    start = time.perf_counter()
+    timeout = BUILTIN_SPECS[project.language].compile_timeout
+    # Line info lets the disassembly pick out the project's own functions
+    compile_flags = [*flags, '-g']
+    manifest_path = os.path.join(out_dir, 'manifest.json')
+    manifest = load_manifest(manifest_path)
+    units = translation_units(src_dir, project.suffixes)
+    objects = {unit: os.path.join(out_dir, 'obj', unit + '.o') for unit in units}
+    asm_file = os.path.join(out_dir, 'main.s')
+    stale = [unit for unit in units
+             if not up_to_date(manifest.get('units', {}).get(unit), compile_flags, src_dir, objects[unit])]
+    semaphore = asyncio.Semaphore(COMPILE_CONCURRENCY)
+
+    async def compile_unit(unit: str) -> tuple[str, CodeResult, float]:
+        async with semaphore:
+            object_file = objects[unit]
+            os.makedirs(os.path.dirname(object_file), exist_ok=True)
+            unit_start = time.perf_counter()
+            steps = [run_process([project.compiler, *compile_flags, '-c', '-MMD', '-MF', object_file[:-2] + '.d',
+                                  '-o', object_file, unit], timeout=timeout, cwd=src_dir)]
+            if unit == project.main:
+                # The assembly shown is the main unit's, without the debug info directives
+                steps.append(run_process([project.compiler, *flags, '-S', '-o', asm_file, unit],
+                                         timeout=timeout, cwd=src_dir))
+            results = await asyncio.gather(*steps)
+            failed = next((result for result in results if result.return_code != 0), results[0])
+            return unit, failed, time.perf_counter() - unit_start
+
+    compiled = await asyncio.gather(*(compile_unit(unit) for unit in stale))
+    unit_entries = {unit: entry for unit, entry in manifest.get('units', {}).items() if unit in objects}
+    errors = []
+    phases = []
+    for unit, result, seconds in compiled:
+        if result.return_code != 0:
+            unit_entries.pop(unit, None)
+            errors.append(result)
+            continue
+        with open(objects[unit][:-2] + '.d') as f:
+            inputs = parse_depfile(f.read())
+        unit_entries[unit] = {"flags": compile_flags, "inputs": {path: file_hash(os.path.join(src_dir, path))
+                                                          for path in [unit, *inputs]}}
+        phases.append(Phase(f"compile {unit}", seconds))
+
+    manifest = {"units": unit_entries, "link": manifest.get('link')}
+    build = ProjectBuild(units=units, phases=phases, reused=len(units) - len(stale))
+    if errors:
+        build.error = CodeResult(stderr="".join(result.stderr for result in errors),
+                                 return_code=errors[0].return_code, phase="diagnostics")
+    else:
+        executable = os.path.join(out_dir, 'main')
+        # Relink only when an object or the set of units changed
+        if compiled or manifest['link'] != units or not os.path.exists(executable):
+            link_start = time.perf_counter()
+            link_result = await run_process([project.compiler, *compile_flags, '-o', executable,
+                                             *(objects[unit] for unit in units)], timeout=timeout)
+            build.phases.append(Phase("link", time.perf_counter() - link_start))
+            manifest['link'] = units if link_result.return_code == 0 else None
+            if link_result.return_code != 0:
+                build.error = link_result
+        if build.error is None:
+            build.executable = executable
+            with open(asm_file) as f:
+                build.asm = f.read()
+
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+    build.total = time.perf_counter() - start
+    return build
+
+async def run_project(project: ProjectLanguage, code: str, options: RunOptions) -> CodeResult:
+    """Build and run a multi-file project, with the outputs its single-file runner gives."""
+    if project.main in options.files:
+        return CodeResult(stderr=f"{project.main} is the request's code, not a project file", return_code=1)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        async with build_workspace(project.language, options) as build_dir:
+            src_dir = os.path.realpath(os.path.join(build_dir, 'src'))
+            error = write_sources(src_dir, {**options.files, project.main: code})
+            if error:
+                return error
+
+            if options.opt_levels:
+                async def build_level(level: str, outdir: str) -> LevelBuild:
+                    built = await build_project(project, src_dir, os.path.join(build_dir, level), (f'-{level}',))
+                    if built.error:
+                        return LevelBuild(error=built.error)
+                    executable = os.path.join(outdir, 'main')
+                    shutil.copy2(built.executable, executable)
+                    return LevelBuild(executable=executable, asm=built.asm)
+                # The levels' copies run after the workspace is released
+                level_builds = await build_opt_levels(options.opt_levels, build_level, tmpdir)
+            else:
+                built = await build_project(project, src_dir, os.path.join(build_dir, 'default'))
+                if built.error:
+                    return built.error
+
+                # Run a copy so the workspace is free for the next build
+                executable = os.path.join(tmpdir, 'main')
+                shutil.copy2(built.executable, executable)
+                main_source = os.path.join(src_dir, project.main)
+                sources = [os.path.join(src_dir, unit) for unit in built.units]
+                # Cachegrind reads the main source, which a temp build dir doesn't keep
+                cachegrind = await cachegrind_output([executable], options, main_source) if options.cachegrind else None
+
+        if options.opt_levels:
+            return await run_opt_levels(level_builds, "asm-intel", options)
+
+        with open(executable, 'rb') as f:
+            binary_data = f.read()
+
+        objdump_result, run_result = await asyncio.gather(
+            run_process(['objdump', '-d', '-l', executable]),
+            run_program([executable], options)
+        )
+        if run_result.return_code != 0:
+            return run_result
+
+        outputs = [
+            CodeOutput(content=built.asm, language="asm-intel"),
+            disassembly_output(objdump_result.stdout, f"asm-{detect_system_arch()}", sources),
+        ]
+        if cachegrind:
+            outputs.append(cachegrind)
+        run_result.code_outputs += [*outputs, CodeOutput(data=binary_data, language="hexdump-binary")]
+        if options.compile_profile:
+            note = f"up to date: {built.reused} of {len(built.units)} units"
+            run_result.code_outputs.append(compile_profile_output(
+                CompileProfile(project.compiler, built.phases, built.total, note=note)))
+        return run_result
@@ -0,0 +1,286 @@
+import asyncio
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from typing import Optional
+from .base import RUN_TIMEOUT
+
+# Wall-clock and inference budgets for one program, enforced inside the engine
+TIME_LIMIT = RUN_TIMEOUT
+INFERENCE_LIMIT = 100_000_000
+
+# Engines are restarted after this many programs so leaked global state the
+# engine doesn't check for (global variables, open streams) cannot accumulate
+MAX_RUNS = 50
+
+# Seconds to wait for an engine that closed its stdout to exit
+EXIT_TIMEOUT = 1
+
+# Driven over stdin/stdout: each request is one term on a line, e.g.
+#   run('/tmp/x/main.pl', '/tmp/x/stdin', '/tmp/x/stdout', '/tmp/x/stderr', '/tmp/x/trace.txt', 2, 100000000, r3f1c).
+# and is answered with `done(r3f1c, Status, State).` on the engine's real
+# stdout once the program's own streams have been restored and closed. The
+# nonce keeps a program that writes to that stdout from forging the reply.
+# State is `dirty` when the program changed the shared user module (clauses,
+# flags or operators), which the temporary module doesn't isolate; such an
+# engine is replaced rather than handed the next program.
+SERVER = r'''
+:- use_module(library(time)).
+:- use_module(library(prolog_stack)).
+
+:- dynamic goforit_trace_file/1, goforit_error_seen/0, goforit_halted/1.
+
+% Copy errors and warnings (with backtraces) into the request's trace file.
+% Halting is turned into an exception by the program's module, it is recorded
+% rather than reported.
+:- multifile user:message_hook/3.
+user:message_hook(Term, _Kind, _Lines) :-
+    sub_term(goforit_halt(Code), Term), !,
+    assertz(goforit_halted(Code)).
+user:message_hook(_Term, Kind, Lines) :-
+    memberchk(Kind, [error, warning]),
+    goforit_trace_file(File),
+    (   Kind == error -> assertz(goforit_error_seen) ; true ),
+    setup_call_cleanup(open(File, append, Stream),
+                       print_message_lines(Stream, kind(Kind), Lines),
+                       close(Stream)),
+    fail.
+
+goforit_serve :-
+    current_input(Requests),
+    current_output(Replies),
+    repeat,
+        read_term(Requests, Request, []),
+        (   Request == end_of_file
+        ->  halt
+        ;   goforit_handle(Request, Nonce, Status, State),
+            format(Replies, "done(~q, ~q, ~q).~n", [Nonce, Status, State]),
+            flush_output(Replies),
+            fail
+        ).
+
+goforit_handle(run(Source, In, Out, Err, Trace, TimeLimit, InferenceLimit, Nonce), Nonce, Status, State) :-
+    goforit_user_state(Before),
+    retractall(goforit_trace_file(_)),
+    retractall(goforit_error_seen),
+    retractall(goforit_halted(_)),
+    assertz(goforit_trace_file(Trace)),
+    setup_call_cleanup(
+        goforit_redirect(In, Out, Err, Saved),
+        goforit_run(Source, TimeLimit, InferenceLimit, Status0),
+        goforit_restore(Saved)),
+    (   goforit_halted(Code) -> Status = halt(Code)
+    ;   Status0 == true, goforit_error_seen -> Status = error
+    ;   Status = Status0
+    ),
+    goforit_user_state(After),
+    (   Before == After -> State = clean ; State = dirty ).
+
+% What a program can leave behind outside its temporary module: clauses in
+% user (apart from the server's own), prolog flags and user operators.
+goforit_user_state(state(Clauses, Flags, Ops)) :-
+    findall(Name/Arity-Count,
+            ( current_predicate(user:Name/Arity),
+              \+ sub_atom(Name, 0, _, _, goforit_),
+              functor(Head, Name, Arity),
+              \+ predicate_property(user:Head, imported_from(_)),
+              predicate_property(user:Head, number_of_clauses(Count))
+            ),
+            Clauses0),
+    msort(Clauses0, Clauses),
+    findall(Flag-Value, current_prolog_flag(Flag, Value), Flags0),
+    msort(Flags0, Flags),
+    findall(op(Priority, Type, Name), current_op(Priority, Type, user:Name), Ops0),
+    msort(Ops0, Ops).
+
+goforit_redirect(In, Out, Err, saved(OldIn, OldOut, OldErr, InS, OutS, ErrS)) :-
+    stream_property(OldIn, alias(user_input)),
+    stream_property(OldOut, alias(user_output)),
+    stream_property(OldErr, alias(user_error)),
+    open(In, read, InS),
+    open(Out, write, OutS),
+    open(Err, write, ErrS),
+    set_stream(InS, alias(user_input)),
+    set_stream(OutS, alias(user_output)),
+    set_stream(ErrS, alias(user_error)),
+    set_input(InS),
+    set_output(OutS).
+
+goforit_restore(saved(OldIn, OldOut, OldErr, InS, OutS, ErrS)) :-
+    set_stream(OldIn, alias(user_input)),
+    set_stream(OldOut, alias(user_output)),
+    set_stream(OldErr, alias(user_error)),
+    set_input(OldIn),
+    set_output(OldOut),
+    close(InS, [force(true)]),
+    close(OutS, [force(true)]),
+    close(ErrS, [force(true)]).
+
+goforit_run(Source, TimeLimit, InferenceLimit, Status) :-
+    catch(call_with_time_limit(TimeLimit,
+              call_with_inference_limit(goforit_consult(Source), InferenceLimit, Result)),
+          Error, true),
+    (   var(Error)
+    ->  (   Result == inference_limit_exceeded -> Status = inference_limit ; Status = true )
+    ;   Error == time_limit_exceeded
+    ->  Status = time_limit
+    ;   print_message(error, Error),
+        Status = error
+    ).
+
+% Consult the program into a fresh module that is destroyed afterwards, so no
+% clauses, flags or operators leak into the next request.
+goforit_consult(Source) :-
+    setup_call_cleanup(
+        true,
+        in_temporary_module(Module,
+                            goforit_isolate(Module),
+                            load_files(Source, [module(Module), silent(true)])),
+        catch(unload_file(Source), _, true)).
+
+goforit_isolate(Module) :-
+    redefine_system_predicate(Module:halt),
+    redefine_system_predicate(Module:halt(_)),
+    assertz(Module:(halt :- throw(goforit_halt(0)))),
+    assertz(Module:(halt(Code) :- throw(goforit_halt(Code)))).
+'''
+
+def prolog_atom(text: str) -> str:
+    return "'" + text.replace('\\', '\\\\').replace("'", "\\'") + "'"
+
+def parse_reply(line: str, nonce: str) -> Optional[tuple[str, bool]]:
+    """The status in an engine's reply to the request with nonce, and whether the engine is dirty."""
+    match = re.match(r'done\((\w+), (.*), (clean|dirty)\)\.\s*$', line)
+    if not match or match.group(1) != nonce:
+        return None
+    return match.group(2), match.group(3) == 'dirty'
+
+def status_return_code(status: str) -> int:
+    """Map an engine status to the exit code the equivalent `swipl` run would have had."""
+    if status == 'true':
+        return 0
+    if status == 'time_limit':
+        return 124
+    halt_match = re.match(r'halt\((\d+)\)', status)
+    if halt_match:
+        return int(halt_match.group(1))
+    return 1
+
+class PrologEngine:
+    """One resident swipl process serving programs over the pipe protocol."""
+
+    def __init__(self, process: asyncio.subprocess.Process, server_dir: str):
+        self.process = process
+        self.server_dir = server_dir
+        self.runs = 0
+        self.stopped = False
+        # Set when a program changed state the next one would see
+        self.dirty = False
+
+    @classmethod
+    async def start(cls) -> 'PrologEngine':
+        server_dir = tempfile.mkdtemp(prefix='goforit-prolog-')
+        server_file = os.path.join(server_dir, 'server.pl')
+        with open(server_file, 'w') as f:
+            f.write(SERVER)
+        try:
+            process = await asyncio.create_subprocess_exec(
+                'swipl', '-q', '-O', '-s', server_file, '-g', 'goforit_serve', '-t', 'halt',
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+                preexec_fn=os.setsid
+            )
+        except Exception:
+            shutil.rmtree(server_dir, ignore_errors=True)
+            raise
+        return cls(process, server_dir)
+
+    @property
+    def alive(self) -> bool:
+        return not self.stopped and self.process.returncode is None
+
+    async def run(self, source_file: str, stdin_file: str, stdout_file: str, stderr_file: str,
+                  trace_file: str, time_limit: float = TIME_LIMIT,
+                  inference_limit: int = INFERENCE_LIMIT) -> Optional[str]:
+        """Run one program, returning the engine's status or None if the engine crashed."""
+        self.runs += 1
+        args = ', '.join(map(prolog_atom, [source_file, stdin_file, stdout_file, stderr_file, trace_file]))
+        nonce = 'r' + uuid.uuid4().hex
+        request = f"run({args}, {time_limit}, {inference_limit}, {nonce}).\n"
+        try:
+            self.process.stdin.write(request.encode())
+            await self.process.stdin.drain()
+            # The engine enforces the time limit itself, the extra second covers a wedged engine
+            line = await asyncio.wait_for(self.process.stdout.readline(), timeout=time_limit + 1)
+        except asyncio.TimeoutError:
+            self.stop()
+            return 'time_limit'
+        except ConnectionError:
+            self.stop()
+            return None
+        if not line:
+            # End of file: the program took the whole engine down, e.g. halt/0 on
+            # a swipl that doesn't allow redefining it, or a crash
+            try:
+                returncode = await asyncio.wait_for(self.process.wait(), timeout=EXIT_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.stop()
+                return None
+            self.stop()
+            return f"halt({returncode})" if returncode >= 0 else None
+        reply = parse_reply(line.decode(errors='replace'), nonce)
+        if reply is None:
+            # Not the reply to this request, e.g. the program wrote to the
+            # engine's own stdout; the protocol can't be trusted from here on
+            self.stop()
+            return None
+        status, self.dirty = reply
+        return status
+
+    def stop(self) -> None:
+        if self.alive:
+            try:
+                os.killpg(os.getpgid(self.process.pid), 9)
+            except ProcessLookupError:
+                pass
+        self.stopped = True
+        shutil.rmtree(self.server_dir, ignore_errors=True)
+
+class PrologPool:
+    """A bounded set of resident engines, recycled on a crash, when dirty or after MAX_RUNS programs."""
+
+    def __init__(self, size: int = os.cpu_count() or 1, max_runs: int = MAX_RUNS):
+        self.size = size
+        self.max_runs = max_runs
+        self._idle: list[PrologEngine] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _bind_loop(self) -> None:
+        # Subprocess pipes belong to the loop that created them
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.size)
+            self._idle = []
+
+    async def run(self, *args, **kwargs) -> Optional[str]:
+        self._bind_loop()
+        async with self._semaphore:
+            engine = self._idle.pop() if self._idle else await PrologEngine.start()
+            status = await engine.run(*args, **kwargs)
+            if engine.alive and not engine.dirty and engine.runs < self.max_runs:
+                self._idle.append(engine)
+            else:
+                engine.stop()
+            return status
+
+    def close(self) -> None:
+        for engine in self._idle:
+            engine.stop()
+        self._idle = []
+
+pool = PrologPool()
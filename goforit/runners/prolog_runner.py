@@ -1,28 +1,68 @@
 import tempfile
 import os
+import time
 import asyncio
-from .base import CodeResult, CodeOutput, run_process
+from typing import Optional
+from .base import CodeResult, CodeOutput, CaseResult, InputCase, RunOptions, check_case, summarize_cases
+from .prolog_pool import pool, status_return_code
 
-async def run_prolog(code: str) -> CodeResult:
+def read_output(path: str) -> str:
+    try:
+        with open(path, 'r') as f:
+            return f.read()
+    except FileNotFoundError:
+        return ""
+
+async def run_in_engine(source_file: str, tmpdir: str, name: str, input_text: Optional[str]) -> tuple[CodeResult, str]:
+    """Run the program on a pooled engine, returning its result and trace output."""
+    paths = {stream: os.path.join(tmpdir, f'{name}.{stream}') for stream in ('stdin', 'stdout', 'stderr', 'trace')}
+    with open(paths['stdin'], 'w') as f:
+        f.write(input_text or "")
+
+    try:
+        status = await pool.run(source_file, paths['stdin'], paths['stdout'], paths['stderr'], paths['trace'])
+    except Exception as e:
+        return CodeResult(stdout="", stderr=f"Failed to execute: {str(e)}", return_code=1), ""
+
+    result = CodeResult(stdout=read_output(paths['stdout']), stderr=read_output(paths['stderr']))
+    if status is None:
+        result.stderr += "Prolog engine crashed"
+        result.return_code = 1
+    elif status == 'time_limit':
+        result.stderr += "Execution timed out"
+        result.return_code = 124
+    elif status == 'inference_limit':
+        result.stderr += "Inference limit exceeded"
+        result.return_code = 1
+    else:
+        result.return_code = status_return_code(status)
+    return result, read_output(paths['trace'])
+
+async def run_prolog(code: str, options: Optional[RunOptions] = None) -> CodeResult:
+    options = options or RunOptions()
     with tempfile.TemporaryDirectory() as tmpdir:
         # Write the code to a file
         source_file = os.path.join(tmpdir, 'main.pl')
         with open(source_file, 'w') as f:
             f.write(code)
 
-        # Run the program with SWI-Prolog
-        # -q for quiet mode (no banner)
-        # -s to load the source file
-        # -t halt to terminate after running
-        # -O to optimize
-        run_result = await run_process(['swipl', '-q', '-O', '-s', source_file])
-
-        # Add the trace output if there was a compilation error
-        if run_result.return_code != 0:
-            # Run again with trace enabled to get more info
-            trace_result = await run_process(['swipl', '-q', '-O', '-s', source_file, '-t', 'trace'])
+        # Consult the program into a resident SWI-Prolog engine instead of
+        # booting swipl for every evaluation
+        if options.cases:
+            async def run_case(index: int, case: InputCase) -> CaseResult:
+                start = time.perf_counter()
+                result, _ = await run_in_engine(source_file, tmpdir, f'case{index}', case.input)
+                return check_case(case, result, time.perf_counter() - start)
+
+            case_results = await asyncio.gather(*(run_case(i, case) for i, case in enumerate(options.cases)))
+            return summarize_cases(list(case_results))
+
+        run_result, trace = await run_in_engine(source_file, tmpdir, 'main', options.stdin)
+
+        # Add the trace output if there was an error
+        if run_result.return_code != 0 and trace:
             run_result.code_outputs = [
-                CodeOutput(content=trace_result.stderr, language="prolog-trace")
+                CodeOutput(content=trace, language="prolog-trace")
             ]
 
         return run_result
@@ -1,5 +1,60 @@
-from .base import run_process
+import os
+import tempfile
+from typing import Optional
+from .base import RunOptions, run_program
+from .profiling import SAMPLE_INTERVAL_MS, attach_profile, read_folded
 
-async def run_python(code: str):
+# Runs the code the way `python -c` would, sampling the stack on a CPU-time
+# timer and writing the samples as folded stacks when the program exits
+PROFILER = r'''
+import collections, os, signal, sys, traceback
+
+profile_path, code = sys.argv[1], sys.argv[2]
+sys.argv = ['-c']
+sys.path[0] = ''
+stacks = collections.Counter()
+
+def label(code):
+    location = 'main' if code.co_filename == '<string>' else os.path.basename(code.co_filename)
+    return f"{code.co_name} ({location}:{code.co_firstlineno})".replace(';', ':')
+
+def sample(signum, frame):
+    frames = []
+    while frame is not None:
+        frames.append(frame.f_code)
+        frame = frame.f_back
+    frames.reverse()
+    # Start from the user's code, leaving out this driver
+    user = [i for i, code in enumerate(frames) if code.co_filename == '<string>']
+    if user:
+        stacks[';'.join(label(code) for code in frames[user[0]:])] += 1
+
+signal.signal(signal.SIGPROF, sample)
+signal.setitimer(signal.ITIMER_PROF, INTERVAL, INTERVAL)
+try:
+    exec(compile(code, '<string>', 'exec'), {'__name__': '__main__', '__builtins__': __builtins__})
+except SystemExit:
+    raise
+except BaseException as error:
+    # Report it as python -c would, without this driver's frame
+    traceback.print_exception(type(error), error, error.__traceback__.tb_next)
+    sys.exit(1)
+finally:
+    signal.setitimer(signal.ITIMER_PROF, 0)
+    with open(profile_path, 'w') as f:
+        f.write('\n'.join(f"{stack} {count}" for stack, count in stacks.items()))
+'''.replace('INTERVAL', str(SAMPLE_INTERVAL_MS / 1000))
+
+async def run_python(code: str, options: Optional[RunOptions] = None):
     """Run Python code using the python interpreter."""
-    return await run_process(['python', '-c', code])
+    if not (options and options.profile) or options.cases:
+        return await run_program(['python', '-c', code], options)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        profiler = os.path.join(tmpdir, 'profiler.py')
+        with open(profiler, 'w') as f:
+            f.write(PROFILER)
+        profile_path = os.path.join(tmpdir, 'profile.folded')
+        result = await run_program(['python', profiler, profile_path, code], options)
+        attach_profile(result, read_folded(profile_path))
+        return result
@@ -0,0 +1,161 @@
+import importlib
+from collections.abc import Mapping
+from dataclasses import dataclass
+from importlib.metadata import entry_points
+from typing import Awaitable, Callable, Iterator, Optional
+from .base import CodeResult, RunOptions
+from .utils import detect_system_arch
+from .opt_levels import OPT_LEVELS
+
+Runner = Callable[[str, Optional[RunOptions]], Awaitable[CodeResult]]
+
+# Third-party packages add languages by declaring entry points in this group,
+# named after the language and pointing at a RunnerSpec (or a bare runner function)
+ENTRY_POINT_GROUP = 'goforit.runners'
+
+@dataclass(frozen=True)
+class RunnerSpec:
+    """What the server needs to know about a runner without importing it.
+
+    ``target`` is the runner function as ``"module:function"``, imported on first use.
+    """
+    language: str
+    target: str
+    # Executables the runner shells out to
+    toolchains: tuple[str, ...] = ()
+    # code_outputs languages the runner can produce
+    artifacts: tuple[str, ...] = ()
+    # Seconds allowed for each build step, when the runner has one; builtin runners read it from here
+    compile_timeout: Optional[float] = None
+    # Optimization levels the runner can build side by side (RunOptions.opt_levels)
+    opt_levels: tuple[str, ...] = ()
+    # Whether the runner can run the program under a profiler (RunOptions.profile)
+    profiles: bool = False
+    # Whether the runner can run its binary under cachegrind (RunOptions.cachegrind)
+    cachegrind: bool = False
+    # Whether the runner runs its program through run_program, which can benchmark it (RunOptions.benchmark)
+    benchmark: bool = False
+    # Whether the runner can report the compiler's phase timings (RunOptions.compile_profile)
+    compile_profile: bool = False
+    # Whether the runner builds further source files and headers with the code (RunOptions.files)
+    projects: bool = False
+
+    def load(self) -> Runner:
+        module_name, _, attribute = self.target.partition(':')
+        return getattr(importlib.import_module(module_name), attribute)
+
+_ARCH = detect_system_arch()
+
+BUILTIN_RUNNERS = [
+    RunnerSpec('c', 'goforit.runners.c_runner:run_c',
+               toolchains=('gcc', 'objdump'),
+               artifacts=('asm-intel', f'asm-{_ARCH}', 'hexdump-binary', 'cachegrind', 'compile-profile'),
+               compile_timeout=2, opt_levels=OPT_LEVELS, cachegrind=True, compile_profile=True,
+               projects=True, benchmark=True),
+    RunnerSpec('cpp', 'goforit.runners.cpp_runner:run_cpp',
+               toolchains=('g++', 'objdump'),
+               artifacts=('asm-intel', f'asm-{_ARCH}', 'hexdump-binary', 'cachegrind', 'compile-profile'),
+               compile_timeout=2, opt_levels=OPT_LEVELS, cachegrind=True, compile_profile=True,
+               projects=True, benchmark=True),
+    RunnerSpec('java', 'goforit.runners.java_runner:run_java',
+               toolchains=('javac', 'java'), artifacts=('java-bytecode', 'hexdump-binary'),
+               compile_timeout=10, benchmark=True),
+    RunnerSpec('go', 'goforit.runners.go_runner:run_go',
+               toolchains=('go',), artifacts=('asm-go', 'hexdump-binary', 'compile-profile'),
+               compile_timeout=60, compile_profile=True, benchmark=True),
+    RunnerSpec('assembly', 'goforit.runners.assembly_runner:run_assembly',
+               toolchains=('nasm', 'ld', 'objdump') if _ARCH in ('x86', 'x86_64') else ('as', 'ld', 'objdump'),
+               artifacts=(f'asm-{_ARCH}', 'hexdump-binary', 'cachegrind'),
+               compile_timeout=2, cachegrind=True, benchmark=True),
+    RunnerSpec('python', 'goforit.runners.python_runner:run_python',
+               toolchains=('python',), artifacts=('flamegraph',),
+               profiles=True, benchmark=True),
+    RunnerSpec('javascript', 'goforit.runners.javascript_runner:run_javascript',
+               toolchains=('node',), artifacts=('flamegraph',),
+               profiles=True, benchmark=True),
+    RunnerSpec('typescript', 'goforit.runners.typescript_runner:run_typescript',
+               toolchains=('tsc', 'node'), artifacts=('javascript',),
+               compile_timeout=2, benchmark=True),
+    RunnerSpec('rust', 'goforit.runners.rust_runner:run_rust',
+               toolchains=('rustc',), artifacts=('asm-rust', 'llvm-ir', 'rust-mir', 'rust-stats', 'cachegrind',
+                                            'compile-profile'),
+               compile_timeout=10, opt_levels=OPT_LEVELS, cachegrind=True, compile_profile=True, benchmark=True),
+    RunnerSpec('haskell', 'goforit.runners.haskell_runner:run_haskell',
+               toolchains=('ghc',), artifacts=('haskell-core', 'compile-profile'),
+               compile_timeout=20, compile_profile=True, benchmark=True),
+    RunnerSpec('prolog', 'goforit.runners.prolog_runner:run_prolog',
+               toolchains=('swipl',), artifacts=('prolog-trace',)),
+    RunnerSpec('ruby', 'goforit.runners.ruby_runner:run_ruby',
+               toolchains=('ruby',), artifacts=('ruby-debug', 'flamegraph'),
+               profiles=True, benchmark=True),
+    RunnerSpec('brainfuck', 'goforit.runners.brainfuck_runner:run_brainfuck',
+               artifacts=('brainfuck-debug',)),
+    RunnerSpec('lua', 'goforit.runners.lua_runner:run_lua',
+               toolchains=('lua',), artifacts=('lua-debug', 'flamegraph'),
+               profiles=True, benchmark=True),
+]
+
+def discover_plugins() -> list[RunnerSpec]:
+    """Runner specs declared by installed packages under the goforit.runners entry point group."""
+    try:
+        found = entry_points(group=ENTRY_POINT_GROUP)
+    except TypeError:
+        # Python < 3.10 returns a dict of groups
+        found = entry_points().get(ENTRY_POINT_GROUP, [])
+
+    specs = []
+    for entry_point in found:
+        try:
+            target = entry_point.load()
+        except Exception as e:
+            print(f"Could not load runner plugin {entry_point.name}: {e}")
+            continue
+        if isinstance(target, RunnerSpec):
+            specs.append(target)
+        elif callable(target):
+            specs.append(RunnerSpec(entry_point.name, entry_point.value))
+        else:
+            print(f"Runner plugin {entry_point.name} is neither a RunnerSpec nor a function")
+    return specs
+
+class RunnerRegistry(Mapping):
+    """Language name to runner function, importing each runner module the first time it's looked up.
+
+    Plugins are discovered on first access and never shadow a built-in language.
+    """
+
+    def __init__(self, builtins: list[RunnerSpec]):
+        self._specs = {spec.language: spec for spec in builtins}
+        self._runners: dict[str, Runner] = {}
+        self._discovered = False
+
+    @property
+    def specs(self) -> dict[str, RunnerSpec]:
+        if not self._discovered:
+            self._discovered = True
+            for spec in discover_plugins():
+                self._specs.setdefault(spec.language, spec)
+        return self._specs
+
+    def register(self, spec: RunnerSpec) -> None:
+        self.specs[spec.language] = spec
+        self._runners.pop(spec.language, None)
+
+    def __getitem__(self, language: str) -> Runner:
+        if language not in self._runners:
+            self._runners[language] = self.specs[language].load()
+        return self._runners[language]
+
+    def __contains__(self, language: object) -> bool:
+        # Checking support must not import the runner
+        return language in self.specs
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.specs)
+
+    def __len__(self) -> int:
+        return len(self.specs)
+
+BUILTIN_SPECS = {spec.language: spec for spec in BUILTIN_RUNNERS}
+
+LANGUAGE_RUNNERS = RunnerRegistry(BUILTIN_RUNNERS)
@@ -1,28 +1,98 @@
 import tempfile
 import os
 import asyncio
-from .base import CodeResult, CodeOutput, run_process
+from typing import Optional
+from .base import CodeResult, CodeOutput, RunOptions, run_program
+from .profiling import SAMPLE_INTERVAL_MS, attach_profile, read_folded
 
-async def run_ruby(code: str) -> CodeResult:
+# Loaded with -r ahead of the program. It records what `ruby -d` would report
+# (every exception raised, with its location) plus the full backtrace of an
+# uncaught exception, so one execution yields both the result and the debug view.
+DEBUG_PRELUDE = r'''
+$goforit_debug_log = File.open(File.join(__dir__, 'debug.log'), 'w')
+$goforit_debug_log.sync = true
+
+TracePoint.new(:raise) do |tp|
+  error = tp.raised_exception
+  $goforit_debug_log.puts "Exception `#{error.class}' at #{tp.path}:#{tp.lineno} - #{error.message}"
+end.enable
+
+at_exit do
+  error = $!
+  if error && !error.is_a?(SystemExit)
+    $goforit_debug_log.puts error.full_message(highlight: false)
+  end
+end
+'''
+
+# Loaded with -r in profile mode. Like stackprof, it samples on a CPU-time
+# timer (setitimer, called through Fiddle) and records the main program's stack
+# from the signal handler, then writes folded stacks when the program exits.
+PROFILE_PRELUDE = r'''
+require 'fiddle'
+
+$goforit_profile = Hash.new(0)
+$goforit_main_file = File.expand_path($0)
+
+Signal.trap('PROF') do
+  frames = caller_locations(1).reverse
+  user = frames.index { |location| File.expand_path(location.path.to_s) == $goforit_main_file }
+  if user
+    stack = frames[user..].map { |location| "#{location.label} (#{File.basename(location.path.to_s)})".tr(';', ':') }
+    $goforit_profile[stack.join(';')] += 1
+  end
+end
+
+itimer_prof = 2
+setitimer = Fiddle::Function.new(Fiddle::Handle::DEFAULT['setitimer'],
+                                 [Fiddle::TYPE_INT, Fiddle::TYPE_VOIDP, Fiddle::TYPE_VOIDP], Fiddle::TYPE_INT)
+interval = INTERVAL_US
+# struct itimerval: the repeat interval, then the first expiry, each as (seconds, microseconds)
+setitimer.call(itimer_prof, [0, interval, 0, interval].pack('l!4'), nil)
+
+at_exit do
+  setitimer.call(itimer_prof, [0, 0, 0, 0].pack('l!4'), nil)
+  File.write(File.join(__dir__, 'profile.folded'),
+             $goforit_profile.map { |stack, count| "#{stack} #{count}" }.join("\n"))
+end
+'''.replace('INTERVAL_US', str(SAMPLE_INTERVAL_MS * 1000))
+
+async def run_ruby(code: str, options: Optional[RunOptions] = None) -> CodeResult:
     with tempfile.TemporaryDirectory() as tmpdir:
         # Write the code to a file
         source_file = os.path.join(tmpdir, 'main.rb')
         with open(source_file, 'w') as f:
             f.write(code)
 
-        # Run Ruby with warnings enabled and syntax check first
-        check_result = await run_process(['ruby', '-wc', source_file])
-        if check_result.return_code != 0:
-            return check_result
+        prelude_file = os.path.join(tmpdir, 'debug.rb')
+        with open(prelude_file, 'w') as f:
+            f.write(DEBUG_PRELUDE)
+
+        cmd = ['ruby', '-w', '-r', prelude_file]
+        profile = options and options.profile and not options.cases
+        if profile:
+            profile_prelude = os.path.join(tmpdir, 'profile.rb')
+            with open(profile_prelude, 'w') as f:
+                f.write(PROFILE_PRELUDE)
+            cmd += ['-r', profile_prelude]
 
-        # Run the program with warnings and debug info
-        run_result = await run_process(['ruby', '-w', source_file])
+        # Run the program with warnings and debug info. Ruby parses the whole
+        # file before executing it, so syntax errors are reported by this same run.
+        run_result = await run_program([*cmd, source_file], options)
+        if profile:
+            attach_profile(run_result, read_folded(os.path.join(tmpdir, 'profile.folded')))
 
-        # If there was an error, get the backtrace with debug info
-        if run_result.return_code != 0:
-            debug_result = await run_process(['ruby', '-w', '-d', source_file])
-            run_result.code_outputs = [
-                CodeOutput(content=debug_result.stderr, language="ruby-debug")
-            ]
+        # If there was an error, attach the debug trace collected during the run
+        # (with input cases the runs share the log, each case's stderr has its error)
+        if run_result.return_code != 0 and not (options and options.cases):
+            try:
+                with open(os.path.join(tmpdir, 'debug.log'), 'r') as f:
+                    debug_output = f.read()
+            except FileNotFoundError:
+                debug_output = ""
+            if debug_output:
+                run_result.code_outputs += [
+                    CodeOutput(content=debug_output, language="ruby-debug")
+                ]
 
         return run_result
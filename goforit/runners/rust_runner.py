@@ -1,26 +1,176 @@
 import os
+import re
+import time
+import shlex
+import shutil
 import tempfile
-from .base import run_process, CodeResult
+from typing import Optional
+from .base import run_process, run_program, run_diagnostics, CodeResult, CodeOutput, RunOptions
+from .utils import detect_system_arch
+from .opt_levels import LevelBuild, build_opt_levels, run_opt_levels
+from .cachegrind import cachegrind_output
+from .compile_profile import compile_profile_output, parse_rustc_time_passes
+from .workspace import build_workspace, write_if_changed
+from .registry import BUILTIN_SPECS
 
-async def run_rust(code: str) -> CodeResult:
+# Optimized builds with extra --emit outputs take longer than the default 2s
+COMPILE_TIMEOUT = BUILTIN_SPECS['rust'].compile_timeout
+
+# Shorthands accepted in the flags header, expanded to rustc codegen options
+DEFAULT_PROFILE = 'release'
+PROFILES = {
+    'debug': ['-C', 'opt-level=0', '-C', 'debuginfo=2'],
+    'release': ['-C', 'opt-level=3'],
+}
+
+# rustc's -C opt-level for each comparable level
+RUST_OPT_LEVELS = {'O0': '0', 'O1': '1', 'O2': '2', 'O3': '3', 'Os': 's'}
+
+def parse_build_flags(code: str) -> list[str]:
+    """Extract rustc flags from a first line comment like `// flags: debug -C target-cpu=native`.
+
+    Without a profile in the header the build uses the release one, so the listings show optimized code.
+    """
+    flags_match = re.match(r'//\s*flags:\s*(.*)', code)
+    header = shlex.split(flags_match.group(1)) if flags_match else []
+    if not any(flag in PROFILES for flag in header):
+        header.insert(0, DEFAULT_PROFILE)
+    flags = []
+    for flag in header:
+        flags.extend(PROFILES.get(flag, [flag]))
+    return flags
+
+def read_artifact(path: str) -> str:
+    try:
+        with open(path, 'r') as f:
+            return f.read()
+    except Exception as e:
+        print(f"Error reading {path}: {e}")
+        return ""
+
+def format_compile_stats(compile_time: float, flags: list[str], executable: str, artifacts: dict[str, str]) -> str:
+    try:
+        binary_size = os.path.getsize(executable)
+    except OSError:
+        binary_size = 0
+    lines = [
+        f"flags:         {' '.join(flags) or '(none)'}",
+        f"compile time:  {compile_time:.3f}s",
+        f"binary size:   {binary_size} bytes",
+        f"IR functions:  {len(re.findall(r'^define ', artifacts['llvm-ir'], re.MULTILINE))}",
+    ]
+    for kind, text in artifacts.items():
+        label = f"{kind} lines:"
+        lines.append(f"{label:<15}{len(text.splitlines())}")
+    return '\n'.join(lines)
+
+async def run_rust(code: str, options: Optional[RunOptions] = None) -> CodeResult:
     """Run Rust code by compiling and executing."""
     with tempfile.TemporaryDirectory() as tmpdir:
-        # Create a basic Rust project structure
-        main_rs = os.path.join(tmpdir, 'main.rs')
-        
-        # Write the code to main.rs
-        with open(main_rs, 'w') as f:
-            f.write(code)
-        
+        flags = parse_build_flags(code)
+        codegen_flags = list(flags)
+        if detect_system_arch() in ('x86_64', 'x86'):
+            codegen_flags += ['-C', 'llvm-args=-x86-asm-syntax=intel']
+
+        level_builds = None
         try:
-            # Compile the Rust code
-            compile_result = await run_process(['rustc', main_rs, '-o', os.path.join(tmpdir, 'program')])
-            if compile_result.return_code != 0:
-                return compile_result
-            
+            # With a session, main.rs keeps its path and the incremental cache survives between evaluations
+            async with build_workspace('rust', options) as build_dir:
+                main_rs = os.path.join(build_dir, 'main.rs')
+                write_if_changed(main_rs, code)
+
+                # Type-check only (like cargo check) so errors come back before codegen
+                diagnostics = await run_diagnostics([
+                    'rustc',
+                    '--crate-name', 'main',
+                    '--emit=metadata',
+                    '--out-dir', os.path.join(build_dir, 'check'),
+                    *flags,
+                    main_rs
+                ], timeout=COMPILE_TIMEOUT)
+                if diagnostics:
+                    return diagnostics
+
+                if options and options.opt_levels:
+                    async def build(level: str, outdir: str) -> LevelBuild:
+                        # The level goes last so it overrides a profile from the flags header
+                        result = await run_process([
+                            'rustc',
+                            '--crate-name', 'main',
+                            '--emit=link,asm',
+                            '--out-dir', outdir,
+                            *codegen_flags,
+                            '-C', f'opt-level={RUST_OPT_LEVELS[level]}',
+                            main_rs
+                        ], timeout=COMPILE_TIMEOUT)
+                        if result.return_code != 0:
+                            return LevelBuild(error=result)
+                        return LevelBuild(executable=os.path.join(outdir, 'main'),
+                                          asm=read_artifact(os.path.join(outdir, 'main.s')))
+                    # Only the builds need the workspace, the programs run after it's released
+                    level_builds = await build_opt_levels(options.opt_levels, build, tmpdir)
+                else:
+                    if options and options.session:
+                        # Not for the opt-level builds above, which run side by side
+                        codegen_flags += ['-C', f"incremental={os.path.join(build_dir, 'incremental')}"]
+
+                    if options and options.cachegrind:
+                        # Line tables let cachegrind attribute counts to lines of main.rs
+                        codegen_flags += ['-C', 'debuginfo=line-tables-only']
+
+                    # -Z time-passes is unstable, RUSTC_BOOTSTRAP lets a stable rustc accept it
+                    time_passes = ['-Z', 'time-passes'] if options and options.compile_profile else []
+
+                    # One rustc invocation emits the binary together with its assembly, LLVM IR and MIR
+                    compile_start = time.time()
+                    compile_result = await run_process([
+                        'rustc',
+                        '--crate-name', 'main',
+                        '--emit=link,asm,llvm-ir,mir',
+                        '--out-dir', build_dir,
+                        *codegen_flags,
+                        *time_passes,
+                        main_rs
+                    ], timeout=COMPILE_TIMEOUT, env={'RUSTC_BOOTSTRAP': '1'} if time_passes else None)
+                    compile_time = time.time() - compile_start
+                    if compile_result.return_code != 0:
+                        return compile_result
+
+                    artifacts = {
+                        'asm': read_artifact(os.path.join(build_dir, 'main.s')),
+                        'llvm-ir': read_artifact(os.path.join(build_dir, 'main.ll')),
+                        'mir': read_artifact(os.path.join(build_dir, 'main.mir')),
+                    }
+                    stats = format_compile_stats(compile_time, flags, os.path.join(build_dir, 'main'), artifacts)
+
+                    # Run a copy so the workspace is free for the next build
+                    executable = os.path.join(tmpdir, 'main')
+                    shutil.copy2(os.path.join(build_dir, 'main'), executable)
+                    # Cachegrind reads main.rs by the path in the debug info, which a temp build dir doesn't keep
+                    cachegrind = (await cachegrind_output([executable], options, main_rs)
+                                  if options and options.cachegrind else None)
+
+            if level_builds is not None:
+                return await run_opt_levels(level_builds, "asm-rust", options)
+
             # Run the program
-            return await run_process([os.path.join(tmpdir, 'program')])
-        
+            run_result = await run_program([executable], options)
+            if run_result.return_code != 0:
+                return run_result
+
+            run_result.code_outputs.append(CodeOutput(content=artifacts['asm'], language="asm-rust"))
+            if cachegrind:
+                run_result.code_outputs.append(cachegrind)
+            run_result.code_outputs += [
+                CodeOutput(content=artifacts['llvm-ir'], language="llvm-ir"),
+                CodeOutput(content=artifacts['mir'], language="rust-mir"),
+                CodeOutput(content=stats, language="rust-stats"),
+            ]
+            if time_passes:
+                run_result.code_outputs.append(
+                    compile_profile_output(parse_rustc_time_passes(compile_result.stderr)))
+            return run_result
+
         except Exception as e:
             return CodeResult(
                 stdout="",
@@ -1,4 +1,5 @@
 import pytest
+import os
 import asyncio
 
 @pytest.fixture
@@ -14,3 +15,8 @@ def run_async():
     def _run_async(coro):
         return asyncio.get_event_loop().run_until_complete(coro)
     return _run_async
+
+@pytest.fixture(autouse=True, scope='session')
+def isolated_cache_dir(tmp_path_factory):
+    """Keep build caches written by the runners out of the user's cache directory."""
+    os.environ['GOFORIT_CACHE_DIR'] = str(tmp_path_factory.mktemp('cache'))
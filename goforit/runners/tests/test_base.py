@@ -0,0 +1,66 @@
+import pytest
+from goforit.runners.base import RunOptions, InputCase, run_program, run_diagnostics, outputs_match
+from goforit.runners.c_runner import run_c
+from goforit.runners.brainfuck_runner import run_brainfuck
+
+def test_outputs_match_ignores_trailing_whitespace():
+    assert outputs_match("1 2 \n3\n\n", "1 2\n3")
+    assert not outputs_match("1 2\n3\n", "1 2\n4\n")
+
+def test_run_program_with_stdin(run_async):
+    result = run_async(run_program(['cat'], RunOptions(stdin="hello\n")))
+    assert result.stdout == "hello\n"
+    assert result.return_code == 0
+
+def test_run_program_cases(run_async):
+    options = RunOptions(cases=[
+        InputCase(input="1\n", expected_output="1"),
+        InputCase(input="2\n", expected_output="3"),
+        InputCase(input="3\n"),
+    ])
+    result = run_async(run_program(['cat'], options))
+    assert [case.stdout for case in result.case_results] == ["1\n", "2\n", "3\n"]
+    assert [case.passed for case in result.case_results] == [True, False, None]
+    assert all(case.duration >= 0 for case in result.case_results)
+    # The top-level result shows the first failing case
+    assert result.stdout == "2\n"
+
+def test_compiled_program_cases(run_async):
+    code = '''
+    #include <stdio.h>
+    int main() {
+        int a, b;
+        scanf("%d %d", &a, &b);
+        printf("%d\\n", a + b);
+        return 0;
+    }
+    '''
+    options = RunOptions(cases=[
+        InputCase(input="1 2", expected_output="3"),
+        InputCase(input="40 2", expected_output="42"),
+    ])
+    result = run_async(run_c(code, options))
+    assert result.return_code == 0
+    assert [case.passed for case in result.case_results] == [True, True]
+    assert result.stdout == "3\n"
+
+def test_brainfuck_cases(run_async):
+    options = RunOptions(cases=[
+        InputCase(input="a", expected_output="a"),
+        InputCase(input="b", expected_output="c"),
+    ])
+    result = run_async(run_brainfuck(",.", options))
+    assert [case.passed for case in result.case_results] == [True, False]
+
+def test_run_diagnostics_reports_only_errors(run_async):
+    assert run_async(run_diagnostics(['true'])) is None
+    assert run_async(run_diagnostics(['no-such-checker-installed'])) is None
+    result = run_async(run_diagnostics(['false']))
+    assert result.phase == "diagnostics"
+    assert result.return_code != 0
+
+def test_c_syntax_error_stops_at_diagnostics(run_async):
+    result = run_async(run_c("int main() { return 0 }\n"))
+    assert result.phase == "diagnostics"
+    assert "expected" in result.stderr
+    assert result.code_outputs == []
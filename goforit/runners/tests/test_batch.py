@@ -0,0 +1,70 @@
+import json
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from goforit.batch import evaluate_batch
+from goforit.main import app, BatchItem
+
+async def collect(results):
+    return [item async for item in results]
+
+def test_duplicates_evaluated_once(run_async):
+    calls = []
+
+    async def evaluate(item):
+        calls.append(item)
+        return item.upper()
+
+    items = ['a', 'b', 'a', 'a']
+    results = run_async(collect(evaluate_batch(items, evaluate, key=lambda item: item)))
+    assert sorted(calls) == ['a', 'b']
+    assert sorted(results) == [(0, 'A'), (1, 'B'), (2, 'A'), (3, 'A')]
+
+def test_concurrency_is_bounded(run_async):
+    running = 0
+    peak = 0
+
+    async def evaluate(item):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return item
+
+    items = list(range(10))
+    results = run_async(collect(evaluate_batch(items, evaluate, key=lambda item: item, concurrency=3)))
+    assert peak == 3
+    assert sorted(index for index, _ in results) == items
+
+def test_batch_endpoint_streams_ndjson():
+    client = TestClient(app)
+    response = client.post('/api/evaluate/batch', json={'items': [
+        {'language': 'python', 'code': 'print(input())', 'stdin': 'one\n'},
+        {'language': 'python', 'code': 'print(input())', 'stdin': 'two\n'},
+        {'language': 'python', 'code': '1/0'},
+    ]})
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    lines = {line['index']: line for line in map(json.loads, response.text.splitlines())}
+    assert lines[0]['stdout'] == 'one\n'
+    assert lines[1]['stdout'] == 'two\n'
+    assert lines[2]['return_code'] != 0
+    assert 'ZeroDivisionError' in lines[2]['stderr']
+
+def test_batch_endpoint_rejects_unknown_language():
+    client = TestClient(app)
+    response = client.post('/api/evaluate/batch', json={'items': [
+        {'language': 'cobol', 'code': 'DISPLAY "HI".'},
+    ]})
+    assert response.status_code == 400
+
+def test_coalesce_opt_out_keys_are_unique():
+    shared = [BatchItem(language="python", code="print(1)") for _ in range(2)]
+    separate = [BatchItem(language="python", code="print(1)", coalesce=False) for _ in range(2)]
+    assert shared[0].key() == shared[1].key()
+    assert separate[0].key() != separate[1].key()
+
+def test_sessions_keep_their_own_builds():
+    first, second = (BatchItem(language="rust", code="fn main() {}", session_id=session) for session in "ab")
+    assert first.key() != second.key()
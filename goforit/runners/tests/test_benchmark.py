@@ -0,0 +1,64 @@
+import asyncio
+import sys
+from fastapi.testclient import TestClient
+from goforit.main import app
+from goforit.runners import RunOptions
+from goforit.runners.base import run_program
+from goforit.runners.benchmark import Benchmark, BenchmarkOptions, RunSample, benchmark_lock, run_benchmark
+
+def sample(wall: float) -> RunSample:
+    return RunSample(wall=wall, cpu=wall, max_rss=1024, return_code=0)
+
+def test_outliers_are_dropped():
+    benchmark = Benchmark(samples=[sample(wall) for wall in (1.0, 1.1, 0.9, 1.0, 1.05, 9.0)])
+    summary = benchmark.summary()
+    assert summary["outliers"] == 1
+    assert summary["wall"]["min"] == 0.9
+    assert summary["wall"]["median"] == 1.0
+
+def test_measures_each_run(tmp_path):
+    stdin = tmp_path / "stdin"
+    stdin.write_text("7\n")
+    cmd = [sys.executable, "-c", "import sys; assert sys.stdin.read() == '7\\n'; b = bytearray(32 << 20)"]
+    benchmark = run_benchmark(cmd, BenchmarkOptions(runs=3, warmups=1), str(stdin))
+    assert benchmark.error is None
+    assert len(benchmark.samples) == 3
+    assert all(run.wall > 0 and run.cpu > 0 for run in benchmark.samples)
+    # Each run's own peak RSS, which includes the 32MB buffer
+    assert all(run.max_rss > 32 << 20 for run in benchmark.samples)
+
+def test_failing_run_stops_benchmark():
+    benchmark = run_benchmark([sys.executable, "-c", "raise SystemExit(3)"], BenchmarkOptions(runs=5))
+    assert benchmark.samples == []
+    assert benchmark.error == "run exited with 3"
+
+def test_run_program_adds_benchmark_output(run_async):
+    options = RunOptions(stdin="hi\n", benchmark=BenchmarkOptions(runs=3, warmups=0))
+    result = run_async(run_program([sys.executable, "-c", "print(input())"], options))
+    assert result.stdout == "hi\n"
+    assert [output.language for output in result.code_outputs] == ["benchmark"]
+    assert result.code_outputs[0].metadata["runs"] == 3
+
+def test_queued_benchmarks_wait_in_the_loop(run_async):
+    async def while_another_benchmarks():
+        options = RunOptions(benchmark=BenchmarkOptions(runs=1, warmups=0))
+        async with benchmark_lock():
+            queued = asyncio.ensure_future(run_program([sys.executable, "-c", "pass"], options))
+            await asyncio.sleep(0.5)
+            assert not queued.done()
+            # The executor is free for everything else meanwhile
+            assert await asyncio.get_running_loop().run_in_executor(None, lambda: 42) == 42
+        return await queued
+
+    result = run_async(while_another_benchmarks())
+    assert result.code_outputs[0].metadata["runs"] == 1
+
+def test_evaluate_validates_benchmark(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = TestClient(app)
+    response = client.post('/api/evaluate', json={"language": "python", "code": "print(1)", "benchmark": {"runs": 1000}})
+    assert response.status_code == 422
+    response = client.post('/api/evaluate', json={"language": "python", "code": "print(1)", "benchmark": {"runs": 2}})
+    assert response.json()["code_outputs"][0]["language"] == "benchmark"
+    response = client.post('/api/evaluate', json={"language": "brainfuck", "code": "+", "benchmark": {"runs": 2}})
+    assert response.status_code == 400
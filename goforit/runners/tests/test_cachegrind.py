@@ -0,0 +1,70 @@
+import shutil
+import pytest
+from fastapi.testclient import TestClient
+from goforit.main import app
+from goforit.runners import RunOptions
+from goforit.runners.cachegrind import format_profile, parse_cachegrind
+from goforit.runners.c_runner import run_c
+
+CACHEGRIND_OUT = '''\
+desc: I1 cache:         32768 B, 64 B, 8-way associative
+desc: D1 cache:         32768 B, 64 B, 8-way associative
+desc: LL cache:         8388608 B, 64 B, 16-way associative
+cmd: ./main
+events: Ir I1mr ILmr Dr D1mr DLmr Dw D1mw DLmw Bc Bcm Bi Bim
+fl=(1) /tmp/main.c
+fn=(1) sum
+3 4 1 1 2 0 0 1 0 0 0 0 0 0
+4 3000 0 0 1000 125 125 0 0 0 1000 3 0 0
+fi=(2) /usr/include/stdlib.h
+12 10 0 0 2 0 0 0 0 0 0 0 0 0
+fn=(2) main
+8 6 0 0 1 0 0 2 1 1
+fl=(3) ???
+fn=(3) _dl_start
+0 500 20 20 100 10 5 50 5 5 40 8 0 0
+fl=(1)
+fn=(1)
+4 1000 0 0 0 0 0 0 0 0 0 0 0 0
+summary: 4520 21 21 1105 135 130 53 6 6 1040 11 0 0
+'''
+
+SOURCE = ["#include <stdio.h>", "", "long sum(int *a, int n) {", "    for (int i = 0; i < n; i++) s += a[i];",
+          "}", "", "", "int main() {"]
+
+def test_parse_sums_per_function_and_line():
+    profile = parse_cachegrind(CACHEGRIND_OUT)
+    assert profile.events[:3] == ["Ir", "I1mr", "ILmr"]
+    # Compressed names are resolved, and inlined lines still count toward sum
+    assert profile.functions[("/tmp/main.c", "sum")][0] == 4 + 3000 + 10 + 1000
+    assert profile.lines[("/tmp/main.c", 4)][0] == 4000
+    assert profile.lines[("/usr/include/stdlib.h", 12)][0] == 10
+    # Short lines leave the trailing events at zero
+    assert profile.functions[("/tmp/main.c", "main")] == [6, 0, 0, 1, 0, 0, 2, 1, 1]
+    assert profile.totals() == {"instructions": 4520, "D1 misses": 141, "I1 misses": 21,
+                                "LL misses": 157, "branches": 1040, "mispredicts": 11}
+
+def test_format_lists_busiest_functions_and_source_lines():
+    content, metadata = format_profile(parse_cachegrind(CACHEGRIND_OUT), SOURCE, "/tmp/main.c")
+    assert [row["function"] for row in metadata["functions"]] == ["sum", "_dl_start", "main"]
+    # Only lines of the user's file, with their source
+    assert [(row["line"], row["instructions"]) for row in metadata["lines"]] == [(4, 4000), (8, 6), (3, 4)]
+    assert metadata["lines"][0]["source"] == SOURCE[3]
+    assert metadata["lines"][0]["D1 misses"] == 125
+    assert "for (int i = 0; i < n; i++)" in content
+
+@pytest.mark.skipif(not shutil.which('valgrind'), reason="valgrind required")
+def test_c_cachegrind(run_async):
+    code = "int main() {\n    volatile long s = 0;\n    for (int i = 0; i < 100000; i++) s += i;\n    return 0;\n}\n"
+    result = run_async(run_c(code, RunOptions(cachegrind=True)))
+    assert result.return_code == 0
+    output = next(output for output in result.code_outputs if output.language == "cachegrind")
+    assert output.metadata["totals"]["instructions"] > 100000
+    assert any(row["function"] == "main" for row in output.metadata["functions"])
+    assert max(output.metadata["lines"], key=lambda row: row["instructions"])["line"] == 3
+
+def test_cachegrind_rejected_for_interpreted_languages(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = TestClient(app)
+    response = client.post('/api/evaluate', json={"language": "python", "code": "print(1)", "cachegrind": True})
+    assert response.status_code == 400
@@ -0,0 +1,95 @@
+import json
+import shutil
+import pytest
+from fastapi.testclient import TestClient
+from goforit.main import app
+from goforit.runners import RunOptions
+from goforit.runners.compile_profile import (compile_profile_output, parse_gcc_time_report, parse_ghc_timings,
+                                             parse_go_actiongraph, parse_rustc_time_passes)
+from goforit.runners.cpp_runner import run_cpp
+from goforit.runners.go_runner import run_go
+from goforit.runners.rust_runner import run_rust
+
+TIME_REPORT = '''\
+Time variable                                   usr           sys          wall           GGC
+ phase setup                        :   0.00 (  0%)   0.00 (  0%)   0.00 (  0%)  1576k (  7%)
+ phase parsing                      :   0.17 ( 81%)   0.11 ( 79%)   0.30 ( 81%)    16M ( 79%)
+ |name lookup                       :   0.04 ( 19%)   0.00 (  0%)   0.04 ( 11%)  1016k (  5%)
+ template instantiation             :   0.06 ( 29%)   0.02 ( 14%)   0.04 ( 11%)  2979k ( 14%)
+ TOTAL                              :   0.21          0.14          0.37           21M
+'''
+
+TIME_PASSES = '''\
+time:   0.000; rss:   35MB ->   37MB (   +2MB)\tparse_crate
+time:   0.002; rss:   57MB ->   66MB (   +9MB)\ttype_check_crate
+time:   0.050; rss:   76MB ->   77MB (   +0MB)\trun_linker
+time:   0.080; rss:   28MB ->   75MB (  +47MB)\ttotal
+'''
+
+def test_gcc_time_report():
+    profile = parse_gcc_time_report(TIME_REPORT)
+    assert profile.total == 0.37
+    assert [(phase.name, phase.seconds) for phase in profile.phases][:3] == [
+        ("phase setup", 0.0), ("phase parsing", 0.30), ("name lookup", 0.04)]
+    assert profile.phases[1].memory == 16 << 20
+
+def test_rustc_time_passes():
+    profile = parse_rustc_time_passes(TIME_PASSES)
+    assert profile.total == 0.08
+    assert [phase.name for phase in profile.phases] == ["parse_crate", "type_check_crate", "run_linker"]
+    assert profile.phases[1].memory == 9 << 20
+
+def test_go_actiongraph_skips_cached_packages():
+    actions = [
+        {"ID": 0, "Mode": "link", "Package": "main", "Cmd": ["link"], "CmdReal": 120_000_000,
+         "TimeStart": "2024-01-01T00:00:00.5Z", "TimeDone": "2024-01-01T00:00:00.62Z"},
+        {"ID": 1, "Mode": "build", "Package": "main", "Cmd": ["compile"], "CmdReal": 30_000_000,
+         "TimeStart": "2024-01-01T00:00:00.4Z", "TimeDone": "2024-01-01T00:00:00.43Z"},
+        {"ID": 2, "Mode": "build", "Package": "fmt", "Cmd": None,
+         "TimeStart": "2024-01-01T00:00:00.1Z", "TimeDone": "2024-01-01T00:00:00.100000001Z"},
+    ]
+    profile = parse_go_actiongraph(json.dumps(actions))
+    assert [(phase.name, phase.seconds) for phase in profile.phases] == [("link", 0.12), ("compile main", 0.03)]
+    assert profile.total == pytest.approx(0.52)
+    assert profile.note == "build cache: 1 packages"
+
+def test_ghc_timings():
+    profile = parse_ghc_timings("Parser [Main]: alloc=4456056 time=1.722\nCodeGen [Main]: alloc=100 time=10.5\n")
+    assert [phase.name for phase in profile.phases] == ["Parser [Main]", "CodeGen [Main]"]
+    assert profile.total == pytest.approx(0.012222)
+
+def test_output_lists_slowest_phases_first():
+    output = compile_profile_output(parse_gcc_time_report(TIME_REPORT))
+    assert output.language == "compile-profile"
+    assert [row["phase"] for row in output.metadata["phases"]][:2] == ["phase parsing", "name lookup"]
+    assert output.metadata["phases"][0]["share"] == pytest.approx(0.30 / 0.37)
+    assert output.content.splitlines()[0] == "gcc build: 0.370s"
+
+def compile_profile(result):
+    return next(output for output in result.code_outputs if output.language == "compile-profile")
+
+@pytest.mark.skipif(not shutil.which('g++'), reason="g++ required")
+def test_cpp_compile_profile(run_async):
+    code = "#include <map>\nint main() { std::map<int, int> m; return m.size(); }\n"
+    result = run_async(run_cpp(code, RunOptions(compile_profile=True)))
+    assert result.return_code == 0
+    assert compile_profile(result).metadata["total"] > 0
+
+@pytest.mark.skipif(not shutil.which('rustc'), reason="rustc required")
+def test_rust_compile_profile(run_async):
+    result = run_async(run_rust('fn main() { println!("hi"); }', RunOptions(compile_profile=True)))
+    assert result.stdout == "hi\n"
+    assert any(row["phase"] == "type_check_crate" for row in compile_profile(result).metadata["phases"])
+
+@pytest.mark.skipif(not shutil.which('go'), reason="go required")
+def test_go_compile_profile(run_async):
+    code = 'package main\nimport "fmt"\nfunc main() { fmt.Println("hi") }\n'
+    result = run_async(run_go(code, RunOptions(compile_profile=True)))
+    assert result.stdout == "hi\n"
+    assert "link" in [row["phase"] for row in compile_profile(result).metadata["phases"]]
+
+def test_compile_profile_rejected_for_interpreted_languages(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = TestClient(app)
+    response = client.post('/api/evaluate', json={"language": "ruby", "code": "p 1", "compile_profile": True})
+    assert response.status_code == 400
@@ -0,0 +1,86 @@
+import shutil
+import pytest
+from fastapi.testclient import TestClient
+from goforit.main import app
+from goforit.runners.c_runner import run_c
+from goforit.runners.disassembly import DisassemblyStore, parse_objdump
+
+OBJDUMP = """
+/tmp/x/main:     file format elf64-x86-64
+
+
+Disassembly of section .plt:
+
+0000000000001030 <puts@plt>:
+    1030:\tff 25 ca 2f 00 00    \tjmp    *0x2fca(%rip)
+    1036:\t68 00 00 00 00       \tpush   $0x0
+
+Disassembly of section .text:
+
+0000000000001050 <_start>:
+_start():
+    1050:\t31 ed                \txor    %ebp,%ebp
+    1072:\t66 2e 0f 1f 84 00 00 \tcs nopw 0x0(%rax,%rax,1)
+    1079:\t00 00 00
+
+0000000000001139 <main>:
+main():
+/tmp/x/main.c:3
+    1139:\t55                   \tpush   %rbp
+/tmp/x/main.c:4
+    113a:\tc3                   \tret
+"""
+
+def test_parse_objdump_indexes_symbols():
+    index = parse_objdump(OBJDUMP, "/tmp/x/main.c")
+    assert list(index.symbols) == ["puts@plt", "_start", "main"]
+    assert [name for name, symbol in index.symbols.items() if symbol.user] == ["main"]
+
+    main = index.symbols["main"]
+    assert (main.section, main.start, main.end) == (".text", 0x1139, 0x113b)
+    assert [(i.text, i.line) for i in main.instructions] == [("push   %rbp", 3), ("ret", 4)]
+    # Continuation lines add their bytes to the instruction before them
+    assert index.symbols["_start"].instructions[-1].size == 10
+
+    rendered = index.render()
+    assert "<main>:" in rendered and "main.c:3" in rendered
+    assert "_start" not in rendered and "/tmp/x/main.c" not in rendered
+
+def test_without_line_info_every_symbol_is_users():
+    index = parse_objdump(OBJDUMP.replace("/tmp/x/main.c:3\n", "").replace("/tmp/x/main.c:4\n", ""), "/tmp/x/main.c")
+    assert all(symbol.user for symbol in index.symbols.values())
+
+def test_store_drops_least_recently_used():
+    store = DisassemblyStore(max_indexes=2)
+    first, second, third = (parse_objdump(OBJDUMP + f"\n# {n}") for n in range(3))
+    store.add(first)
+    store.add(second)
+    store.get(first.id)
+    store.add(third)
+    assert store.get(second.id) is None
+    assert store.get(first.id) is first
+
+@pytest.mark.skipif(not shutil.which('gcc') or not shutil.which('objdump'), reason="gcc and objdump required")
+def test_c_disassembly_has_only_user_functions(run_async):
+    code = '''
+    #include <stdio.h>
+    static int square(int x) { return x * x; }
+    int main() {
+        printf("%d\\n", square(7));
+        return 0;
+    }
+    '''
+    result = run_async(run_c(code))
+    assert result.stdout == "49\n"
+    disassembly = result.code_outputs[1]
+    assert "<square>:" in disassembly.content
+    assert "<_start>:" not in disassembly.content
+
+    symbols = {symbol["name"]: symbol for symbol in disassembly.metadata["symbols"]}
+    assert symbols["main"]["user"] and not symbols["_start"]["user"]
+
+    client = TestClient(app)
+    response = client.get(f'/api/disassembly/{disassembly.metadata["disassembly"]}/_start')
+    assert response.status_code == 200
+    assert response.json()["instructions"]
+    assert client.get(f'/api/disassembly/{disassembly.metadata["disassembly"]}/missing').status_code == 404
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import pytest
+from goforit.agent import result_from_wire, result_to_wire
+from goforit.dispatch import Agent, AgentPool
+from goforit.runners import CodeOutput, CodeResult, RunOptions
+
+@pytest.fixture
+def agent_sockets(tmp_path):
+    """Two runner agent processes on Unix sockets."""
+    pytest.importorskip("uvicorn")
+    sockets = [str(tmp_path / f"agent-{i}.sock") for i in range(2)]
+    processes = [subprocess.Popen([sys.executable, '-m', 'goforit.agent', '--socket', path, '--capacity', '2',
+                                   '--no-warmup'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                 for path in sockets]
+    deadline = time.monotonic() + 20
+    while not all(os.path.exists(path) for path in sockets) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    yield sockets
+    for process in processes:
+        process.terminate()
+        process.wait()
+
+def test_least_loaded_agent_with_the_language():
+    busy = Agent("unix:/a", languages=frozenset({"python", "haskell"}), capacity=4, healthy=True, active=3)
+    idle = Agent("unix:/b", languages=frozenset({"python"}), capacity=1, healthy=True)
+    down = Agent("unix:/c", languages=frozenset({"python", "haskell"}), capacity=8)
+    pool = AgentPool()
+    pool.agents = [busy, idle, down]
+    assert pool.pick("python") is idle
+    # Only agents with ghc get Haskell, however busy they are
+    assert pool.pick("haskell") is busy
+    assert pool.pick("haskell", exclude=[busy]) is None
+    assert pool.languages() == {"python", "haskell"}
+
+def test_equally_loaded_agents_take_turns():
+    pool = AgentPool(["unix:/a", "unix:/b"])
+    for agent in pool.agents:
+        agent.healthy, agent.languages = True, frozenset({"python"})
+    pool.agents[0].dispatched = 1
+    assert pool.pick("python") is pool.agents[1]
+
+def test_result_round_trips_over_the_wire():
+    result = CodeResult(stdout="hi\n", return_code=0, code_outputs=[
+        CodeOutput(data=b"\x7fELF", language="hexdump-binary"),
+        CodeOutput(content="mov eax, 1", language="asm-x86_64", metadata={"disassembly": "abc"}),
+    ], timings={"run": 0.5})
+    restored = result_from_wire(result_to_wire(result))
+    assert restored.stdout == "hi\n"
+    assert restored.code_outputs[0].data == b"\x7fELF"
+    assert restored.code_outputs[1].metadata == {"disassembly": "abc"}
+    assert restored.timings == {"run": 0.5}
+
+def test_dispatch_to_agent_processes(run_async, agent_sockets):
+    pool = AgentPool(f"unix:{path}" for path in agent_sockets)
+    run_async(pool.check_all())
+    assert all(agent.healthy and "python" in agent.languages for agent in pool.agents)
+
+    async def run_several():
+        return await asyncio.gather(*(pool.run("python", f"print(input() * {i})", RunOptions(stdin="ab"))
+                                      for i in range(4)))
+
+    results = run_async(run_several())
+    assert [result.stdout for result in results] == ["\n", "ab\n", "abab\n", "ababab\n"]
+    # Spread over both agents
+    assert [agent.dispatched for agent in pool.agents] == [2, 2]
+
+def test_unreachable_agent_is_skipped(run_async, agent_sockets, tmp_path):
+    pool = AgentPool([f"unix:{tmp_path / 'gone.sock'}", f"unix:{agent_sockets[0]}"])
+    run_async(pool.check_all())
+    # Passed its last health check, then went away
+    pool.agents[0].healthy, pool.agents[0].languages = True, pool.agents[1].languages
+    result = run_async(pool.run("python", "print(1)"))
+    assert result.stdout == "1\n"
+    assert not pool.agents[0].healthy
+
+def test_server_dispatches_to_agents(run_async, agent_sockets, tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    from goforit import main
+
+    pool = AgentPool(f"unix:{path}" for path in agent_sockets)
+    run_async(pool.check_all())
+    monkeypatch.setattr(main, "agent_pool", pool)
+    monkeypatch.chdir(tmp_path)
+    client = TestClient(main.app)
+    response = client.post('/api/evaluate', json={"language": "python", "code": "print(6 * 7)"})
+    assert response.json()["stdout"] == "42\n"
+    assert sum(agent["dispatched"] for agent in client.get('/api/agents').json()) == 1
+    # Languages no agent has are refused up front
+    for agent in pool.agents:
+        agent.languages -= {"brainfuck"}
+    response = client.post('/api/evaluate', json={"language": "brainfuck", "code": "+"})
+    assert response.status_code == 503
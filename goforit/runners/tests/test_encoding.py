@@ -0,0 +1,39 @@
+import base64
+import gzip
+import json
+from starlette.datastructures import Headers
+from fastapi.testclient import TestClient
+from goforit.main import app
+from goforit.runners import CodeResult, CodeOutput
+from goforit.encoding import result_payload, encode_result
+
+def binary_result(size: int = 4096) -> CodeResult:
+    return CodeResult(
+        stdout="hello\n",
+        stderr="",
+        return_code=0,
+        code_outputs=[CodeOutput(data=bytes(size), language="hexdump-binary")]
+    )
+
+def test_binary_outputs_are_base64_unless_requested_raw():
+    result = binary_result(16)
+    assert result_payload(result)["code_outputs"][0]["content"] == base64.b64encode(bytes(16)).decode()
+    assert result_payload(result, binary=True)["code_outputs"][0]["data"] == bytes(16)
+
+def test_large_responses_are_gzipped_when_accepted():
+    result = binary_result()
+    plain = encode_result(result, Headers({"accept-encoding": "identity"}))
+    assert "content-encoding" not in plain.headers
+
+    compressed = encode_result(result, Headers({"accept-encoding": "gzip, br"}))
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(compressed.body)) == json.loads(plain.body)
+    assert len(compressed.body) < len(plain.body)
+
+def test_evaluate_returns_json(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = TestClient(app)
+    response = client.post('/api/evaluate', json={"language": "python", "code": "print('hi')"})
+    assert response.headers["content-type"] == "application/json"
+    assert response.json()["stdout"] == "hi\n"
+    assert response.json()["phase"] == "complete"
@@ -84,3 +84,32 @@ def test_binary_output(run_async):
     hexdump = result.code_outputs[1].content
     assert result.code_outputs[1].language == "hexdump"
     assert "|" in hexdump  # Should contain ASCII section separator
+
+def test_single_build_reports_asm_and_timings(run_async):
+    code = '''
+    package main
+
+    import "fmt"
+
+    func square(x int) int {
+        return x * x
+    }
+
+    func main() {
+        fmt.Println(square(7))
+    }
+    '''
+    first = run_async(run_go(code))
+    # A rebuild replays the compiler's assembly from the shared cache
+    second = run_async(run_go(code))
+    for result in (first, second):
+        assert result.stdout == "49\n"
+        assert result.code_outputs[0].language == "asm-go"
+        assert "main.square" in result.code_outputs[0].content
+        assert set(result.timings) == {'write', 'diagnostics', 'build', 'run', 'total'}
+
+def test_syntax_error_reported_by_parse_check(run_async):
+    result = run_async(run_go('func main() {\n    x := \n}\n'))
+    assert result.phase == "diagnostics"
+    assert "expected" in result.stderr
+    assert 'build' not in result.timings
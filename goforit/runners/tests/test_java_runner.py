@@ -1,5 +1,8 @@
+import os
+import shutil
 import pytest
 from goforit.runners.java_runner import run_java
+from goforit.runners.java_service import compile_service
 
 def test_hello_world(run_async):
     code = '''
@@ -85,4 +88,10 @@ def test_bytecode_output(run_async):
     # Check hexdump output
     hexdump = result.code_outputs[1].content
     assert "|" in hexdump  # Should contain ASCII section separator
-    assert "ca fe ba be" in hexdump  # Java class files start with CAFEBABE magic number
\ No newline at end of file
+    assert "ca fe ba be" in hexdump  # Java class files start with CAFEBABE magic number
+@pytest.mark.skipif(not shutil.which('java'), reason="java required")
+def test_compile_service_out_dir_with_spaces(run_async, tmp_path):
+    out_dir = tmp_path / "out dir" / "with  spaces"
+    ok, diagnostics, _ = run_async(compile_service.compile('Hello', 'public class Hello {}', str(out_dir)))
+    assert ok, diagnostics
+    assert os.path.exists(out_dir / 'Hello.class')
@@ -0,0 +1,69 @@
+import asyncio
+import os
+import shutil
+import sys
+import pytest
+from fastapi.testclient import TestClient
+from goforit.main import app
+from goforit.runners import CodeResult, RunOptions
+from goforit.runners.c_runner import run_c
+from goforit.runners.opt_levels import LevelBuild, compare_opt_levels
+
+def script_build(outputs: dict, running: list, peak: list):
+    """A Build writing a Python script per level that prints that level's output."""
+    async def build(level: str, outdir: str) -> LevelBuild:
+        running.append(level)
+        peak.append(len(running))
+        await asyncio.sleep(0.05)
+        running.remove(level)
+        if outputs[level] is None:
+            return LevelBuild(error=CodeResult(stderr=f"cannot build {level}", return_code=1))
+        executable = os.path.join(outdir, 'main')
+        with open(executable, 'w') as f:
+            f.write(f"#!{sys.executable}\nprint({outputs[level]!r})\n")
+        os.chmod(executable, 0o755)
+        return LevelBuild(executable=executable, asm=f"; {level}\nret\n")
+    return build
+
+def test_compares_levels_on_bounded_pool(run_async, tmp_path):
+    running, peak = [], []
+    outputs = {'O0': "1", 'O2': "1", 'O3': "2", 'Os': None}
+    result = run_async(compare_opt_levels(list(outputs), script_build(outputs, running, peak),
+                                          str(tmp_path), "asm-intel", concurrency=2))
+    assert max(peak) == 2
+    assert result.stdout == "1\n"
+
+    table, *assembly = result.code_outputs
+    assert table.language == "opt-comparison"
+    levels = {level["level"]: level for level in table.metadata["levels"]}
+    assert levels["O2"]["binary_size"] > 0 and levels["O2"]["run_time"] is not None
+    assert levels["Os"]["run_time"] is None
+    assert "output differs" in table.content and "build failed" in table.content
+
+    assert [output.metadata["opt_level"] for output in assembly] == list(outputs)
+    assert assembly[-1].content == "cannot build Os"
+
+@pytest.mark.skipif(not shutil.which('gcc'), reason="gcc required")
+def test_c_opt_levels(run_async):
+    code = '''
+    #include <stdio.h>
+    int main() {
+        int total = 0;
+        for (int i = 0; i < 100; i++) total += i;
+        printf("%d\\n", total);
+        return 0;
+    }
+    '''
+    result = run_async(run_c(code, RunOptions(opt_levels=['O0', 'O2'])))
+    assert result.stdout == "4950\n"
+    assert [output.language for output in result.code_outputs] == ["opt-comparison", "asm-intel", "asm-intel"]
+    # -O2 folds the loop away
+    assert len(result.code_outputs[2].content) < len(result.code_outputs[1].content)
+
+def test_unsupported_opt_levels_rejected(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = TestClient(app)
+    response = client.post('/api/evaluate', json={"language": "python", "code": "print(1)", "opt_levels": ["O2"]})
+    assert response.status_code == 400
+    response = client.post('/api/evaluate', json={"language": "c", "code": "int main(){}", "opt_levels": ["O9"]})
+    assert response.status_code == 400
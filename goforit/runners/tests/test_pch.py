@@ -0,0 +1,74 @@
+import os
+import asyncio
+import pytest
+from goforit.runners import pch, toolchains
+from goforit.runners.base import run_process
+from goforit.runners.pch import leading_includes, find_pch
+from goforit.runners.cpp_runner import run_cpp
+
+CODE = '''// sum
+#include <vector>
+#include <iostream>
+
+int main() {
+    std::vector<int> v{1, 2, 3};
+    std::cout << v.size() << std::endl;
+    return 0;
+}
+'''
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('GOFORIT_CACHE_DIR', str(tmp_path))
+    return tmp_path
+
+def test_leading_includes():
+    assert leading_includes(CODE) == ['<vector>', '<iostream>']
+    assert leading_includes('#include "local.h"\n#include <vector>\n') == []
+    assert leading_includes('int x;\n#include <vector>\n') == []
+
+def test_pch_built_once_and_reused(run_async, cache):
+    async def scenario():
+        # First compile schedules the PCH build in the background
+        first = await run_cpp(CODE)
+        await asyncio.gather(*pch._builds.values())
+        header = await find_pch('g++', [], ['<vector>', '<iostream>'])
+        second = await run_cpp(CODE)
+        return first, header, second
+
+    first, header, second = run_async(scenario())
+    assert first.stdout == "3\n"
+    assert header is not None and os.path.exists(header + '.gch')
+    assert second.stdout == "3\n"
+    assert second.return_code == 0
+
+def test_pch_used_with_and_without_debug_info(run_async, cache, tmp_path):
+    source = tmp_path / 'main.cpp'
+    source.write_text(CODE)
+
+    async def compile_with_pch():
+        await find_pch('g++', [], ['<vector>', '<iostream>'])
+        await asyncio.gather(*pch._builds.values())
+        header = await find_pch('g++', [], ['<vector>', '<iostream>'])
+        # The runner's -S and executable compiles; gcc rejects a mismatched PCH with -Winvalid-pch
+        return header, await asyncio.gather(*(
+            run_process(['g++', '-include', header, '-Winvalid-pch', '-Werror', *flags,
+                         '-o', str(tmp_path / output), str(source)])
+            for flags, output in ((['-S'], 'main.s'), (['-g'], 'main'))))
+
+    header, results = run_async(compile_with_pch())
+    assert header is not None
+    assert [result.return_code for result in results] == [0, 0], [result.stderr for result in results]
+
+def test_stale_compiler_version_pruned(run_async, cache, monkeypatch):
+    async def build(version):
+        monkeypatch.setitem(toolchains._toolchains, 'g++', toolchains.Toolchain('g++', 'g++', version))
+        await find_pch('g++', [], ['<vector>'])
+        await asyncio.gather(*pch._builds.values())
+
+    run_async(build('g++ 1.0'))
+    assert len(os.listdir(cache / 'pch')) == 1
+    run_async(build('g++ 2.0'))
+    entries = os.listdir(cache / 'pch')
+    assert len(entries) == 1
+    assert (cache / 'pch' / entries[0] / 'version').read_text() == 'g++ 2.0'
@@ -0,0 +1,82 @@
+import shutil
+import pytest
+from fastapi.testclient import TestClient
+from goforit.main import app
+from goforit.runners import RunOptions
+from goforit.runners.profiling import fold_cpuprofile, format_folded
+from goforit.runners.python_runner import run_python
+from goforit.runners.javascript_runner import run_javascript
+from goforit.runners.ruby_runner import run_ruby
+
+SLOW_PYTHON = '''
+def fib(n):
+    return n if n < 2 else fib(n - 1) + fib(n - 2)
+print(fib(27))
+'''
+
+def frame(name, url=""):
+    return {"functionName": name, "url": url, "lineNumber": 0}
+
+def test_fold_cpuprofile_starts_at_user_code():
+    profile = {
+        "nodes": [
+            {"id": 1, "callFrame": frame("(root)"), "children": [2, 5]},
+            {"id": 2, "callFrame": frame("runInContext"), "children": [3]},
+            {"id": 3, "callFrame": frame("", "[eval]"), "children": [4]},
+            {"id": 4, "callFrame": frame("work", "[eval]"), "children": [6]},
+            {"id": 5, "callFrame": frame("(garbage collector)")},
+            {"id": 6, "callFrame": frame("readFileSync", "node:fs")},
+        ],
+        "samples": [4, 6, 5, 4],
+        "timeDeltas": [100, 50, 20, 30],
+    }
+    assert format_folded(fold_cpuprofile(profile, user_url="[eval]")).splitlines() == [
+        "(anonymous) ([eval]:1);work ([eval]:1) 180",
+        "(garbage collector) 20",
+    ]
+
+def test_python_profile(run_async):
+    result = run_async(run_python(SLOW_PYTHON, RunOptions(profile=True)))
+    assert result.stdout == "196418\n"
+    flamegraph = result.code_outputs[-1]
+    assert flamegraph.language == "flamegraph"
+    assert flamegraph.metadata["total"] > 0
+    # Stacks start at the user's module, without the profiler's own frames
+    assert all(line.startswith("<module> (main:1)") for line in flamegraph.content.splitlines())
+    assert "fib (main:2)" in flamegraph.content
+
+def test_python_profile_keeps_traceback(run_async):
+    result = run_async(run_python("1 / 0", RunOptions(profile=True)))
+    assert result.return_code == 1
+    assert result.stderr.splitlines()[1] == '  File "<string>", line 1, in <module>'
+
+@pytest.mark.skipif(not shutil.which('node'), reason="node required")
+def test_javascript_profile(run_async):
+    code = "function fib(n) { return n < 2 ? n : fib(n - 1) + fib(n - 2); }\nconsole.log(fib(27));"
+    result = run_async(run_javascript(code, RunOptions(profile=True)))
+    assert result.stdout == "196418\n"
+    flamegraph = result.code_outputs[-1]
+    assert flamegraph.metadata["unit"] == "us"
+    assert "fib ([eval]:1)" in flamegraph.content
+
+@pytest.mark.skipif(not shutil.which('ruby'), reason="ruby required")
+def test_ruby_profile(run_async):
+    code = "def fib(n) = n < 2 ? n : fib(n - 1) + fib(n - 2)\nputs fib(27)\n"
+    result = run_async(run_ruby(code, RunOptions(profile=True)))
+    assert result.stdout == "196418\n"
+    assert result.stderr == ""
+    assert "<main> (main.rb);fib (main.rb)" in result.code_outputs[-1].content
+
+def test_profile_rejected_for_compiled_languages(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = TestClient(app)
+    response = client.post('/api/evaluate', json={"language": "c", "code": "int main(){}", "profile": True})
+    assert response.status_code == 400
+
+def test_profile_rejected_with_benchmark(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = TestClient(app)
+    response = client.post('/api/evaluate', json={"language": "python", "code": "print(1)", "profile": True,
+                                                  "benchmark": {"runs": 3}})
+    assert response.status_code == 400
+    assert "can't be combined" in response.json()["detail"]
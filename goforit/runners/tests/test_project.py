@@ -0,0 +1,100 @@
+import os
+import shutil
+import pytest
+from fastapi.testclient import TestClient
+from goforit.main import app
+from goforit.runners import RunOptions, opt_levels
+from goforit.runners.c_runner import run_c
+from goforit.runners.cpp_runner import run_cpp
+from goforit.runners.project import C_PROJECT, build_project, check_project_files, parse_depfile, write_sources
+from goforit.runners.workspace import workspaces
+
+MAIN = '#include <stdio.h>\n#include "lib/util.h"\nint main() { printf("%d\\n", twice(21)); return 0; }\n'
+FILES = {
+    "lib/util.h": "int twice(int x);\n",
+    "lib/util.c": '#include "util.h"\n#include "factor.h"\nint twice(int x) { return x * FACTOR; }\n',
+    "lib/factor.h": "#define FACTOR 2\n",
+}
+
+def test_parse_depfile():
+    text = "/w/obj/main.c.o: main.c lib/util.h \\\n lib/my\\ header.h\n"
+    assert parse_depfile(text) == ["main.c", "lib/util.h", "lib/my header.h"]
+
+def test_project_file_names():
+    assert check_project_files({"util.h": "", "lib/a.c": ""}) is None
+    for bad in ("/etc/passwd", "../up.h", "lib/../../up.h", "./a.h", ""):
+        assert check_project_files({bad: ""}), bad
+    assert check_project_files({"lib": "", "lib/a/b.c": ""})
+    assert check_project_files({"lib/a": "", "lib/a/b.c": ""})
+    assert check_project_files({"lib/a.h": "", "lib/a/b.c": ""}) is None
+
+def test_write_sources_removes_dropped_files(tmp_path):
+    write_sources(str(tmp_path), {"a.c": "1", "lib/b.h": "2"})
+    write_sources(str(tmp_path), {"a.c": "1"})
+    assert os.listdir(tmp_path) == ["a.c"]
+    # The last evaluation's file becomes a directory
+    assert write_sources(str(tmp_path), {"a.c/b.c": "2"}) is None
+    assert write_sources(str(tmp_path), {"x": "", "x/y.c": ""}).return_code == 1
+
+@pytest.mark.skipif(not shutil.which('gcc'), reason="gcc required")
+def test_only_changed_units_recompile(run_async, tmp_path):
+    src_dir, out_dir = str(tmp_path / "src"), str(tmp_path / "out")
+    files = {**FILES, "main.c": MAIN, "other.c": "int unused(void) { return 0; }\n"}
+    write_sources(src_dir, files)
+    first = run_async(build_project(C_PROJECT, src_dir, out_dir))
+    assert first.error is None and first.reused == 0
+    assert [phase.name for phase in first.phases][-1] == "link"
+
+    # Nothing changed: no compiles and no link
+    again = run_async(build_project(C_PROJECT, src_dir, out_dir))
+    assert (again.reused, again.phases) == (3, [])
+
+    # A header only util.c includes
+    write_sources(src_dir, {**files, "lib/factor.h": "#define FACTOR 3\n"})
+    edited = run_async(build_project(C_PROJECT, src_dir, out_dir))
+    assert [phase.name for phase in edited.phases] == ["compile lib/util.c", "link"]
+
+@pytest.mark.skipif(not shutil.which('gcc'), reason="gcc required")
+def test_c_project_with_session(run_async, tmp_path, monkeypatch):
+    monkeypatch.setattr(workspaces, "_root", str(tmp_path))
+    options = RunOptions(session="project", files=FILES, compile_profile=True)
+    result = run_async(run_c(MAIN, options))
+    assert result.stdout == "42\n"
+    disassembly = result.code_outputs[1]
+    assert {"main", "twice"} <= {symbol["name"] for symbol in disassembly.metadata["symbols"] if symbol["user"]}
+
+    result = run_async(run_c(MAIN.replace("21", "5"), options))
+    assert result.stdout == "10\n"
+    profile = next(output for output in result.code_outputs if output.language == "compile-profile")
+    assert sorted(row["phase"] for row in profile.metadata["phases"]) == ["compile main.c", "link"]
+    assert profile.metadata["note"] == "up to date: 1 of 2 units"
+
+@pytest.mark.skipif(not shutil.which('gcc'), reason="gcc required")
+def test_opt_level_programs_run_outside_the_workspace(run_async, tmp_path, monkeypatch):
+    monkeypatch.setattr(workspaces, "_root", str(tmp_path))
+    held = []
+    async def run_program(command, options=None):
+        held.append(workspaces.get("levels", "c").lock.locked())
+        return await original(command, options)
+    original = opt_levels.run_program
+    monkeypatch.setattr(opt_levels, "run_program", run_program)
+    result = run_async(run_c(MAIN, RunOptions(session="levels", files=FILES, opt_levels=['O0', 'O2'])))
+    assert result.stdout == "42\n"
+    assert held == [False, False]
+
+@pytest.mark.skipif(not shutil.which('g++'), reason="g++ required")
+def test_cpp_project_errors_come_back_as_diagnostics(run_async):
+    files = {"shape.hpp": "struct Shape { virtual int sides() const = 0; };\n",
+             "square.cpp": '#include "shape.hpp"\nstruct Square : Shape { int sides() const { return "4"; } };\n'}
+    result = run_async(run_cpp('#include "shape.hpp"\nint main() {}\n', RunOptions(files=files)))
+    assert result.phase == "diagnostics"
+    assert "square.cpp" in result.stderr
+
+def test_projects_rejected_for_single_file_languages(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = TestClient(app)
+    response = client.post('/api/evaluate', json={"language": "python", "code": "", "files": {"a.py": ""}})
+    assert response.status_code == 400
+    for files in ({"../a.h": ""}, {"a": "", "a/b.c": ""}):
+        response = client.post('/api/evaluate', json={"language": "c", "code": "", "files": files})
+        assert response.status_code == 400
@@ -0,0 +1,56 @@
+import pytest
+import shutil
+from goforit.runners.prolog_runner import run_prolog
+from goforit.runners.prolog_pool import prolog_atom, parse_reply, status_return_code
+
+requires_swipl = pytest.mark.skipif(shutil.which('swipl') is None, reason="swipl is not installed")
+
+def test_prolog_atom_quoting():
+    assert prolog_atom("/tmp/main.pl") == "'/tmp/main.pl'"
+    assert prolog_atom("it's") == "'it\\'s'"
+    assert prolog_atom("a\\b") == "'a\\\\b'"
+
+def test_parse_reply():
+    assert parse_reply("done(r1, true, clean).\n", "r1") == ("true", False)
+    assert parse_reply("done(r1, halt(3), dirty).\n", "r1") == ("halt(3)", True)
+    assert parse_reply("", "r1") is None
+    # Output that isn't this request's reply, even a well-formed one
+    assert parse_reply("hello\n", "r1") is None
+    assert parse_reply("done(r2, true, clean).\n", "r1") is None
+
+def test_status_return_code():
+    assert status_return_code("true") == 0
+    assert status_return_code("error") == 1
+    assert status_return_code("halt(3)") == 3
+    assert status_return_code("time_limit") == 124
+
+@requires_swipl
+def test_hello_world(run_async):
+    result = run_async(run_prolog(":- initialization((write('Hello, World!'), nl)).\n"))
+    assert result.stdout == "Hello, World!\n"
+    assert result.return_code == 0
+
+@requires_swipl
+def test_programs_are_isolated(run_async):
+    first = run_async(run_prolog("fact(1).\n:- initialization((fact(X), write(X), nl)).\n"))
+    second = run_async(run_prolog(":- initialization((catch(fact(X), _, X = none), write(X), nl)).\n"))
+    assert first.stdout == "1\n"
+    assert second.stdout == "none\n"
+
+@requires_swipl
+def test_halt_does_not_kill_engine(run_async):
+    result = run_async(run_prolog(":- write(done), nl.\n:- halt.\n"))
+    assert result.stdout == "done\n"
+    assert result.return_code == 0
+
+@requires_swipl
+def test_changes_to_user_do_not_reach_the_next_program(run_async):
+    run_async(run_prolog(":- assertz(user:leaked(1)).\n"))
+    second = run_async(run_prolog(":- initialization((catch(user:leaked(X), _, X = none), write(X), nl)).\n"))
+    assert second.stdout == "none\n"
+
+@requires_swipl
+def test_writing_to_the_engine_pipe_does_not_hang(run_async):
+    code = ":- stream_property(S, file_no(1)), format(S, 'done(true).~n', []), flush_output(S).\n"
+    run_async(run_prolog(code))
+    assert run_async(run_prolog(":- write(ok), nl.\n")).stdout == "ok\n"
@@ -0,0 +1,46 @@
+import pytest
+from importlib.metadata import EntryPoint
+from goforit.runners import registry
+from goforit.runners.registry import RunnerRegistry, RunnerSpec, BUILTIN_RUNNERS, ENTRY_POINT_GROUP
+from goforit.runners.brainfuck_runner import run_brainfuck
+
+# Module-level so the entry point tests can point at it
+PLUGIN_SPEC = RunnerSpec('bf', 'goforit.runners.brainfuck_runner:run_brainfuck', artifacts=('brainfuck-debug',))
+
+@pytest.fixture
+def plugins(monkeypatch):
+    found = []
+    monkeypatch.setattr(registry, 'entry_points', lambda group: [ep for ep in found if ep.group == group])
+    return found
+
+def test_lookup_loads_runner(plugins):
+    runners = RunnerRegistry(BUILTIN_RUNNERS)
+    assert 'brainfuck' in runners
+    assert 'cobol' not in runners
+    assert runners['brainfuck'] is run_brainfuck
+    assert len(runners) == len(BUILTIN_RUNNERS)
+
+def test_membership_does_not_import(plugins):
+    runners = RunnerRegistry([RunnerSpec('missing', 'goforit.runners.no_such_runner:run')])
+    assert 'missing' in runners
+    with pytest.raises(ImportError):
+        runners['missing']
+
+def test_entry_point_plugins(plugins):
+    plugins.append(EntryPoint('bf', f'{__name__}:PLUGIN_SPEC', ENTRY_POINT_GROUP))
+    plugins.append(EntryPoint('brainfuck2', 'goforit.runners.brainfuck_runner:run_brainfuck', ENTRY_POINT_GROUP))
+    # A plugin can't replace a built-in language
+    plugins.append(EntryPoint('python', 'goforit.runners.brainfuck_runner:run_brainfuck', ENTRY_POINT_GROUP))
+
+    runners = RunnerRegistry(BUILTIN_RUNNERS)
+    assert runners.specs['bf'] is PLUGIN_SPEC
+    assert runners['brainfuck2'] is run_brainfuck
+    assert runners.specs['python'].target == 'goforit.runners.python_runner:run_python'
+
+def test_runners_build_within_their_spec_timeouts():
+    from goforit.runners import go_runner, haskell_runner, java_service, rust_runner
+    specs = registry.BUILTIN_SPECS
+    assert rust_runner.COMPILE_TIMEOUT == specs['rust'].compile_timeout
+    assert haskell_runner.COMPILE_TIMEOUT == specs['haskell'].compile_timeout
+    assert go_runner.BUILD_TIMEOUT == specs['go'].compile_timeout
+    assert java_service.COMPILE_TIMEOUT == specs['java'].compile_timeout
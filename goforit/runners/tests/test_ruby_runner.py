@@ -0,0 +1,47 @@
+import pytest
+import shutil
+from goforit.runners.ruby_runner import run_ruby
+
+pytestmark = pytest.mark.skipif(shutil.which('ruby') is None, reason="ruby is not installed")
+
+def test_hello_world(run_async):
+    result = run_async(run_ruby('puts "Hello, World!"'))
+    assert result.stdout == "Hello, World!\n"
+    assert result.stderr == ""
+    assert result.return_code == 0
+    assert result.code_outputs == []
+
+def test_syntax_error(run_async):
+    result = run_async(run_ruby('puts('))
+    assert "syntax error" in result.stderr
+    assert result.return_code != 0
+
+def test_runtime_error_debug_output(run_async):
+    code = '''
+    def divide(a, b)
+      a / b
+    end
+    begin
+      Integer("x")
+    rescue ArgumentError
+    end
+    divide(1, 0)
+    '''
+    result = run_async(run_ruby(code))
+    assert "ZeroDivisionError" in result.stderr
+    assert result.return_code != 0
+    assert result.code_outputs[0].language == "ruby-debug"
+    debug = result.code_outputs[0].content
+    # Rescued exceptions are listed like `ruby -d` would, along with the fatal backtrace
+    assert "Exception `ArgumentError'" in debug
+    assert "in `divide'" in debug
+
+def test_program_runs_once(run_async, tmp_path):
+    counter = tmp_path / 'runs'
+    code = f'''
+    File.open("{counter}", "a") {{ |f| f.puts "run" }}
+    raise "boom"
+    '''
+    result = run_async(run_ruby(code))
+    assert result.return_code != 0
+    assert counter.read_text() == "run\n"
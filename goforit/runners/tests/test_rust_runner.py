@@ -0,0 +1,56 @@
+import pytest
+import shutil
+from goforit.runners.rust_runner import run_rust, parse_build_flags
+
+pytestmark = pytest.mark.skipif(shutil.which('rustc') is None, reason="rustc is not installed")
+
+def test_hello_world(run_async):
+    code = '''
+    fn main() {
+        println!("Hello, World!");
+    }
+    '''
+    result = run_async(run_rust(code))
+    assert result.stdout == "Hello, World!\n"
+    assert result.return_code == 0
+    assert [output.language for output in result.code_outputs] == ["asm-rust", "llvm-ir", "rust-mir", "rust-stats"]
+    assert "main" in result.code_outputs[0].content
+    assert "define" in result.code_outputs[1].content
+    assert "fn main()" in result.code_outputs[2].content
+
+def test_parse_build_flags():
+    assert parse_build_flags('fn main() {}') == ['-C', 'opt-level=3']
+    assert parse_build_flags('// flags: -C target-cpu=native\nfn main() {}') == [
+        '-C', 'opt-level=3', '-C', 'target-cpu=native'
+    ]
+    assert parse_build_flags('// flags: debug\nfn main() {}') == ['-C', 'opt-level=0', '-C', 'debuginfo=2']
+
+def test_optimization_flags(run_async):
+    code = '''// flags: -C opt-level=1
+    #[inline(never)]
+    fn add(a: i32, b: i32) -> i32 { a + b }
+    fn main() {
+        println!("{}", add(2, 3));
+    }
+    '''
+    result = run_async(run_rust(code))
+    assert result.stdout == "5\n"
+    stats = result.code_outputs[3].content
+    # Flags after the default profile override it
+    assert stats.split('\n')[0].endswith("-C opt-level=3 -C opt-level=1")
+    assert "compile time:" in stats
+
+def test_compilation_error(run_async):
+    code = '''
+    fn main() {
+        let x: i32 = "string";
+    }
+    '''
+    result = run_async(run_rust(code))
+    assert "mismatched types" in result.stderr
+    assert result.return_code != 0
+
+def test_type_error_reported_by_check(run_async):
+    result = run_async(run_rust('fn main() { let x: i32 = "a"; }\n'))
+    assert result.phase == "diagnostics"
+    assert "mismatched types" in result.stderr
@@ -0,0 +1,58 @@
+import pytest
+from fastapi.testclient import TestClient
+from goforit.main import app
+from goforit.sessions import Patch, Session, SessionStore, VersionConflict, apply_patches
+
+def test_apply_patches():
+    assert apply_patches("hello world", [Patch(6, 11, "there"), Patch(0, 0, "> ")]) == "> hello there"
+    assert apply_patches("a😀b", [Patch(1, 2, "😁")]) == "a😁b"
+    with pytest.raises(VersionConflict):
+        apply_patches("abc", [Patch(2, 5, "")])
+
+def test_patches_against_stale_version_conflict():
+    session = Session(id="s")
+    session.reset("print(1)")
+    session.apply(1, [Patch(6, 7, "2")])
+    assert (session.document, session.version) == ("print(2)", 2)
+    with pytest.raises(VersionConflict):
+        session.apply(1, [Patch(6, 7, "3")])
+    # Re-running unchanged code doesn't need the version to match
+    session.apply(None, [])
+
+def test_store_evicts_oldest():
+    store = SessionStore(max_sessions=2)
+    first = store.get(None)
+    store.get(None)
+    store.get(None)
+    assert len(store) == 2
+    assert store.get(first.id).id != first.id
+
+def test_delta_endpoint_sends_only_changed_outputs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = TestClient(app)
+    first = client.post('/api/evaluate/delta', json={
+        "language": "python", "code": "print('same')\nimport sys; print(1, file=sys.stderr)"
+    }).json()
+    assert first['stdout'] == "same\n"
+    assert first['stderr'] == "1\n"
+
+    # Change only what goes to stderr
+    second = client.post('/api/evaluate/delta', json={
+        "language": "python",
+        "session_id": first['session_id'],
+        "base_version": first['version'],
+        "patches": [{"start": 32, "end": 33, "text": "2"}],
+        "ack": first['response_id'],
+    }).json()
+    assert second['version'] == first['version'] + 1
+    assert second['stdout'] is None
+    assert second['stdout_hash'] == first['stdout_hash']
+    assert second['stderr'] == "2\n"
+
+    stale = client.post('/api/evaluate/delta', json={
+        "language": "python",
+        "session_id": first['session_id'],
+        "base_version": first['version'],
+        "patches": [{"start": 0, "end": 0, "text": "#"}],
+    })
+    assert stale.status_code == 409
@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from goforit.singleflight import SingleFlight
+
+def test_concurrent_identical_calls_share_one_run(run_async):
+    flight = SingleFlight()
+    calls = []
+
+    async def evaluate():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def scenario():
+        return await asyncio.gather(*(flight.run('key', evaluate) for _ in range(5)))
+
+    assert run_async(scenario()) == ["result"] * 5
+    assert len(calls) == 1
+    assert len(flight) == 0
+
+def test_finished_results_are_not_reused(run_async):
+    flight = SingleFlight()
+    calls = []
+
+    async def evaluate():
+        calls.append(1)
+        return len(calls)
+
+    assert run_async(flight.run('key', evaluate)) == 1
+    assert run_async(flight.run('key', evaluate)) == 2
+
+def test_cancelled_only_when_every_caller_leaves(run_async):
+    flight = SingleFlight()
+    finished = []
+
+    async def evaluate():
+        await asyncio.sleep(0.1)
+        finished.append(1)
+        return "done"
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.run('key', evaluate))
+        second = asyncio.ensure_future(flight.run('key', evaluate))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        # The remaining caller still gets the shared result
+        result = await second
+
+        third = asyncio.ensure_future(flight.run('other', evaluate))
+        await asyncio.sleep(0.01)
+        third.cancel()
+        await asyncio.sleep(0.2)
+        return result, len(flight)
+
+    assert run_async(scenario()) == ("done", 0)
+    # The abandoned evaluation was cancelled rather than run to completion
+    assert len(finished) == 1
@@ -0,0 +1,66 @@
+import gzip
+import os
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from goforit.static_assets import build_assets, accepted_encodings, PrecompressedStaticFiles, IMMUTABLE, REVALIDATE
+
+SCRIPT = 'console.log("hello");\n' * 200
+
+@pytest.fixture
+def static_dir(tmp_path):
+    (tmp_path / 'js').mkdir()
+    (tmp_path / 'js' / 'app.js').write_text(SCRIPT)
+    (tmp_path / 'index.html').write_text('<script src="/static/js/app.js"></script>')
+    return tmp_path
+
+def client_for(static_dir) -> tuple[TestClient, PrecompressedStaticFiles]:
+    app = FastAPI()
+    static_files = PrecompressedStaticFiles(directory=str(static_dir))
+    app.mount('/static', static_files)
+    return TestClient(app), static_files
+
+def test_accepted_encodings():
+    assert accepted_encodings('gzip, deflate, br') == {'gzip', 'deflate', 'br'}
+    assert accepted_encodings('br;q=0, gzip;q=0.5') == {'gzip'}
+    assert accepted_encodings('') == set()
+
+def test_build_writes_variants_and_manifest(static_dir):
+    manifest = build_assets(str(static_dir))
+    assert 'gzip' in manifest['files']['js/app.js']['encodings']
+    assert gzip.decompress((static_dir / 'js' / 'app.js.gz').read_bytes()).decode() == SCRIPT
+    # Too small to bother compressing
+    assert manifest['files']['index.html']['encodings'] == []
+    assert build_assets(str(static_dir))['version'] == manifest['version']
+
+def test_serves_precompressed_with_etag(static_dir):
+    build_assets(str(static_dir))
+    client, static_files = client_for(static_dir)
+
+    response = client.get(f'/static/v/{static_files.version}/js/app.js', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.headers['cache-control'] == IMMUTABLE
+    assert response.text == SCRIPT
+
+    etag = response.headers['etag']
+    cached = client.get('/static/js/app.js', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.headers['cache-control'] == REVALIDATE
+
+    plain = client.get('/static/js/app.js', headers={'Accept-Encoding': 'identity'})
+    assert 'content-encoding' not in plain.headers
+    assert plain.text == SCRIPT
+
+def test_edited_file_is_not_served_stale(static_dir):
+    build_assets(str(static_dir))
+    (static_dir / 'js' / 'app.js').write_text('edited')
+    client, static_files = client_for(static_dir)
+    response = client.get(f'/static/v/{static_files.version}/js/app.js', headers={'Accept-Encoding': 'gzip'})
+    assert response.text == 'edited'
+    assert response.headers['cache-control'] == REVALIDATE
+
+def test_index_points_at_versioned_prefix(static_dir):
+    build_assets(str(static_dir))
+    _, static_files = client_for(static_dir)
+    assert f'/static/v/{static_files.version}/js/app.js' in static_files.index_response().body.decode()
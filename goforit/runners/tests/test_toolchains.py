@@ -0,0 +1,26 @@
+import pytest
+from fastapi.testclient import TestClient
+from goforit.main import app
+from goforit.runners import toolchains
+from goforit.runners.toolchains import probe, language_available
+
+def test_probe_finds_python(run_async):
+    python = run_async(probe('python'))
+    assert python.available
+    assert python.version.startswith('Python')
+
+def test_missing_toolchain_makes_language_unavailable(run_async, monkeypatch):
+    monkeypatch.setitem(toolchains._toolchains, 'lua', toolchains.Toolchain('lua'))
+    assert not run_async(language_available('lua'))
+    # Brainfuck is interpreted in-process and needs nothing installed
+    assert run_async(language_available('brainfuck'))
+
+def test_health_and_languages_endpoints():
+    client = TestClient(app)
+    assert client.get('/api/health').json() == {"status": "ok"}
+    # Without the lifespan running, startup probes and warmups never finish
+    assert client.get('/api/ready').status_code == 503
+
+    languages = {entry['language']: entry for entry in client.get('/api/languages').json()}
+    assert languages['python']['available']
+    assert languages['python']['toolchains']['python'].startswith('Python')
@@ -1,5 +1,6 @@
 import base64
-from goforit.runners.utils import format_binary_for_hexdump, detect_system_arch
+import os
+from goforit.runners.utils import format_binary_for_hexdump, detect_system_arch, trim_cache_dir
 
 def test_format_binary_for_hexdump():
     # Test basic binary data
@@ -20,4 +21,16 @@ def test_format_binary_for_hexdump():
     # Test large binary data
     data = b'x' * 1024
     base64_data = format_binary_for_hexdump(data)
-    assert base64_data == base64.b64encode(data).decode('utf-8')
\ No newline at end of file
+    assert base64_data == base64.b64encode(data).decode('utf-8')
+
+def test_trim_cache_dir_removes_oldest(tmp_path):
+    for i in range(5):
+        path = tmp_path / f'entry{i}'
+        path.write_bytes(b'x' * 100)
+        os.utime(path, (1000 + i, 1000 + i))
+
+    trim_cache_dir(str(tmp_path), 500)
+    assert len(os.listdir(tmp_path)) == 5
+
+    trim_cache_dir(str(tmp_path), 300)
+    assert sorted(os.listdir(tmp_path)) == ['entry3', 'entry4']
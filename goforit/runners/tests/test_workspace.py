@@ -0,0 +1,92 @@
+import os
+import shutil
+import pytest
+from goforit.dispatch import Agent, AgentPool
+from goforit.runners import RunOptions, opt_levels
+from goforit.runners.rust_runner import run_rust
+from goforit.runners.workspace import WorkspaceStore, build_workspace, workspaces
+
+def test_workspace_per_session_and_language(tmp_path):
+    store = WorkspaceStore(root=str(tmp_path))
+    first = store.get("a", "rust")
+    assert store.get("a", "rust") is first
+    assert store.get("b", "rust").path != first.path
+    assert store.get("a", "haskell").path != first.path
+    assert os.path.isdir(first.path)
+
+def test_idle_workspaces_are_removed(run_async, tmp_path):
+    store = WorkspaceStore(root=str(tmp_path), ttl=0)
+    path = store.get("a", "rust").path
+    run_async(store.maintain())
+    assert len(store) == 0
+    assert not os.path.exists(path)
+
+def test_least_recently_used_go_over_quota(run_async, tmp_path):
+    store = WorkspaceStore(root=str(tmp_path), max_bytes=1500)
+    paths = []
+    for session in "abc":
+        workspace = store.get(session, "rust")
+        with open(os.path.join(workspace.path, "build"), "wb") as f:
+            f.write(b"x" * 600)
+        paths.append(workspace.path)
+    store.get("a", "rust")
+    run_async(store.maintain())
+    # b was used least recently; dropping it brings the rest under 80% of the quota
+    assert [os.path.exists(path) for path in paths] == [True, False, True]
+
+def test_without_a_session_builds_in_a_temp_dir(run_async):
+    async def build_dir():
+        async with build_workspace('rust', RunOptions()) as path:
+            return path
+    path = run_async(build_dir())
+    assert not os.path.exists(path)
+
+def test_session_returns_to_its_agent():
+    pool = AgentPool(["unix:/a", "unix:/b"])
+    for agent in pool.agents:
+        agent.healthy, agent.languages, agent.capacity = True, frozenset({"rust"}), 2
+    home, other = pool.agents
+    pool._affinities[("s", "rust")] = home
+    home.active, home.dispatched = 1, 5
+    assert pool.pick("rust", session="s") is home
+    assert pool.pick("rust") is other
+    # Full, so the session builds from scratch elsewhere rather than wait
+    home.active = 2
+    assert pool.pick("rust", session="s") is other
+
+@pytest.mark.skipif(not shutil.which('rustc'), reason="rustc required")
+def test_rust_session_builds_incrementally(run_async, tmp_path, monkeypatch):
+    monkeypatch.setattr(workspaces, "_root", str(tmp_path))
+    options = RunOptions(session="rust-session")
+    result = run_async(run_rust('fn main() { println!("one"); }', options))
+    assert result.stdout == "one\n"
+    workspace = workspaces.get("rust-session", "rust")
+    assert os.listdir(os.path.join(workspace.path, "incremental"))
+
+    result = run_async(run_rust('fn main() { println!("two"); }', options))
+    assert result.stdout == "two\n"
+    assert workspaces.get("rust-session", "rust") is workspace
+
+def test_workspace_with_a_queued_build_is_kept(run_async, tmp_path):
+    store = WorkspaceStore(root=str(tmp_path), ttl=0, max_bytes=0)
+    workspace = store.get("a", "rust")
+    # A build that took the workspace and is waiting for its lock
+    workspace.users += 1
+    run_async(store.maintain())
+    assert os.path.isdir(workspace.path) and len(store) == 1
+    workspace.users -= 1
+    run_async(store.maintain())
+    assert not os.path.exists(workspace.path)
+
+@pytest.mark.skipif(not shutil.which('rustc'), reason="rustc required")
+def test_rust_opt_level_programs_run_outside_the_workspace(run_async, tmp_path, monkeypatch):
+    monkeypatch.setattr(workspaces, "_root", str(tmp_path))
+    held = []
+    async def run_program(command, options=None):
+        held.append(workspaces.get("levels", "rust").lock.locked())
+        return await original(command, options)
+    original = opt_levels.run_program
+    monkeypatch.setattr(opt_levels, "run_program", run_program)
+    result = run_async(run_rust('fn main() { println!("one"); }', RunOptions(session="levels", opt_levels=['O0', 'O2'])))
+    assert result.stdout == "one\n"
+    assert held == [False, False]
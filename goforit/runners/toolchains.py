@@ -0,0 +1,77 @@
+import asyncio
+import shutil
+from dataclasses import dataclass
+from typing import Optional
+from .base import run_process
+from .registry import LANGUAGE_RUNNERS
+
+# How to ask each toolchain for its version
+VERSION_COMMANDS = {
+    'gcc': ['--version'],
+    'g++': ['--version'],
+    'javac': ['-version'],
+    'java': ['-version'],
+    'go': ['version'],
+    'rustc': ['--version'],
+    'ghc': ['--version'],
+    'swipl': ['--version'],
+    'ruby': ['--version'],
+    'lua': ['-v'],
+    'node': ['--version'],
+    'tsc': ['--version'],
+    'nasm': ['-v'],
+    'as': ['--version'],
+    'ld': ['--version'],
+    'objdump': ['--version'],
+    'python': ['--version'],
+    'valgrind': ['--version'],
+}
+
+@dataclass
+class Toolchain:
+    name: str
+    path: Optional[str] = None
+    version: Optional[str] = None
+
+    @property
+    def available(self) -> bool:
+        return self.path is not None
+
+# Probe results for the life of the process; toolchains don't change under a running server
+_toolchains: dict[str, Toolchain] = {}
+
+async def probe(name: str) -> Toolchain:
+    if name in _toolchains:
+        return _toolchains[name]
+    toolchain = Toolchain(name=name, path=shutil.which(name))
+    if toolchain.available:
+        result = await run_process([toolchain.path, *VERSION_COMMANDS.get(name, ['--version'])], timeout=10)
+        if result.return_code == 0:
+            # Some tools (java, javac) report their version on stderr
+            lines = [line.strip() for line in (result.stdout + result.stderr).splitlines() if line.strip()]
+            toolchain.version = lines[0] if lines else ""
+        else:
+            # On PATH but unusable, e.g. the macOS java stub without a JDK
+            toolchain.path = None
+    _toolchains[name] = toolchain
+    return toolchain
+
+async def probe_all() -> dict[str, Toolchain]:
+    """Probe every known toolchain, and any a plugin runner declares, in parallel."""
+    names = set(VERSION_COMMANDS)
+    for spec in LANGUAGE_RUNNERS.specs.values():
+        names.update(spec.toolchains)
+    toolchains = await asyncio.gather(*(probe(name) for name in sorted(names)))
+    return {toolchain.name: toolchain for toolchain in toolchains}
+
+async def toolchain_version(name: str) -> Optional[str]:
+    """The toolchain's version line, for keying caches of its build products."""
+    return (await probe(name)).version
+
+async def language_available(language: str) -> bool:
+    toolchains = await asyncio.gather(*(probe(name) for name in LANGUAGE_RUNNERS.specs[language].toolchains))
+    return all(toolchain.available for toolchain in toolchains)
+
+async def available_languages() -> dict[str, bool]:
+    await probe_all()
+    return {language: await language_available(language) for language in LANGUAGE_RUNNERS}
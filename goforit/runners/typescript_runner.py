@@ -1,9 +1,13 @@
 import os
 import json
 import tempfile
-from .base import run_process, CodeResult, CodeOutput
+from typing import Optional
+from .base import run_process, run_program, CodeResult, CodeOutput, RunOptions
+from .registry import BUILTIN_SPECS
 
-async def run_typescript(code: str) -> CodeResult:
+COMPILE_TIMEOUT = BUILTIN_SPECS['typescript'].compile_timeout
+
+async def run_typescript(code: str, options: Optional[RunOptions] = None) -> CodeResult:
     """Run TypeScript code by compiling to JavaScript and running with Node.js."""
     with tempfile.TemporaryDirectory() as tmpdir:
         # Create tsconfig.json for module support
@@ -30,7 +34,7 @@ async def run_typescript(code: str) -> CodeResult:
         
         try:
             # Compile TypeScript to JavaScript
-            compile_result = await run_process(['tsc', '--project', tmpdir])
+            compile_result = await run_process(['tsc', '--project', tmpdir], timeout=COMPILE_TIMEOUT)
             if compile_result.return_code != 0:
                 return compile_result
             
@@ -48,10 +52,10 @@ async def run_typescript(code: str) -> CodeResult:
                 js_code = f.read()
             
             # Run the JavaScript code
-            run_result = await run_process(['node', '-e', js_code])
+            run_result = await run_program(['node', '-e', js_code], options)
             
             # Include the compiled JavaScript in the output
-            run_result.code_outputs = [CodeOutput(content=js_code, language='javascript')]
+            run_result.code_outputs += [CodeOutput(content=js_code, language='javascript')]
             return run_result
             
         except Exception as e:
@@ -1,3 +1,4 @@
+import os
 import platform
 import base64
 
@@ -15,4 +16,43 @@ def detect_system_arch():
 
 def format_binary_for_hexdump(data: bytes) -> str:
     """Convert binary data to base64 for sending to frontend."""
-    return base64.b64encode(data).decode('utf-8')
\ No newline at end of file
+    return base64.b64encode(data).decode('utf-8')
+
+def cache_dir(*parts: str) -> str:
+    """Return (creating it if needed) a directory for build caches that outlive a single evaluation."""
+    root = os.environ.get('GOFORIT_CACHE_DIR') or os.path.join(
+        os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'goforit'
+    )
+    path = os.path.join(root, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def trim_cache_dir(path: str, max_bytes: int) -> None:
+    """Delete the least recently used files under path until it fits in max_bytes.
+
+    Trims down to 80% of the limit so the next few builds don't immediately trigger
+    another walk of the whole tree.
+    """
+    entries = []
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            file_path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, file_path))
+            total += stat.st_size
+    if total <= max_bytes:
+        return
+
+    entries.sort()
+    for _, size, file_path in entries:
+        if total <= max_bytes * 0.8:
+            break
+        try:
+            os.remove(file_path)
+            total -= size
+        except OSError:
+            pass
@@ -0,0 +1,198 @@
+"""Build directories kept per (session, language) across evaluations.
+
+A throwaway temp dir throws away everything an incremental compiler saved, so
+runners that can reuse earlier build products (rustc's incremental cache,
+GHC's recompilation avoidance) build in a workspace instead. The workspace
+belongs to the client's session, so one user's edits don't invalidate
+another's. One build runs in a workspace at a time. Runners copy the binary
+out before running it, so the next build isn't held up by a slow program.
+
+Workspaces idle for WORKSPACE_TTL are deleted, and when all of them together
+pass WORKSPACE_MAX_BYTES the least recently used go first.
+"""
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterable, Optional
+from .base import RunOptions
+from .utils import cache_dir
+
+# Matches the server's session lifetime
+WORKSPACE_TTL = 30 * 60
+WORKSPACE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+# Seconds between checks for idle workspaces and the disk quota
+MAINTENANCE_INTERVAL = 60
+
+@dataclass
+class Workspace:
+    path: str
+    last_used: float = field(default_factory=time.monotonic)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # Builds holding or waiting for the lock; maintenance leaves the workspace alone while any are
+    users: int = 0
+
+    @property
+    def in_use(self) -> bool:
+        return self.users > 0 or self.lock.locked()
+
+def write_if_changed(path: str, content: str) -> None:
+    """Write content unless the file already holds it, keeping its mtime for up-to-date checks."""
+    try:
+        with open(path, 'r') as f:
+            if f.read() == content:
+                return
+    except FileNotFoundError:
+        pass
+    with open(path, 'w') as f:
+        f.write(content)
+
+def directory_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                pass
+    return total
+
+def remove_directories(paths: Iterable[str]) -> None:
+    for path in paths:
+        shutil.rmtree(path, ignore_errors=True)
+
+class WorkspaceStore:
+    def __init__(self, root: Optional[str] = None, ttl: float = WORKSPACE_TTL,
+                 max_bytes: int = WORKSPACE_MAX_BYTES):
+        self._root = root
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        # Least recently used first
+        self._workspaces: "OrderedDict[tuple, Workspace]" = OrderedDict()
+        self._last_maintenance = 0.0
+        self._maintenance: Optional[asyncio.Task] = None
+
+    @property
+    def root(self) -> str:
+        # Resolved late so GOFORIT_CACHE_DIR set after import still applies
+        return self._root or cache_dir('workspaces')
+
+    def __len__(self) -> int:
+        return len(self._workspaces)
+
+    def get(self, session: Optional[str], language: str) -> Workspace:
+        """The session's workspace for language, created empty the first time."""
+        key = (session, language)
+        workspace = self._workspaces.get(key)
+        if workspace is None or not os.path.isdir(workspace.path):
+            # A fresh name each time, so a new workspace never lands in one that's being deleted
+            name = hashlib.blake2b(str(session).encode(), digest_size=8).hexdigest() + '-' + uuid.uuid4().hex[:8]
+            path = os.path.join(self.root, language, name)
+            os.makedirs(path)
+            workspace = Workspace(path)
+            self._workspaces[key] = workspace
+        self._workspaces.move_to_end(key)
+        workspace.last_used = time.monotonic()
+        return workspace
+
+    def _evict(self, key: tuple) -> str:
+        return self._workspaces.pop(key).path
+
+    async def maintain(self) -> None:
+        """Delete idle workspaces, then the least recently used ones until the rest fit the quota."""
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        idle = [key for key, workspace in self._workspaces.items()
+                if now - workspace.last_used > self.ttl and not workspace.in_use]
+        doomed = [self._evict(key) for key in idle]
+
+        # Left behind by an earlier server process
+        live = {workspace.path for workspace in self._workspaces.values()}
+        doomed += await loop.run_in_executor(None, self._orphans, live)
+
+        sizes = await loop.run_in_executor(None, lambda: {key: directory_size(workspace.path)
+                                                          for key, workspace in list(self._workspaces.items())})
+        total = sum(sizes.values())
+        if total > self.max_bytes:
+            # Down to 80% so the next few builds don't go straight back over
+            for key in list(self._workspaces):
+                if total <= self.max_bytes * 0.8:
+                    break
+                if key in sizes and not self._workspaces[key].in_use:
+                    total -= sizes[key]
+                    doomed.append(self._evict(key))
+        await loop.run_in_executor(None, remove_directories, doomed)
+
+    def _orphans(self, live: set) -> list[str]:
+        orphans = []
+        cutoff = time.time() - self.ttl
+        try:
+            languages = os.listdir(self.root)
+        except OSError:
+            return orphans
+        for language in languages:
+            language_dir = os.path.join(self.root, language)
+            try:
+                names = os.listdir(language_dir)
+            except OSError:
+                continue
+            for name in names:
+                path = os.path.join(language_dir, name)
+                try:
+                    if path not in live and os.stat(path).st_mtime < cutoff:
+                        orphans.append(path)
+                except OSError:
+                    pass
+        return orphans
+
+    def schedule_maintenance(self) -> None:
+        now = time.monotonic()
+        if now - self._last_maintenance < MAINTENANCE_INTERVAL:
+            return
+        if self._maintenance is not None and not self._maintenance.done():
+            return
+        self._last_maintenance = now
+        # Kept so the task isn't collected mid-run and its failure gets reported
+        self._maintenance = asyncio.ensure_future(self.maintain())
+        self._maintenance.add_done_callback(self._maintenance_done)
+
+    @staticmethod
+    def _maintenance_done(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Workspace maintenance failed: {task.exception()!r}")
+
+workspaces = WorkspaceStore()
+
+@asynccontextmanager
+async def build_workspace(language: str, options: Optional[RunOptions] = None,
+                          shared: bool = False) -> AsyncIterator[str]:
+    """A directory to build in, held for the duration of the block.
+
+    Evaluations with a session get that session's workspace. Without one they
+    get a temp dir, or with shared, a workspace common to all of them.
+    """
+    session = options.session if options else None
+    if session is None and not shared:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield tmpdir
+        return
+
+    workspace = workspaces.get(session, language)
+    # Counted before waiting, so maintenance can't delete it from under a queued build
+    workspace.users += 1
+    try:
+        async with workspace.lock:
+            yield workspace.path
+            workspace.last_used = time.monotonic()
+            # Other processes sharing the cache dir go by its mtime
+            os.utime(workspace.path)
+    finally:
+        workspace.users -= 1
+    workspaces.schedule_maintenance()
@@ -0,0 +1,96 @@
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional, Set
+
+# Idle sessions are dropped after this many seconds, oldest first past MAX_SESSIONS
+SESSION_TTL = 30 * 60
+MAX_SESSIONS = 1000
+
+# Output hashes remembered per session for responses the client may still acknowledge
+RESPONSE_HISTORY = 8
+
+class VersionConflict(Exception):
+    """The client's patches were made against a document version the server no longer has."""
+
+@dataclass
+class Patch:
+    """Replace document[start:end] (in code points) with text."""
+    start: int
+    end: int
+    text: str
+
+@dataclass
+class Session:
+    id: str
+    document: str = ""
+    version: int = 0
+    # Response id -> hashes of the outputs it carried
+    responses: "OrderedDict[int, Set[str]]" = field(default_factory=OrderedDict)
+    next_response: int = 1
+    last_used: float = field(default_factory=time.monotonic)
+
+    def apply(self, base_version: Optional[int], patches: List[Patch]) -> None:
+        if not patches:
+            return
+        if base_version != self.version:
+            raise VersionConflict(f"patches are against version {base_version}, document is at {self.version}")
+        self.document = apply_patches(self.document, patches)
+        self.version += 1
+
+    def reset(self, document: str) -> None:
+        self.document = document
+        self.version += 1
+
+    def acknowledged_hashes(self, ack: Optional[int]) -> Set[str]:
+        """Hashes of the outputs the client already holds, from the response it acknowledged."""
+        return self.responses.get(ack, set()) if ack is not None else set()
+
+    def record_response(self, hashes: Set[str]) -> int:
+        response_id = self.next_response
+        self.next_response += 1
+        self.responses[response_id] = hashes
+        while len(self.responses) > RESPONSE_HISTORY:
+            self.responses.popitem(last=False)
+        return response_id
+
+def apply_patches(document: str, patches: List[Patch]) -> str:
+    """Apply patches in order, each against the result of the previous one."""
+    for patch in patches:
+        if not 0 <= patch.start <= patch.end <= len(document):
+            raise VersionConflict(f"patch {patch.start}:{patch.end} is outside a document of length {len(document)}")
+        document = document[:patch.start] + patch.text + document[patch.end:]
+    return document
+
+def content_hash(content: str) -> str:
+    return hashlib.blake2b(content.encode(), digest_size=8).hexdigest()
+
+class SessionStore:
+    def __init__(self, ttl: float = SESSION_TTL, max_sessions: int = MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: Optional[str]) -> Session:
+        """The session with this id, or a new one when it's unknown or expired."""
+        self._evict()
+        session = self._sessions.get(session_id) if session_id else None
+        if session is None:
+            session = Session(id=uuid.uuid4().hex)
+            self._sessions[session.id] = session
+        self._sessions.move_to_end(session.id)
+        session.last_used = time.monotonic()
+        return session
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if len(self._sessions) < self.max_sessions and now - oldest.last_used < self.ttl:
+                break
+            self._sessions.popitem(last=False)
@@ -0,0 +1,42 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, TypeVar
+
+R = TypeVar("R")
+
+class SingleFlight(Generic[R]):
+    """Share one in-flight evaluation between concurrent callers with the same key.
+
+    The shared work is cancelled only once every caller waiting on it has gone
+    away; a result is never cached past the moment it completes.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def run(self, key: Hashable, evaluate: Callable[[], Awaitable[R]]) -> R:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(evaluate())
+            self._inflight[key] = task
+            self._waiters[key] = 0
+
+            def forget(_):
+                if self._inflight.get(key) is task:
+                    del self._inflight[key]
+                    del self._waiters[key]
+            task.add_done_callback(forget)
+
+        self._waiters[key] += 1
+        try:
+            # Shielded so one caller disconnecting doesn't cancel the others' result
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and self._inflight.get(key) is task:
+                self._waiters[key] -= 1
+                if self._waiters[key] == 0:
+                    task.cancel()
+            raise
@@ -6,10 +6,14 @@ import { registerRubyLanguage } from './rubyLanguage.js';
 import { registerBrainfuckLanguage } from './brainfuckLanguage.js';
 import { registerLuaLanguage } from './luaLanguage.js';
 
+const MONACO_BASE = '/static/vendor/monaco/vs';
+
 export class App {
-    constructor() {
+    // index.html passes the versioned path, which the server writes into the page
+    constructor(monacoBase = MONACO_BASE) {
         this.editor = null;
         this.monaco = null;
+        this.monacoBase = monacoBase;
         this.evaluator = new CodeEvaluator();
         this.examples = {
             'python': '/static/examples/Python.py',
@@ -34,11 +38,12 @@ export class App {
     async loadMonaco() {
         return new Promise((resolve, reject) => {
             const script = document.createElement('script');
-            script.src = '/static/vendor/monaco/vs/loader.js';
+            const monacoBase = this.monacoBase;
+            script.src = `${monacoBase}/loader.js`;
             script.onload = () => {
                 require.config({
                     paths: {
-                        vs: '/static/vendor/monaco/vs',
+                        vs: monacoBase,
                     }
                 });
                 require(['vs/editor/editor.main'], (monaco) => {
@@ -99,6 +104,30 @@ export class App {
         }
     }
 
+    async loadLanguages() {
+        // Disable languages whose toolchains aren't installed on the server, and
+        // let the evaluator send only the options each language's runner accepts
+        try {
+            const response = await fetch('/api/languages');
+            const languages = await response.json();
+            this.evaluator.setLanguages(languages);
+            const select = document.getElementById('language');
+            languages.forEach(({ language, available, toolchains }) => {
+                const option = select.querySelector(`option[value="${language}"]`);
+                if (!option) return;
+                option.disabled = !available;
+                const missing = Object.entries(toolchains)
+                    .filter(([_, version]) => version === null)
+                    .map(([name, _]) => name);
+                option.title = available
+                    ? Object.values(toolchains).join('\n')
+                    : `Not installed: ${missing.join(', ')}`;
+            });
+        } catch (error) {
+            console.error('Failed to load languages:', error);
+        }
+    }
+
     setupExamplesMenu() {
         const button = document.getElementById('examples-button');
         const menu = document.getElementById('examples-menu');
@@ -167,6 +196,7 @@ export class App {
 
         this.setupEventListeners();
         this.setupExamplesMenu();
+        this.loadLanguages();
 
         if (data?.code) {
             document.getElementById('language').value = data.language;
@@ -182,6 +212,16 @@ export class App {
         document.getElementById('language').addEventListener('change', (e) => {
             this.handleLanguageChange(e);
         });
+
+        this.evaluator.optLevelSelect.addEventListener('change', () => {
+            this.handleEditorChange();
+        });
+        this.evaluator.benchmarkSelect.addEventListener('change', () => {
+            this.handleEditorChange();
+        });
+        this.evaluator.profileSelect.addEventListener('change', () => {
+            this.handleEditorChange();
+        });
     }
 
     async handleEditorChange() {
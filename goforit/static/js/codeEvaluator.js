@@ -1,6 +1,7 @@
 import { formatHexdump } from './hexdumpHighlighter.js';
 import { highlightAssembly } from './assemblyHighlighter.js';
 import { renderD3Graph } from './d3GraphRenderer.js';
+import { renderFlamegraph } from './flamegraphRenderer.js';
 
 function escapeHtml(unsafe) {
     return unsafe
@@ -14,6 +15,10 @@ function escapeHtml(unsafe) {
 // Store collapsed state by section title
 let collapsedSections = new Map();
 
+// Highlighted HTML of the last render's outputs by language and content hash,
+// so panels whose content didn't change skip re-highlighting
+let renderedOutputs = new Map();
+
 export function clearCollapsedState() {
     collapsedSections.clear();
 }
@@ -24,7 +29,7 @@ function toggleCollapse(sectionId, title) {
     collapsedSections.set(title, !isExpanded);
 }
 
-function createCollapsibleSection(title, content, language) {
+function createCollapsibleSection(title, content, language, hash, rendered, metadata = {}) {
     const sectionId = `section-${Math.random().toString(36).substr(2, 9)}`;
     const wasCollapsed = collapsedSections.get(title) ?? true; // Default to collapsed
 
@@ -42,10 +47,16 @@ function createCollapsibleSection(title, content, language) {
     const contentDiv = document.createElement('div');
     contentDiv.className = 'collapsible-content';
     
-    if (language && language.startsWith('asm-')) {
+    const cacheKey = hash ? `${language}:${hash}` : null;
+    if (cacheKey && renderedOutputs.has(cacheKey)) {
+        contentDiv.innerHTML = renderedOutputs.get(cacheKey);
+        rendered.set(cacheKey, contentDiv.innerHTML);
+    } else if (language && language.startsWith('asm-')) {
         contentDiv.innerHTML = highlightAssembly(content);
     } else if (language === 'hexdump-binary') {
         contentDiv.innerHTML = formatHexdump(content);
+    } else if (language === 'flamegraph') {
+        contentDiv.appendChild(renderFlamegraph(content, metadata.unit));
     } else if (language === 'graphviz') {
         // Use D3 force-directed graph renderer
         renderD3Graph(content).then(element => {
@@ -61,6 +72,9 @@ function createCollapsibleSection(title, content, language) {
     } else {
         contentDiv.innerHTML = `<pre>${escapeHtml(content)}</pre>`;
     }
+    if (cacheKey && language !== 'graphviz' && !rendered.has(cacheKey)) {
+        rendered.set(cacheKey, contentDiv.innerHTML);
+    }
 
     section.appendChild(header);
     section.appendChild(contentDiv);
@@ -71,11 +85,37 @@ function createCollapsibleSection(title, content, language) {
     return section;
 }
 
+// Picks functions the disassembly left out (runtime startup code, library
+// functions) and fetches them from the server on demand
+function createSymbolPicker(metadata) {
+    const picker = document.createElement('div');
+    picker.className = 'symbol-picker';
+    const others = metadata.symbols.filter(symbol => !symbol.user);
+    if (others.length === 0) return picker;
+
+    const select = document.createElement('select');
+    select.innerHTML = `<option value="">Show another function (${others.length})</option>` +
+        others.map(symbol => `<option value="${escapeHtml(symbol.name)}">${escapeHtml(symbol.name)}</option>`).join('');
+    const listing = document.createElement('pre');
+
+    select.addEventListener('change', async () => {
+        if (!select.value) return;
+        const response = await fetch(`/api/disassembly/${metadata.disassembly}/${encodeURIComponent(select.value)}`);
+        const symbol = await response.json();
+        listing.innerHTML = response.ok ? highlightAssembly(symbol.content) : escapeHtml(symbol.detail);
+    });
+
+    picker.appendChild(select);
+    picker.appendChild(listing);
+    return picker;
+}
+
 export function renderOutput(outputDiv, result) {
     const domStart = performance.now();
 
     // Create a document fragment to build the DOM off-screen
     const fragment = document.createDocumentFragment();
+    const rendered = new Map();
 
     // Display code outputs first (assembly, objdump, hexdump)
     if (result.code_outputs && result.code_outputs.length > 0) {
@@ -86,6 +126,24 @@ export function renderOutput(outputDiv, result) {
             let title;
             if (output.language === 'asm-intel') {
                 title = 'Assembly Output (gcc -S)';
+            } else if (output.language === 'asm-rust') {
+                title = 'Assembly Output (rustc --emit=asm)';
+            } else if (output.language === 'llvm-ir') {
+                title = 'LLVM IR';
+            } else if (output.language === 'rust-mir') {
+                title = 'MIR';
+            } else if (output.language === 'rust-stats') {
+                title = 'Compile Stats';
+            } else if (output.language === 'opt-comparison') {
+                title = 'Optimization Levels';
+            } else if (output.language === 'benchmark') {
+                title = 'Benchmark';
+            } else if (output.language === 'flamegraph') {
+                title = 'Flame Graph';
+            } else if (output.language === 'cachegrind') {
+                title = 'Cachegrind';
+            } else if (output.language === 'compile-profile') {
+                title = 'Compile Profile';
             } else if (output.language && output.language.startsWith('asm-')) {
                 title = `Disassembly (${output.language.replace('asm-', '')})`;
             } else if (output.language === 'hexdump-binary') {
@@ -96,12 +154,21 @@ export function renderOutput(outputDiv, result) {
                 title = 'Additional Output';
             }
 
-            const section = createCollapsibleSection(title, output.content, output.language);
+            if (output.metadata?.opt_level) {
+                title += ` -${output.metadata.opt_level}`;
+            }
+
+            const section = createCollapsibleSection(title, output.content, output.language, output.hash, rendered,
+                                                     output.metadata);
+            if (output.metadata?.symbols) {
+                section.querySelector('.collapsible-content').prepend(createSymbolPicker(output.metadata));
+            }
             container.appendChild(section);
         });
         
         fragment.appendChild(container);
     }
+    renderedOutputs = rendered;
 
     // Then display stdout/stderr as regular sections
     if (result.stdout || result.stderr) {
@@ -115,7 +182,9 @@ export function renderOutput(outputDiv, result) {
         if (result.stderr) {
             const stderrDiv = document.createElement('div');
             stderrDiv.className = 'program-output';
-            stderrDiv.innerHTML = `<div class="error-label">Program Errors</div><pre>${escapeHtml(result.stderr)}</pre>`;
+            // Errors from the fast check that runs before the full build
+            const label = result.phase === 'diagnostics' ? 'Diagnostics' : 'Program Errors';
+            stderrDiv.innerHTML = `<div class="error-label">${label}</div><pre>${escapeHtml(result.stderr)}</pre>`;
             fragment.appendChild(stderrDiv);
         }
     }
@@ -144,6 +213,46 @@ export function updateBackgroundColor(result) {
             : '#1a1a1a'; // Dark gray for no output
 }
 
+// Offset in code points (what the server indexes by) of a UTF-16 offset into text
+function codePointOffset(text, offset) {
+    let count = 0;
+    for (const _ of text.slice(0, offset)) count++;
+    return count;
+}
+
+// One patch turning oldText into newText: everything between the common prefix and suffix
+function diffPatch(oldText, newText) {
+    let prefix = 0;
+    const maxPrefix = Math.min(oldText.length, newText.length);
+    while (prefix < maxPrefix && oldText.charCodeAt(prefix) === newText.charCodeAt(prefix)) prefix++;
+    let suffix = 0;
+    const maxSuffix = maxPrefix - prefix;
+    while (suffix < maxSuffix &&
+           oldText.charCodeAt(oldText.length - 1 - suffix) === newText.charCodeAt(newText.length - 1 - suffix)) suffix++;
+
+    // Never split a surrogate pair
+    const isHigh = code => code >= 0xD800 && code <= 0xDBFF;
+    const isLow = code => code >= 0xDC00 && code <= 0xDFFF;
+    if (prefix > 0 && isHigh(oldText.charCodeAt(prefix - 1))) prefix--;
+    if (suffix > 0 && isLow(oldText.charCodeAt(oldText.length - suffix))) suffix--;
+
+    const start = codePointOffset(oldText, prefix);
+    return {
+        start,
+        end: start + codePointOffset(oldText.slice(prefix), oldText.length - suffix - prefix),
+        text: newText.slice(prefix, newText.length - suffix)
+    };
+}
+
+// What a language's runner can do before /api/languages has answered for it
+const NO_CAPABILITIES = {
+    opt_levels: [],
+    benchmark: false,
+    profiles: false,
+    cachegrind: false,
+    compile_profile: false
+};
+
 export class CodeEvaluator {
     constructor() {
         this.currentEvaluation = null;
@@ -151,6 +260,14 @@ export class CodeEvaluator {
         this.timerInterval = null;
         this.currentCode = null;
         this.currentLanguage = null;
+        // Each language's /api/languages entry, for the options its runner accepts
+        this.capabilities = new Map();
+
+        // The server's copy of the source for /api/evaluate/delta, and the output
+        // contents of recent responses by hash
+        this.session = { id: null, version: 0, text: null, ack: null };
+        this.outputs = new Map();
+        this.previousOutputs = new Map();
 
         // Create and add timer select
         this.timerSelect = document.createElement('select');
@@ -169,6 +286,37 @@ export class CodeEvaluator {
         `;
         this.timerSelect.addEventListener('change', () => this.updateTimer());
         document.body.appendChild(this.timerSelect);
+
+        // Optimization levels to compare, for languages that support it
+        this.optLevelSelect = document.createElement('select');
+        this.optLevelSelect.className = 'timer-select opt-level-select';
+        this.optLevelSelect.innerHTML = `
+            <option value="" selected>Single Build</option>
+            <option value="O0,O2">-O0 vs -O2</option>
+            <option value="O0,O1,O2,O3,Os">-O0 … -Os</option>
+        `;
+        document.body.appendChild(this.optLevelSelect);
+
+        // Repeated, measured runs of the built program
+        this.benchmarkSelect = document.createElement('select');
+        this.benchmarkSelect.className = 'timer-select benchmark-select';
+        this.benchmarkSelect.innerHTML = `
+            <option value="" selected>No Benchmark</option>
+            <option value="10">Benchmark ×10</option>
+            <option value="30">Benchmark ×30</option>
+        `;
+        document.body.appendChild(this.benchmarkSelect);
+
+        // Sampling profiler for the interpreted languages, cachegrind for native code, or the build itself
+        this.profileSelect = document.createElement('select');
+        this.profileSelect.className = 'timer-select profile-select';
+        this.profileSelect.innerHTML = `
+            <option value="" selected>No Profile</option>
+            <option value="on">Flame Graph</option>
+            <option value="cachegrind">Cachegrind</option>
+            <option value="compile">Compile Profile</option>
+        `;
+        document.body.appendChild(this.profileSelect);
         
         // Start with 10s timer, but wait until we have code to run
         this.loadLastCode().then(lastCode => {
@@ -180,6 +328,10 @@ export class CodeEvaluator {
         });
     }
 
+    setLanguages(languages) {
+        this.capabilities = new Map(languages.map(entry => [entry.language, entry]));
+    }
+
     updateTimer() {
         // Clear existing timer
         if (this.timerInterval) {
@@ -208,13 +360,7 @@ export class CodeEvaluator {
         const thisEvaluation = ++this.evaluationCount;
 
         try {
-            const response = await fetch('/api/evaluate', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ code, language })
-            });
-
-            const result = await response.json();
+            const result = await this.evaluateDelta(code, language);
             result.isLatest = (thisEvaluation === this.evaluationCount);
             return result;
         } catch (error) {
@@ -223,6 +369,96 @@ export class CodeEvaluator {
         }
     }
 
+    async evaluateDelta(code, language, full = false) {
+        const body = { language, session_id: this.session.id, ack: full ? null : this.session.ack };
+        const capabilities = this.capabilities.get(language) ?? NO_CAPABILITIES;
+        const optLevels = this.optLevelSelect.value.split(',').filter(level => capabilities.opt_levels.includes(level));
+        if (optLevels.length) {
+            body.opt_levels = optLevels;
+        }
+        if (capabilities.benchmark && this.benchmarkSelect.value) {
+            body.benchmark = { runs: parseInt(this.benchmarkSelect.value) };
+        }
+        const profile = this.profileSelect.value;
+        // The server won't time a profiled run, so a benchmark takes precedence
+        if (capabilities.profiles && profile === 'on' && !body.benchmark) {
+            body.profile = true;
+        }
+        if (capabilities.cachegrind && profile === 'cachegrind') {
+            body.cachegrind = true;
+        }
+        if (capabilities.compile_profile && profile === 'compile') {
+            body.compile_profile = true;
+        }
+        if (full || this.session.text === null) {
+            body.code = code;
+        } else {
+            body.base_version = this.session.version;
+            if (code !== this.session.text) {
+                body.patches = [diffPatch(this.session.text, code)];
+            }
+        }
+        // Track the document the server will hold once it applies this request
+        if (body.code !== undefined || body.patches) {
+            this.session.text = code;
+            this.session.version += 1;
+        }
+
+        const response = await fetch('/api/evaluate/delta', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(body)
+        });
+        if (response.status === 409 && !full) {
+            // Out of step with the server's copy (e.g. it restarted), resend everything
+            return this.evaluateDelta(code, language, true);
+        }
+        const delta = await response.json();
+        if (!response.ok) {
+            throw new Error(delta.detail || response.statusText);
+        }
+
+        this.session.id = delta.session_id;
+        if (body.code !== undefined && this.session.text === code) {
+            this.session.version = delta.version;
+        }
+
+        const resolve = (content, hash) => content ?? this.outputs.get(hash) ?? this.previousOutputs.get(hash);
+        const result = {
+            stdout: resolve(delta.stdout, delta.stdout_hash),
+            stderr: resolve(delta.stderr, delta.stderr_hash),
+            return_code: delta.return_code,
+            code_outputs: delta.code_outputs.map(output => ({
+                language: output.language,
+                hash: output.hash,
+                content: resolve(output.content, output.hash),
+                metadata: output.metadata
+            })),
+            case_results: delta.case_results,
+            timings: delta.timings,
+            phase: delta.phase
+        };
+        const contents = [result.stdout, result.stderr, ...result.code_outputs.map(output => output.content)];
+        if (contents.some(content => content === undefined)) {
+            // We no longer hold an output the server skipped; ask again without an ack
+            if (!full) return this.evaluateDelta(code, language, true);
+            throw new Error('Server omitted outputs from a full response');
+        }
+
+        // Acknowledge the newest response applied, keeping the one before it for
+        // responses that arrive out of order
+        if (delta.response_id > (this.session.ack ?? 0)) {
+            this.previousOutputs = this.outputs;
+            this.outputs = new Map([
+                [delta.stdout_hash, result.stdout],
+                [delta.stderr_hash, result.stderr],
+                ...result.code_outputs.map(output => [output.hash, output.content])
+            ]);
+            this.session.ack = delta.response_id;
+        }
+        return result;
+    }
+
     async loadLastCode() {
         try {
             const response = await fetch('/api/last-code');
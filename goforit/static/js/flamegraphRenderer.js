@@ -0,0 +1,82 @@
+const d3 = window.d3;
+
+const WIDTH = 960;
+const ROW_HEIGHT = 18;
+// Roughly the width of one character of the 11px label font
+const CHAR_WIDTH = 7;
+
+// Folded stacks ("main;work;fib 12" per line) as a tree of frames with their own weight
+export function parseFolded(folded) {
+    const root = { name: 'all', value: 0, children: new Map() };
+    for (const line of folded.split('\n')) {
+        const split = line.lastIndexOf(' ');
+        const weight = Number(line.slice(split + 1));
+        if (split < 0 || !weight) continue;
+
+        let node = root;
+        for (const frame of line.slice(0, split).split(';')) {
+            if (!node.children.has(frame)) {
+                node.children.set(frame, { name: frame, value: 0, children: new Map() });
+            }
+            node = node.children.get(frame);
+        }
+        node.value += weight;
+    }
+    const toTree = node => ({ name: node.name, value: node.value, children: [...node.children.values()].map(toTree) });
+    return toTree(root);
+}
+
+// Warm colours, stable per function name so the same frame keeps its colour between runs
+function frameColor(name) {
+    let hash = 0;
+    for (const char of name) hash = (hash * 31 + char.charCodeAt(0)) | 0;
+    const hue = Math.abs(hash) % 50;
+    return `hsl(${hue}, 85%, ${50 + Math.abs(hash >> 8) % 15}%)`;
+}
+
+function formatWeight(value, unit) {
+    if (unit === 'us') {
+        return value >= 1000 ? `${(value / 1000).toFixed(1)}ms` : `${value}µs`;
+    }
+    return `${value} samples`;
+}
+
+function fitLabel(name, width) {
+    const chars = Math.floor((width - 6) / CHAR_WIDTH);
+    if (chars < 3) return '';
+    return name.length <= chars ? name : `${name.slice(0, chars - 1)}…`;
+}
+
+// An SVG flame graph: callers at the bottom, each frame as wide as its share of the total
+export function renderFlamegraph(folded, unit = 'samples') {
+    const root = d3.hierarchy(parseFolded(folded))
+        .sum(d => d.value)
+        .sort((a, b) => b.value - a.value);
+    const height = (root.height + 1) * ROW_HEIGHT;
+    d3.partition().size([WIDTH, height])(root);
+
+    const svg = d3.create('svg')
+        .attr('class', 'flamegraph')
+        .attr('viewBox', [0, 0, WIDTH, height])
+        .attr('width', '100%');
+
+    const cell = svg.selectAll('g')
+        .data(root.descendants().filter(d => d.x1 - d.x0 >= 1))
+        .join('g')
+        .attr('transform', d => `translate(${d.x0},${height - d.y1})`);
+
+    cell.append('rect')
+        .attr('width', d => Math.max(d.x1 - d.x0 - 1, 1))
+        .attr('height', ROW_HEIGHT - 1)
+        .attr('fill', d => d.depth === 0 ? '#555' : frameColor(d.data.name));
+
+    cell.append('title')
+        .text(d => `${d.data.name}\n${formatWeight(d.value, unit)} (${(100 * d.value / root.value).toFixed(1)}%)`);
+
+    cell.append('text')
+        .attr('x', 3)
+        .attr('y', ROW_HEIGHT - 5)
+        .text(d => fitLabel(d.data.name, d.x1 - d.x0));
+
+    return svg.node();
+}
@@ -0,0 +1,190 @@
+"""Precompressed, content-versioned static assets.
+
+``python -m goforit.static_assets`` (or ``goforit-build-assets``) writes a
+``.gz`` and, when the brotli package is installed, a ``.br`` next to every
+compressible file under static/, plus a manifest of content hashes.
+PrecompressedStaticFiles serves those variants according to Accept-Encoding
+without compressing anything per request. URLs under ``/static/v/<version>/``
+are cached by browsers as immutable.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import sys
+from typing import Optional
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, HTMLResponse, Response
+from starlette.staticfiles import StaticFiles
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MANIFEST_NAME = 'assets.json'
+
+# Text formats worth compressing; images and the like are already compressed
+COMPRESSIBLE = {'.js', '.css', '.html', '.svg', '.json', '.map', '.txt', '.ttf', '.wasm'}
+MIN_COMPRESS_SIZE = 1024
+
+# Preferred first
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    # mtime=0 keeps the output identical across builds
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def build_assets(static_dir: str) -> dict:
+    """Precompress static_dir's assets and write the manifest; returns the manifest."""
+    files = {}
+    encodings = [encoding for encoding in ENCODINGS if encoding != 'br' or brotli is not None]
+    for dirpath, _, filenames in os.walk(static_dir):
+        for filename in sorted(filenames):
+            if filename == MANIFEST_NAME or filename.endswith(tuple(ENCODINGS.values())):
+                continue
+            path = os.path.join(dirpath, filename)
+            stat = os.stat(path)
+            entry = {'hash': file_hash(path), 'size': stat.st_size, 'mtime': stat.st_mtime, 'encodings': []}
+
+            if os.path.splitext(filename)[1] in COMPRESSIBLE and stat.st_size >= MIN_COMPRESS_SIZE:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                for encoding in encodings:
+                    compressed = compress(data, encoding)
+                    variant = path + ENCODINGS[encoding]
+                    # Not worth a variant unless it saves a meaningful amount
+                    if len(compressed) < len(data) * 0.9:
+                        with open(variant, 'wb') as f:
+                            f.write(compressed)
+                        entry['encodings'].append(encoding)
+                    elif os.path.exists(variant):
+                        os.remove(variant)
+
+            files[os.path.relpath(path, static_dir).replace(os.sep, '/')] = entry
+
+    version = hashlib.sha256(json.dumps(
+        {name: entry['hash'] for name, entry in sorted(files.items())}
+    ).encode()).hexdigest()[:12]
+    manifest = {'version': version, 'files': files}
+    with open(os.path.join(static_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+def accepted_encodings(header: str) -> set[str]:
+    accepted = set()
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name and quality > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves build_assets' precompressed variants and versioned, immutable URLs.
+
+    Without a manifest (the build step hasn't run) it behaves like StaticFiles,
+    with every response revalidated.
+    """
+
+    def __init__(self, *, directory: str, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.manifest = {'version': None, 'files': {}}
+        try:
+            with open(os.path.join(directory, MANIFEST_NAME), 'r') as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.manifest['version']
+
+    def current_entry(self, path: str) -> Optional[dict]:
+        """The manifest entry for path, unless the file was edited since the build."""
+        entry = self.manifest['files'].get(path)
+        if entry is None:
+            return None
+        try:
+            stat = os.stat(os.path.join(self.directory, path))
+        except OSError:
+            return None
+        if stat.st_size != entry['size'] or stat.st_mtime != entry['mtime']:
+            return None
+        return entry
+
+    async def get_response(self, path: str, scope) -> Response:
+        path = path.replace(os.sep, '/')
+        immutable = False
+        if path.startswith('v/'):
+            _, version, path = (path.split('/', 2) + [''])[:3]
+            immutable = version == self.version
+
+        entry = self.current_entry(path)
+        if entry is None or scope['method'] not in ('GET', 'HEAD'):
+            response = await super().get_response(path, scope)
+            response.headers['Cache-Control'] = REVALIDATE
+            return response
+
+        request_headers = Headers(scope=scope)
+        accepted = accepted_encodings(request_headers.get('accept-encoding', ''))
+        encoding = next((name for name in ENCODINGS if name in accepted and name in entry['encodings']), None)
+        etag = f'"{entry["hash"]}-{encoding}"' if encoding else f'"{entry["hash"]}"'
+        headers = {
+            'Cache-Control': IMMUTABLE if immutable else REVALIDATE,
+            'ETag': etag,
+            'Vary': 'Accept-Encoding',
+        }
+
+        if_none_match = request_headers.get('if-none-match', '')
+        if etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return Response(status_code=304, headers=headers)
+
+        full_path = os.path.join(self.directory, path)
+        if encoding is None:
+            response = FileResponse(full_path)
+        else:
+            headers['Content-Encoding'] = encoding
+            # media_type from the original name, not the .br/.gz variant
+            media_type = mimetypes.guess_type(full_path)[0] or 'text/plain'
+            response = FileResponse(full_path + ENCODINGS[encoding], media_type=media_type)
+        response.headers.update(headers)
+        return response
+
+    def index_response(self, name: str = 'index.html') -> HTMLResponse:
+        """The page with its /static/ URLs pointed at the current versioned prefix."""
+        with open(os.path.join(self.directory, name), 'r') as f:
+            html = f.read()
+        if self.version is not None:
+            html = html.replace('/static/', f'/static/v/{self.version}/')
+        return HTMLResponse(html, headers={'Cache-Control': REVALIDATE})
+
+def main():
+    static_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), 'static')
+    manifest = build_assets(static_dir)
+    compressed = sum(1 for entry in manifest['files'].values() if entry['encodings'])
+    print(f"Built assets version {manifest['version']}: {len(manifest['files'])} files, {compressed} precompressed")
+    if brotli is None:
+        print("brotli is not installed, only gzip variants were written")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+import asyncio
+from typing import Awaitable, Callable, Iterable
+from .runners import CodeResult
+
+# Per-warmup bound; a cold Go cache compiles the runtime and standard library
+WARMUP_TIMEOUT = 120
+
+# Small programs that fill each runner's persistent state before real traffic
+# arrives: build caches (Go, Haskell), precompiled headers (C++), the resident
+# compile service and CDS archive (Java) and the engine pool (Prolog).
+WARMUP_PROGRAMS = {
+    'c': '#include <stdio.h>\nint main() { puts("ready"); return 0; }\n',
+    'cpp': '#include <iostream>\nint main() { std::cout << "ready" << std::endl; return 0; }\n',
+    'java': 'public class Main { public static void main(String[] args) { System.out.println("ready"); } }\n',
+    'go': 'import "fmt"\n\nfunc main() { fmt.Println("ready") }\n',
+    'rust': 'fn main() { println!("ready"); }\n',
+    'haskell': 'main :: IO ()\nmain = putStrLn "ready"\n',
+    'prolog': ":- initialization((write(ready), nl)).\n",
+}
+
+async def warm_up(languages: Iterable[str], evaluate: Callable[[str, str], Awaitable[CodeResult]]) -> None:
+    """Run the warmup program for each of the given languages concurrently."""
+    async def warm(language: str) -> None:
+        try:
+            result = await asyncio.wait_for(evaluate(language, WARMUP_PROGRAMS[language]), timeout=WARMUP_TIMEOUT)
+            if result.return_code != 0:
+                print(f"Warmup for {language} failed: {result.stderr}")
+        except Exception as e:
+            print(f"Warmup for {language} failed: {e}")
+
+    await asyncio.gather(*(warm(language) for language in languages if language in WARMUP_PROGRAMS))